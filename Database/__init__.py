@@ -1,2 +1,5 @@
 # Database/__init__.py
-from .db import get_db_connection
\ No newline at end of file
+from .db import get_db_connection, get_collection, get_pool_stats, get_storage_backend
+from .versions import current_collection, publish_documents
+from .sync import sync_documents
+from .indexes import ensure_indexes
@@ -1,6 +1,6 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-from db import get_db_connection
+from db import get_db_connection, get_collection, get_pool_stats, initialize_database
 import jwt
 from datetime import datetime, timedelta, timezone
 from bson.json_util import dumps
@@ -40,17 +40,17 @@ def register():
         return jsonify({'message': 'Full name, email, and password are required'}), 400
 
     try:
-        db = get_db_connection()
-        if db.users.find_one({"email": email}):
+        users = get_collection("users")
+        if users.find_one({"email": email}):
             return jsonify({'message': 'Email already registered'}), 409
         hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
-        result = db.users.insert_one({
+        result = users.insert_one({
             "full_name": full_name,
             "email": email,
             "password": hashed_password,
             "score": 0
         })
-        user = db.users.find_one({"_id": result.inserted_id})
+        user = users.find_one({"_id": result.inserted_id})
         user_dict = {
             'id': str(user['_id']),
             'fullName': user['full_name'],
@@ -88,8 +88,8 @@ def login():
         return jsonify({'message': 'Email and password are required'}), 400
 
     try:
-        db = get_db_connection()
-        user = db.users.find_one({"email": email})
+        users = get_collection("users")
+        user = users.find_one({"email": email})
         if user and bcrypt.checkpw(password.encode('utf-8'), user['password']):
             token = jwt.encode({
                 'user_id': str(user['_id']),
@@ -129,8 +129,8 @@ def get_profile():
     try:
         payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
         user_id = payload.get('user_id')
-        db = get_db_connection()
-        user = db.users.find_one({"_id": ObjectId(user_id)})
+        users = get_collection("users")
+        user = users.find_one({"_id": ObjectId(user_id)})
         if user:
             user_dict = {
                 'id': str(user['_id']),
@@ -169,14 +169,14 @@ def update_score():
         score_increment = data.get('score')
         if not user_id or score_increment is None:
             return jsonify({'message': 'Missing userId or score'}), 400
-        db = get_db_connection()
-        result = db.users.update_one(
+        users = get_collection("users")
+        result = users.update_one(
             {"_id": ObjectId(user_id)},
             {"$inc": {"score": score_increment}}
         )
         if result.matched_count == 0:
             return jsonify({'message': 'User not found'}), 404
-        user = db.users.find_one({"_id": ObjectId(user_id)})
+        user = users.find_one({"_id": ObjectId(user_id)})
         logger.info(f"Score updated for {user['email']}: {user['score']}")
         return jsonify({
             'message': 'Score updated successfully!',
@@ -209,14 +209,14 @@ def save_score():
         score = data.get('score')
         if not user_id or score is None:
             return jsonify({'message': 'Missing user_id or score'}), 400
-        db = get_db_connection()
-        result = db.users.update_one(
+        users = get_collection("users")
+        result = users.update_one(
             {"_id": ObjectId(user_id)},
             {"$set": {"score": score}}
         )
         if result.matched_count == 0:
             return jsonify({'message': 'User not found'}), 404
-        user = db.users.find_one({"_id": ObjectId(user_id)})
+        user = users.find_one({"_id": ObjectId(user_id)})
         logger.info(f"Score saved for {user['email']}: {user['score']}")
         return jsonify({
             'message': 'Score saved successfully!',
@@ -233,8 +233,7 @@ def save_score():
 @app.route('/api/test', methods=['GET'])
 def test():
     try:
-        db = get_db_connection()
-        users = list(db.users.find())
+        users = list(get_collection("users").find())
         users_dict = [{
             'id': str(user['_id']),
             'full_name': user['full_name'],
@@ -256,10 +255,19 @@ def health():
         db = get_db_connection()
         db.command('ping')
         logger.info("Health check successful")
-        return jsonify({"status": "healthy", "server": "database"}), 200
+        return jsonify({"status": "healthy", "server": "database", "pool": get_pool_stats()}), 200
     except Exception as e:
         logger.error(f"Health check failed: {str(e)}")
         return jsonify({"status": "unhealthy", "error": str(e)}), 500
 
+@app.route('/api/pool-stats', methods=['GET'])
+def pool_stats():
+    return jsonify(get_pool_stats()), 200
+
 if __name__ == '__main__':
-    app.run(host="0.0.0.0", port=5006, debug=True)
\ No newline at end of file
+    import os
+    import sys
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+    from backend.helpers.wsgi import serve
+    initialize_database()
+    serve(app, 5006, "database", debug=os.getenv("FLASK_DEBUG", "1") == "1")
\ No newline at end of file
@@ -1,26 +1,199 @@
-from pymongo import MongoClient
+from pymongo import MongoClient, monitoring
 import os
+import threading
 from dotenv import load_dotenv
 
+try:
+    from .embedded import EmbeddedClient, default_path
+except ImportError:  # imported as a top-level module from inside Database/
+    from embedded import EmbeddedClient, default_path
+
 load_dotenv()
 
+DB_NAME = os.getenv("MONGODB_DB_NAME", "sanskrit_learning")
+
+# STORAGE_BACKEND=mongo (default) talks to MONGODB_URI; STORAGE_BACKEND=embedded
+# keeps everything in a local SQLite file (EMBEDDED_DB_PATH, ":memory:" allowed)
+# so a single node or a load test can run without any external service.
+def get_storage_backend():
+    return os.getenv("STORAGE_BACKEND", "mongo").lower()
+
+# === Pool configuration (overridable through the environment) ===
+def _env_int(name, default):
+    value = os.getenv(name)
+    return int(value) if value else default
+
+def get_client_options():
+    return {
+        "maxPoolSize": _env_int("MONGODB_MAX_POOL_SIZE", 50),
+        "minPoolSize": _env_int("MONGODB_MIN_POOL_SIZE", 0),
+        "maxIdleTimeMS": _env_int("MONGODB_MAX_IDLE_TIME_MS", 60000),
+        "waitQueueTimeoutMS": _env_int("MONGODB_WAIT_QUEUE_TIMEOUT_MS", 5000),
+        "connectTimeoutMS": _env_int("MONGODB_CONNECT_TIMEOUT_MS", 5000),
+        "serverSelectionTimeoutMS": _env_int("MONGODB_SERVER_SELECTION_TIMEOUT_MS", 5000),
+        "socketTimeoutMS": _env_int("MONGODB_SOCKET_TIMEOUT_MS", 20000),
+    }
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Counts connection pool events so the pool size can be tuned."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.open_connections = 0
+            self.checked_out = 0
+            self.max_checked_out = 0
+            self.connections_created = 0
+            self.connections_closed = 0
+            self.checkouts = 0
+            self.checkout_failures = 0
+            self.pool_clears = 0
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "open_connections": self.open_connections,
+                "checked_out": self.checked_out,
+                "max_checked_out": self.max_checked_out,
+                "connections_created": self.connections_created,
+                "connections_closed": self.connections_closed,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "pool_clears": self.pool_clears,
+            }
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open_connections += 1
+            self.connections_created += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open_connections -= 1
+            self.connections_closed += 1
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failures += 1
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+# === Process-wide client registry ===
+# One MongoClient per process. MongoClient is not fork-safe, so the registry
+# remembers the pid that created it and builds a fresh client after a fork.
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+_database = None
+_collections = {}
+_pool_stats = PoolStatsListener()
+
+def _reset_after_fork():
+    global _client, _client_pid, _client_lock, _database, _collections
+    _client = None
+    _database = None
+    _client_pid = None
+    _client_lock = threading.Lock()
+    _collections = {}
+    _pool_stats.reset()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+def _create_client():
+    backend = get_storage_backend()
+    if backend == "embedded":
+        return EmbeddedClient(os.getenv("EMBEDDED_DB_PATH") or default_path())
+    if backend != "mongo":
+        raise Exception(f"Unknown STORAGE_BACKEND: {backend}")
+    mongo_uri = os.getenv("MONGODB_URI")
+    if not mongo_uri:
+        raise Exception("MONGODB_URI not set in environment variables")
+    return MongoClient(mongo_uri, event_listeners=[_pool_stats], **get_client_options())
+
+def get_client():
+    global _client, _client_pid, _database
+    pid = os.getpid()
+    if _client is not None and _client_pid == pid:
+        return _client
+    with _client_lock:
+        if _client is None or _client_pid != pid:
+            _collections.clear()
+            _client = _create_client()
+            _database = _client[DB_NAME]
+            _client_pid = pid
+    return _client
+
 def get_db_connection():
     try:
-        mongo_uri = os.getenv("MONGODB_URI")
-        if not mongo_uri:
-            raise Exception("MONGODB_URI not set in environment variables")
-        client = MongoClient(mongo_uri)
-        db = client["sanskrit_learning"]
-        return db
+        get_client()
+        return _database
     except Exception as e:
         print(f"Error connecting to MongoDB: {e}")
         raise
 
+def get_collection(name):
+    collection = _collections.get(name)
+    if collection is None:
+        collection = get_db_connection()[name]
+        _collections[name] = collection
+    return collection
+
+def get_pool_stats():
+    stats = _pool_stats.snapshot()
+    stats["connected"] = _client is not None and _client_pid == os.getpid()
+    stats["pid"] = os.getpid()
+    stats["backend"] = get_storage_backend()
+    stats["options"] = get_client_options()
+    return stats
+
+def close_db_connection():
+    global _client, _client_pid, _database
+    with _client_lock:
+        if _client is not None and _client_pid == os.getpid():
+            _client.close()
+        _client = None
+        _database = None
+        _client_pid = None
+        _collections.clear()
+
 def initialize_database():
     try:
-        db = get_db_connection()
-        db.users.create_index("email", unique=True)
-        print("Database initialized successfully")
+        try:
+            from .indexes import ensure_indexes
+        except ImportError:  # imported as a top-level module from inside Database/
+            from indexes import ensure_indexes
+        print(f"Database initialized successfully (indexes: {', '.join(ensure_indexes())})")
     except Exception as e:
         print(f"Error initializing database: {str(e)}")
 
@@ -28,11 +201,12 @@ def test_connection():
     try:
         db = get_db_connection()
         db.command("ping")
-        print("MongoDB Atlas connection successful!")
+        print(f"{get_storage_backend()} storage connection successful!")
         print("Collections:", db.list_collection_names())
+        print("Pool stats:", get_pool_stats())
     except Exception as e:
         print(f"Connection test failed: {str(e)}")
 
 if __name__ == "__main__":
     initialize_database()
-    test_connection()
\ No newline at end of file
+    test_connection()
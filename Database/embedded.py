@@ -0,0 +1,498 @@
+import json
+import os
+import sqlite3
+import threading
+from bson import json_util
+from bson.objectid import ObjectId
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from pymongo.results import BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+
+# Embedded storage engine: a SQLite file (or ":memory:") that implements the
+# small slice of the pymongo collection API the servers use. Documents are
+# stored as extended JSON so ObjectIds, bytes and datetimes round-trip.
+
+_MISSING = object()
+
+def _encode(value):
+    return json_util.dumps(value, sort_keys=True)
+
+def _decode(text):
+    return json_util.loads(text)
+
+def _get_path(doc, path):
+    value = doc
+    for part in path.split("."):
+        if isinstance(value, dict) and part in value:
+            value = value[part]
+        elif isinstance(value, list) and part.isdigit() and int(part) < len(value):
+            value = value[int(part)]
+        else:
+            return _MISSING
+    return value
+
+def _values_equal(value, expected):
+    if value is _MISSING:
+        return expected is None
+    if isinstance(value, list) and not isinstance(expected, list):
+        return expected in value
+    return value == expected
+
+def _compare(value, expected, op):
+    if value is _MISSING or value is None:
+        return False
+    try:
+        if op == "$gt":
+            return value > expected
+        if op == "$gte":
+            return value >= expected
+        if op == "$lt":
+            return value < expected
+        return value <= expected
+    except TypeError:
+        return False
+
+def _match_condition(value, condition):
+    if isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+        for op, expected in condition.items():
+            if op == "$exists":
+                if (value is not _MISSING) != bool(expected):
+                    return False
+            elif op == "$eq":
+                if not _values_equal(value, expected):
+                    return False
+            elif op == "$ne":
+                if _values_equal(value, expected):
+                    return False
+            elif op == "$in":
+                if not any(_values_equal(value, e) for e in expected):
+                    return False
+            elif op == "$nin":
+                if any(_values_equal(value, e) for e in expected):
+                    return False
+            elif op in ("$gt", "$gte", "$lt", "$lte"):
+                if not _compare(value, expected, op):
+                    return False
+            else:
+                raise OperationFailure(f"Unsupported query operator in embedded backend: {op}")
+        return True
+    return _values_equal(value, condition)
+
+def matches(doc, query):
+    for key, condition in (query or {}).items():
+        if key == "$and":
+            if not all(matches(doc, q) for q in condition):
+                return False
+        elif key == "$or":
+            if not any(matches(doc, q) for q in condition):
+                return False
+        elif key == "$nor":
+            if any(matches(doc, q) for q in condition):
+                return False
+        elif not _match_condition(_get_path(doc, key), condition):
+            return False
+    return True
+
+def _set_path(doc, path, value):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+def _unset_path(doc, path):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.get(part)
+        if not isinstance(doc, dict):
+            return
+    doc.pop(parts[-1], None)
+
+def apply_update(doc, update):
+    if not update or not all(k.startswith("$") for k in update):
+        raise OperationFailure("update only works with $ operators")
+    for op, fields in update.items():
+        for path, value in fields.items():
+            if op == "$set":
+                _set_path(doc, path, value)
+            elif op == "$unset":
+                _unset_path(doc, path)
+            elif op == "$inc":
+                current = _get_path(doc, path)
+                _set_path(doc, path, (0 if current is _MISSING else current) + value)
+            else:
+                raise OperationFailure(f"Unsupported update operator in embedded backend: {op}")
+    return doc
+
+def apply_projection(doc, projection):
+    if not projection:
+        return doc
+    if isinstance(projection, (list, tuple)):
+        projection = {field: 1 for field in projection}
+    include_id = projection.get("_id", 1)
+    fields = {k: v for k, v in projection.items() if k != "_id"}
+    if fields and all(fields.values()):
+        result = {}
+        if include_id and "_id" in doc:
+            result["_id"] = doc["_id"]
+        for path in fields:
+            value = _get_path(doc, path)
+            if value is not _MISSING:
+                _set_path(result, path, value)
+        return result
+    # Documents handed in here are freshly decoded copies, so trim in place.
+    for path, flag in projection.items():
+        if not flag:
+            _unset_path(doc, path)
+    return doc
+
+def _sort_key(value):
+    if value is _MISSING or value is None:
+        return (0, 0)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (1, value)
+    if isinstance(value, str):
+        return (2, value)
+    return (3, _encode(value))
+
+def _index_name(keys):
+    return "_".join(f"{field}_{direction}" for field, direction in keys)
+
+def _normalize_keys(keys):
+    if isinstance(keys, str):
+        return [(keys, 1)]
+    return [(field, direction) for field, direction in keys]
+
+class EmbeddedCursor:
+    def __init__(self, collection, docs, query):
+        self._collection = collection
+        self._docs = docs
+        self._query = query
+
+    def __iter__(self):
+        return iter(self._docs)
+
+    def sort(self, key, direction=1):
+        keys = [(key, direction)] if isinstance(key, str) else _normalize_keys(key)
+        for field, dirn in reversed(keys):
+            self._docs.sort(key=lambda doc: _sort_key(_get_path(doc, field)), reverse=dirn < 0)
+        return self
+
+    def limit(self, count):
+        if count:
+            self._docs = self._docs[:count]
+        return self
+
+    def skip(self, count):
+        self._docs = self._docs[count:]
+        return self
+
+class EmbeddedCollection:
+    def __init__(self, database, name):
+        self.database = database
+        self.name = name
+
+    @property
+    def full_name(self):
+        return f"{self.database.name}.{self.name}"
+
+    def _engine(self):
+        return self.database.client
+
+    def _table(self):
+        return self._engine()._table(self.database.name, self.name)
+
+    def _scan(self, query):
+        engine = self._engine()
+        table = self._table()
+        if query and set(query) == {"_id"} and not isinstance(query["_id"], dict):
+            rows = engine._execute(f'SELECT doc FROM "{table}" WHERE id = ?', (_encode(query["_id"]),))
+        else:
+            rows = engine._execute(f'SELECT doc FROM "{table}" ORDER BY rowid')
+        for (text,) in rows:
+            doc = _decode(text)
+            if matches(doc, query):
+                yield doc
+
+    def find(self, filter=None, projection=None):
+        docs = [apply_projection(doc, projection) for doc in self._scan(filter)]
+        return EmbeddedCursor(self, docs, filter)
+
+    def find_one(self, filter=None, projection=None):
+        for doc in self._scan(filter):
+            return apply_projection(doc, projection)
+        return None
+
+    def count_documents(self, filter):
+        return sum(1 for _ in self._scan(filter))
+
+    def _duplicate(self, error):
+        # SQLite names the violated index: "UNIQUE constraint failed: index '<table>$<name>'"
+        message = str(error)
+        name = message.rsplit("$", 1)[1].rstrip("'") if "$" in message else "_id_"
+        return DuplicateKeyError(f"E11000 duplicate key error collection: {self.full_name} index: {name}")
+
+    def _insert(self, doc):
+        doc.setdefault("_id", ObjectId())
+        try:
+            self._engine()._execute(f'INSERT INTO "{self._table()}" (id, doc) VALUES (?, ?)',
+                                    (_encode(doc["_id"]), _encode(doc)))
+        except sqlite3.IntegrityError as e:
+            raise self._duplicate(e)
+        return doc["_id"]
+
+    def insert_one(self, document):
+        with self._engine()._transaction():
+            return InsertOneResult(self._insert(document), True)
+
+    def insert_many(self, documents, ordered=True):
+        inserted = []
+        errors = []
+        with self._engine()._transaction():
+            for index, doc in enumerate(documents):
+                try:
+                    inserted.append(self._insert(doc))
+                except DuplicateKeyError as e:
+                    errors.append({"index": index, "code": 11000, "errmsg": str(e), "op": doc})
+                    if ordered:
+                        break
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "writeConcernErrors": [], "nInserted": len(inserted),
+                                  "nUpserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0, "upserted": []})
+        return InsertManyResult(inserted, True)
+
+    def _write_back(self, doc):
+        try:
+            self._engine()._execute(f'UPDATE "{self._table()}" SET doc = ? WHERE id = ?',
+                                    (_encode(doc), _encode(doc["_id"])))
+        except sqlite3.IntegrityError as e:
+            raise self._duplicate(e)
+
+    def _upsert_seed(self, filter):
+        return {k: v for k, v in (filter or {}).items() if not k.startswith("$") and not isinstance(v, dict)}
+
+    def _update(self, filter, update, upsert):
+        """Apply one update; returns the raw {"n", "nModified"[, "upserted"]} result."""
+        for doc in self._scan(filter):
+            before = _encode(doc)
+            apply_update(doc, update)
+            modified = _encode(doc) != before
+            if modified:
+                self._write_back(doc)
+            return {"n": 1, "nModified": int(modified), "updatedExisting": True}
+        if upsert:
+            doc = self._upsert_seed(filter)
+            apply_update(doc, update)
+            return {"n": 1, "nModified": 0, "upserted": self._insert(doc)}
+        return {"n": 0, "nModified": 0}
+
+    def _replace(self, filter, replacement, upsert):
+        for doc in self._scan(filter):
+            new = dict(replacement, _id=doc["_id"])
+            modified = _encode(new) != _encode(doc)
+            if modified:
+                self._write_back(new)
+            return {"n": 1, "nModified": int(modified), "updatedExisting": True}
+        if upsert:
+            doc = dict(replacement)
+            seed = self._upsert_seed(filter)
+            if "_id" not in doc and "_id" in seed:
+                doc["_id"] = seed["_id"]
+            return {"n": 1, "nModified": 0, "upserted": self._insert(doc)}
+        return {"n": 0, "nModified": 0}
+
+    def _delete(self, filter, limit=None):
+        ids = [_encode(doc["_id"]) for doc in self._scan(filter)][:limit]
+        table = self._table()
+        for doc_id in ids:
+            self._engine()._execute(f'DELETE FROM "{table}" WHERE id = ?', (doc_id,))
+        return len(ids)
+
+    def update_one(self, filter, update, upsert=False):
+        with self._engine()._transaction():
+            return UpdateResult(self._update(filter, update, upsert), True)
+
+    def replace_one(self, filter, replacement, upsert=False):
+        with self._engine()._transaction():
+            return UpdateResult(self._replace(filter, replacement, upsert), True)
+
+    def delete_one(self, filter):
+        with self._engine()._transaction():
+            return DeleteResult({"n": self._delete(filter, limit=1)}, True)
+
+    def delete_many(self, filter):
+        with self._engine()._transaction():
+            return DeleteResult({"n": self._delete(filter)}, True)
+
+    def bulk_write(self, requests, ordered=True):
+        """InsertOne / ReplaceOne / UpdateOne / DeleteOne / DeleteMany, like pymongo."""
+        result = {"writeErrors": [], "writeConcernErrors": [], "nInserted": 0, "nUpserted": 0,
+                  "nMatched": 0, "nModified": 0, "nRemoved": 0, "upserted": []}
+        with self._engine()._transaction():
+            for index, op in enumerate(requests):
+                kind = type(op).__name__
+                try:
+                    if kind == "InsertOne":
+                        self._insert(op._doc)
+                        result["nInserted"] += 1
+                        continue
+                    if kind in ("DeleteOne", "DeleteMany"):
+                        result["nRemoved"] += self._delete(op._filter, limit=1 if kind == "DeleteOne" else None)
+                        continue
+                    if kind == "ReplaceOne":
+                        raw = self._replace(op._filter, op._doc, op._upsert)
+                    elif kind == "UpdateOne":
+                        raw = self._update(op._filter, op._doc, op._upsert)
+                    else:
+                        raise OperationFailure(f"Unsupported bulk operation: {kind}")
+                except DuplicateKeyError as e:
+                    result["writeErrors"].append({"index": index, "code": 11000, "errmsg": str(e), "op": op})
+                    if ordered:
+                        break
+                    continue
+                if "upserted" in raw:
+                    result["nUpserted"] += 1
+                    result["upserted"].append({"index": index, "_id": raw["upserted"]})
+                else:
+                    result["nMatched"] += raw["n"]
+                    result["nModified"] += raw["nModified"]
+        if result["writeErrors"]:
+            raise BulkWriteError(result)
+        return BulkWriteResult(result, True)
+
+    def create_index(self, keys, unique=False, name=None, **kwargs):
+        keys = _normalize_keys(keys)
+        name = name or _index_name(keys)
+        engine = self._engine()
+        table = self._table()
+        if unique:
+            try:
+                engine._create_unique_index(table, name, keys)
+            except sqlite3.IntegrityError as e:
+                raise self._duplicate(e)
+        engine._save_index(self.database.name, self.name, name, keys, unique)
+        return name
+
+    def drop(self):
+        self.database.drop_collection(self.name)
+
+class EmbeddedDatabase:
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+
+    def __getitem__(self, name):
+        return EmbeddedCollection(self, name)
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return EmbeddedCollection(self, name)
+
+    def command(self, command, *args, **kwargs):
+        if command == "ping":
+            self.client._execute("SELECT 1")
+            return {"ok": 1.0}
+        raise OperationFailure(f"Unsupported command in embedded backend: {command}")
+
+    def list_collection_names(self):
+        return self.client._collection_names(self.name)
+
+    def drop_collection(self, name):
+        self.client._drop_table(self.name, name)
+
+def _unique_expression(keys):
+    # Missing and null compare equal, as in a MongoDB unique index
+    paths = ["$" + "".join(f'."{part}"' for part in field.split(".")) for field, _ in keys]
+    return ", ".join(f"json_quote(json_extract(doc, '{path}'))" for path in paths)
+
+class EmbeddedClient:
+    def __init__(self, path=":memory:"):
+        self.path = path
+        self._lock = threading.RLock()
+        # Tables known to exist on this connection, so their DDL runs once
+        self._tables = set()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS _indexes (db TEXT, coll TEXT, name TEXT, keys TEXT, is_unique INTEGER, PRIMARY KEY (db, coll, name))")
+
+    def __getitem__(self, name):
+        return EmbeddedDatabase(self, name)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            try:
+                return self._conn.execute(sql, params).fetchall()
+            except sqlite3.OperationalError as e:
+                # Another process dropped a table we had cached: recreate it and retry once
+                table = str(e).partition("no such table: ")[2]
+                if table not in self._tables:
+                    raise
+                self._tables.discard(table)
+                self._table(*table.split(".", 1))
+                return self._conn.execute(sql, params).fetchall()
+
+    def _transaction(self):
+        return _Transaction(self)
+
+    def _table(self, db_name, coll_name):
+        table = f"{db_name}.{coll_name}"
+        if table in self._tables:
+            return table
+        with self._lock:
+            self._conn.execute(f'CREATE TABLE IF NOT EXISTS "{table}" (id TEXT PRIMARY KEY, doc TEXT NOT NULL)')
+            # Unique indexes recorded before they were backed by SQLite indexes
+            for keys, name in self._unique_indexes(db_name, coll_name):
+                self._create_unique_index(table, name, keys)
+            self._tables.add(table)
+        return table
+
+    def _create_unique_index(self, table, name, keys):
+        self._execute(f'CREATE UNIQUE INDEX IF NOT EXISTS "{table}${name}" ON "{table}" ({_unique_expression(keys)})')
+
+    def _collection_names(self, db_name):
+        prefix = f"{db_name}."
+        rows = self._execute("SELECT name FROM sqlite_master WHERE type = 'table' AND substr(name, 1, ?) = ?",
+                             (len(prefix), prefix))
+        return [name[len(prefix):] for (name,) in rows]
+
+    def _drop_table(self, db_name, coll_name):
+        table = f"{db_name}.{coll_name}"
+        self._tables.discard(table)
+        self._execute(f'DROP TABLE IF EXISTS "{table}"')
+        self._execute("DELETE FROM _indexes WHERE db = ? AND coll = ?", (db_name, coll_name))
+
+    def _save_index(self, db_name, coll_name, name, keys, unique):
+        self._execute("INSERT OR REPLACE INTO _indexes (db, coll, name, keys, is_unique) VALUES (?, ?, ?, ?, ?)",
+                      (db_name, coll_name, name, json.dumps(keys), int(unique)))
+
+    def _unique_indexes(self, db_name, coll_name):
+        rows = self._execute("SELECT keys, name FROM _indexes WHERE db = ? AND coll = ? AND is_unique = 1",
+                             (db_name, coll_name))
+        return [(_normalize_keys(json.loads(keys)), name) for keys, name in rows]
+
+class _Transaction:
+    # Groups writes into one SQLite transaction; nested uses join the outer one.
+    def __init__(self, client):
+        self.client = client
+
+    def __enter__(self):
+        self.client._lock.acquire()
+        self.outer = not self.client._conn.in_transaction
+        if self.outer:
+            self.client._conn.execute("BEGIN IMMEDIATE")
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if self.outer:
+                self.client._conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self.client._lock.release()
+        return False
+
+def default_path():
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "embedded.sqlite3")
@@ -0,0 +1,132 @@
+import sys
+
+from pymongo import ASCENDING
+
+try:
+    from .db import get_storage_backend
+    from .versions import current_collection
+except ImportError:  # run as a script from inside Database/
+    from db import get_storage_backend
+    from versions import current_collection
+
+# Index registry.
+#
+# Every filtered query the servers run is listed in QUERIES under a name, and
+# the servers read their filters from here, so a new query shape cannot be
+# added without it showing up in the registry. INDEXES says which index serves
+# which shapes. ensure_indexes() applies them; versions.publish() calls it on
+# a staging collection before making it current, so a freshly loaded corpus is
+# never served without its indexes.
+#
+# Unfiltered reads (whole conjugations / verbs tables, the full sentence set
+# for sans_sent_game, the sync diff) read every document anyway and are not
+# listed.
+#
+#   python Database/indexes.py ensure   create every registered index
+#   python Database/indexes.py verify   explain() each query; exit 1 on a COLLSCAN
+
+TENSES = ["present", "past", "future"]
+
+QUERIES = {
+    "users.by_email": ("users", {"email": "someone@example.com"}),
+    "sentences.verb_game": ("sentences", {
+        "sentence": {"$exists": True},
+        "verb.form": {"$exists": True},
+        "verb.root": {"$exists": True},
+        "verb.class": {"$exists": True},
+        "tense": {"$exists": True, "$in": TENSES},
+        "subject.form": {"$exists": True},
+        "subject.person": {"$exists": True},
+        "subject.number": {"$exists": True}
+    }),
+    "sentences.tense_game": ("sentences", {"tense": {"$exists": True, "$ne": ""}, "sentence": {"$exists": True}}),
+    "sentences.number_game": ("sentences", {
+        "object": None,
+        "subject.person": {"$in": ["1", "2", "3"]},
+        "subject.number": {"$in": ["sg", "du", "pl"]}
+    }),
+    "matching_game.mtc_game": ("matching_game", {
+        "subject_root": {"$exists": True},
+        "verb_root": {"$exists": True},
+        "subject_forms.sg": {"$exists": True},
+        "subject_forms.du": {"$exists": True},
+        "subject_forms.pl": {"$exists": True},
+        "verb_forms.sg": {"$exists": True},
+        "verb_forms.du": {"$exists": True},
+        "verb_forms.pl": {"$exists": True},
+        "tense": {"$exists": True},
+        "meaning": {"$exists": True}
+    }),
+}
+
+INDEXES = {
+    "users": [
+        {"keys": [("email", ASCENDING)], "unique": True, "queries": ["users.by_email"]},
+    ],
+    "sentences": [
+        {"keys": [("tense", ASCENDING)],
+         "queries": ["sentences.verb_game", "sentences.tense_game"]},
+        {"keys": [("object", ASCENDING), ("subject.person", ASCENDING), ("subject.number", ASCENDING)],
+         "queries": ["sentences.number_game"]},
+    ],
+    "matching_game": [
+        {"keys": [("tense", ASCENDING), ("subject_root", ASCENDING), ("verb_root", ASCENDING)],
+         "queries": ["matching_game.mtc_game"]},
+    ],
+}
+
+def query(name):
+    """Filter of a registered query shape."""
+    return QUERIES[name][1]
+
+def ensure_indexes(name=None, collection=None):
+    """Create the registered indexes of name (default: all) on collection (default: the published one)."""
+    created = []
+    for collection_name in ([name] if name else list(INDEXES)):
+        target = collection if collection is not None else current_collection(collection_name)
+        for spec in INDEXES.get(collection_name, []):
+            created.append(target.create_index(spec["keys"], unique=spec.get("unique", False)))
+    return created
+
+def explain_query(name):
+    """(stages of the winning plan, index name or None) for a registered query."""
+    collection_name, filter = QUERIES[name]
+    plan = current_collection(collection_name).find(filter).explain()["queryPlanner"]["winningPlan"]
+    stages = [step.get("stage") for step in _walk(plan) if step.get("stage")]
+    index = next((step["indexName"] for step in _walk(plan) if step.get("indexName")), None)
+    return stages, index
+
+def _walk(plan):
+    yield plan
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            yield from _walk(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _walk(child)
+
+def verify():
+    """Explain every registered query; returns the names that fall back to a collection scan."""
+    failures = []
+    for name in QUERIES:
+        stages, index = explain_query(name)
+        scan = "COLLSCAN" in stages
+        print(f"  {'FAIL' if scan else 'ok  '} {name}: {' <- '.join(stages)}" + (f" ({index})" if index else ""))
+        if scan:
+            failures.append(name)
+    return failures
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or sys.argv[1] not in ("ensure", "verify"):
+        print("usage: python indexes.py ensure|verify")
+        sys.exit(1)
+    if sys.argv[1] == "ensure":
+        print(f"Indexes in place: {', '.join(ensure_indexes())}")
+        sys.exit(0)
+    if get_storage_backend() == "embedded":
+        print("The embedded backend has no query planner (every query is a scan); run verify against MongoDB")
+        sys.exit(0)
+    failures = verify()
+    if failures:
+        print(f"{len(failures)} registered queries do a collection scan: {', '.join(failures)}")
+        sys.exit(1)
+    print(f"All {len(QUERIES)} registered queries use an index")
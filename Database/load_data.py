@@ -1,30 +1,144 @@
+import argparse
+import codecs
+import gzip
+import io
 import json
 import os
+import sys
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from bson import ObjectId, json_util
 from db import get_db_connection  # Direct import since db.py is in same directory
+from versions import publish, stage
+from sync import sync_documents
+from indexes import ensure_indexes
+from backend.helpers.jsonio import iter_json_array, iter_ndjson, iter_records
 
-def load_json_to_mongodb(file_path, collection_name):
+# Streaming corpus loader.
+#
+# Files are parsed incrementally (JSON array, NDJSON for *.ndjson / *.jsonl,
+# optionally gzip-compressed) and inserted in unordered batches into a staging
+# version of the collection, which is published once the whole file is in
+# (see versions.py). Memory stays at one batch no matter how large the file.
+#
+# Progress is checkpointed next to the file after every batch: the staging
+# collection, how many documents are acknowledged and the _ids of the batch in
+# flight (as extended JSON, so ObjectIds and string ids that happen to look
+# like them come back as what they were). --resume picks up from there,
+# re-sending only the in-flight documents that did not make it.
+#
+# --sync instead diffs the file against the published collection by content
+# hash and writes only what changed (see sync.py).
+#
+#   python load_data.py [--batch-size N] [--resume | --sync] [file:collection ...]
+
+LOAD_BATCH_SIZE = int(os.getenv("LOAD_BATCH_SIZE", "1000"))
+
+def checkpoint_path(file_path, collection_name):
+    return f"{file_path}.{collection_name}.checkpoint.json"
+
+def read_checkpoint(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def write_checkpoint(path, state):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+def encode_ids(ids):
+    return json.loads(json_util.dumps(ids))
+
+def decode_ids(values):
+    return json_util.loads(json.dumps(values))
+
+def open_corpus(file_path):
+    """Return (raw binary file, text stream); raw.tell() counts bytes read from disk."""
+    raw = open(file_path, "rb")
+    stream = io.BufferedReader(gzip.GzipFile(fileobj=raw)) if file_path.endswith(".gz") else io.BufferedReader(raw)
+    head = stream.peek(1 << 16)[:1 << 16]
     try:
-        db = get_db_connection()
-        for encoding in ('utf-8-sig', 'utf-8', 'latin1'):
-            try:
-                with open(file_path, 'r', encoding=encoding) as file:
-                    data = json.load(file)
-                    collection = db[collection_name]
-                    collection.delete_many({})  # Clear existing data (optional)
-                    if isinstance(data, list):
-                        collection.insert_many(data)
-                    else:
-                        collection.insert_one(data)
-                print(f"Loaded {file_path} into {collection_name} collection with {encoding} encoding")
-                break
-            except UnicodeDecodeError as ude:
-                print(f"Failed to decode {file_path} with {encoding}: {str(ude)}")
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+        encoding = "utf-8-sig"
+    except UnicodeDecodeError:
+        encoding = "latin1"
+    return raw, io.TextIOWrapper(stream, encoding=encoding)
+
+def iter_documents(file_path, text):
+    name = file_path[:-3] if file_path.endswith(".gz") else file_path
+    if name.endswith((".ndjson", ".jsonl")):
+        return iter_ndjson(text)
+    return iter_json_array(text)
+
+def _missing(collection, ids):
+    present = {doc["_id"] for doc in collection.find({"_id": {"$in": ids}}, {"_id": 1})}
+    return [i for i in ids if i not in present]
+
+def load_json_to_mongodb(file_path, collection_name, batch_size=LOAD_BATCH_SIZE, resume=False):
+    db = get_db_connection()
+    ckpt_path = checkpoint_path(file_path, collection_name)
+    checkpoint = read_checkpoint(ckpt_path) if resume else None
+    if checkpoint:
+        version = checkpoint["version"]
+        collection = db[version]
+        print(f"Resuming {file_path} into {version} after {checkpoint['done']} documents")
+    else:
+        version, collection = stage(collection_name)
+        checkpoint = {"file": file_path, "collection": collection_name, "version": version, "done": 0, "pending": []}
+    skip = checkpoint["done"]
+    pending = decode_ids(checkpoint["pending"])
+    pending_set = set(pending)
+    done = skip
+    start = time.time()
+    raw, text = open_corpus(file_path)
+    try:
+        batch = []
+
+        def flush():
+            nonlocal done
+            ids = [doc["_id"] for doc in batch]
+            write_checkpoint(ckpt_path, dict(checkpoint, done=done, pending=encode_ids(ids)))
+            if pending_set.intersection(ids):
+                # In flight when the last run stopped: some of it may already be in
+                to_send = set(_missing(collection, ids))
+                docs = [doc for doc in batch if doc["_id"] in to_send]
+            else:
+                docs = batch
+            if docs:
+                collection.insert_many(docs, ordered=False)
+            done += len(batch)
+            write_checkpoint(ckpt_path, dict(checkpoint, done=done, pending=[]))
+            elapsed = max(time.time() - start, 1e-9)
+            print(f"  {collection_name}: {done} docs, {(done - skip) / elapsed:,.0f} docs/sec, "
+                  f"{raw.tell() / elapsed / 1e6:.1f} MB/sec")
+            batch.clear()
+
+        for index, doc in enumerate(iter_documents(file_path, text)):
+            if index < skip:
                 continue
-            except json.JSONDecodeError as jde:
-                print(f"JSON error in {file_path}: {str(jde)}")
-                return
+            if "_id" not in doc:
+                position = index - skip
+                doc["_id"] = pending[position] if position < len(pending) else ObjectId()
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
     except Exception as e:
-        print(f"Error loading {file_path}: {str(e)}")
+        print(f"Error loading {file_path} after {done} documents: {str(e)} (rerun with --resume)")
+        raise
+    finally:
+        text.close()
+    publish(collection_name, version)
+    os.remove(ckpt_path)
+    elapsed = max(time.time() - start, 1e-9)
+    print(f"Loaded {file_path} into {collection_name} ({version}): {done} docs in {elapsed:.2f}s, "
+          f"{(done - skip) / elapsed:,.0f} docs/sec, {os.path.getsize(file_path) / elapsed / 1e6:.1f} MB/sec")
+    return done
 
 if __name__ == "__main__":
     json_files = [
@@ -34,5 +148,21 @@ if __name__ == "__main__":
         ("../backend/dataset/sentences.json", "sentences"),
         ("../backend/dataset/matching_game.json", "matching_game")
     ]
+    parser = argparse.ArgumentParser(description="Stream corpus JSON files into the database")
+    parser.add_argument("files", nargs="*", help="file:collection pairs (default: the dataset files)")
+    parser.add_argument("--batch-size", type=int, default=LOAD_BATCH_SIZE)
+    parser.add_argument("--resume", action="store_true", help="Continue from the last checkpoint")
+    parser.add_argument("--sync", action="store_true", help="Write only the documents that changed")
+    args = parser.parse_args()
+    if args.files:
+        json_files = [tuple(item.rsplit(":", 1)) for item in args.files]
     for file_path, collection_name in json_files:
-        load_json_to_mongodb(file_path, collection_name)
\ No newline at end of file
+        try:
+            if args.sync:
+                print(sync_documents(collection_name, lambda: iter_records(file_path), args.batch_size))
+                continue
+            load_json_to_mongodb(file_path, collection_name, args.batch_size, args.resume)
+        except Exception as e:
+            print(f"Error loading {file_path}: {str(e)}")
+    # Published versions already carry theirs; this covers users and legacy plain collections
+    print(f"Indexes in place: {', '.join(ensure_indexes())}")
@@ -0,0 +1,167 @@
+import os
+import sys
+from pymongo import DeleteOne, InsertOne, MongoClient, ReplaceOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+try:
+    from .embedded import EmbeddedClient
+except ImportError:  # run as a script from inside Database/
+    from embedded import EmbeddedClient
+
+# Runs the collection operations the servers rely on against every available
+# storage backend and checks that each one returns the same results.
+# The embedded backend is always checked; MongoDB is checked when MONGODB_URI
+# is set (a scratch database is created and dropped).
+#
+#   python Database/parity_check.py
+
+PARITY_DB_NAME = "sanskrit_learning_parity"
+
+SENTENCES = [
+    {"sentence": "बालकः गच्छति", "tense": "present", "object": None,
+     "subject": {"root": "बालक", "form": "बालकः", "person": "3", "number": "sg"},
+     "verb": {"root": "गच्छ्", "form": "गच्छति", "class": "1P", "person": "3", "number": "sg"}},
+    {"sentence": "वयम् अगच्छाम", "tense": "past", "object": None,
+     "subject": {"root": "अस्मद्", "form": "वयम्", "person": "1", "number": "pl"},
+     "verb": {"root": "गच्छ्", "form": "अगच्छाम", "class": "1P", "person": "1", "number": "pl"}},
+    {"sentence": "बालिका फलम् खादिष्यति", "tense": "future",
+     "subject": {"root": "बालिका", "form": "बालिका", "person": "3", "number": "sg"},
+     "object": {"root": "फल", "form": "फलम्", "person": "3", "number": "sg"},
+     "verb": {"root": "खाद्", "form": "खादिष्यति", "class": "1P", "person": "3", "number": "sg"}},
+    {"sentence": "", "tense": "", "object": None,
+     "subject": {"root": "नृप", "form": "नृपः"},
+     "verb": {"root": "पठ्", "form": "पठति", "class": "1P"}},
+]
+
+def _sentences(collection, query, projection=None):
+    return sorted(doc["sentence"] for doc in collection.find(query, projection))
+
+def check_number_game_filter(db):
+    return _sentences(db.sentences, {
+        "object": None,
+        "subject.person": {"$in": ["1", "2", "3"]},
+        "subject.number": {"$in": ["sg", "du", "pl"]}
+    })
+
+def check_verb_game_filter(db):
+    return _sentences(db.sentences, {
+        "sentence": {"$exists": True},
+        "verb.form": {"$exists": True},
+        "tense": {"$exists": True, "$in": ["present", "past", "future"]},
+        "subject.person": {"$exists": True},
+    })
+
+def check_tense_filter(db):
+    return _sentences(db.sentences, {"tense": {"$exists": True, "$ne": ""}, "sentence": {"$exists": True}})
+
+def check_projection(db):
+    doc = db.sentences.find_one({"tense": "past"}, {"_id": 0})
+    return sorted(doc)
+
+def check_count(db):
+    return [db.sentences.count_documents({}), db.sentences.count_documents({"verb.root": "गच्छ्"})]
+
+def check_users(db):
+    db.users.create_index("email", unique=True)
+    result = db.users.insert_one({"full_name": "Test", "email": "a@example.com", "password": b"hash", "score": 0})
+    user = db.users.find_one({"_id": result.inserted_id})
+    try:
+        db.users.insert_one({"full_name": "Dup", "email": "a@example.com", "password": b"x", "score": 0})
+        duplicate_rejected = False
+    except DuplicateKeyError:
+        duplicate_rejected = True
+    inc = db.users.update_one({"_id": result.inserted_id}, {"$inc": {"score": 5}})
+    db.users.update_one({"_id": result.inserted_id}, {"$inc": {"score": 2}})
+    missing = db.users.update_one({"email": "missing@example.com"}, {"$set": {"score": 1}})
+    saved = db.users.update_one({"email": "a@example.com"}, {"$set": {"score": 40}})
+    user_after = db.users.find_one({"email": "a@example.com"})
+    return [user["password"] == b"hash", duplicate_rejected, inc.matched_count, missing.matched_count,
+            saved.modified_count, user_after["score"]]
+
+def check_unordered_insert(db):
+    db.scratch.create_index("key", unique=True)
+    try:
+        db.scratch.insert_many([{"key": 1}, {"key": 1}, {"key": 2}], ordered=False)
+        raised = False
+    except BulkWriteError:
+        raised = True
+    return [raised, db.scratch.count_documents({})]
+
+def check_delete(db):
+    deleted = db.sentences.delete_many({"tense": ""}).deleted_count
+    return [deleted, db.sentences.count_documents({})]
+
+def check_bulk_write(db):
+    db.synced.insert_many([{"_id": "a", "v": 1}, {"_id": "b", "v": 1}, {"_id": "c", "v": 1}])
+    result = db.synced.bulk_write([
+        InsertOne({"_id": "d", "v": 1}),
+        ReplaceOne({"_id": "a"}, {"v": 2}),
+        ReplaceOne({"_id": "b"}, {"v": 1}),
+        ReplaceOne({"_id": "e"}, {"v": 5}, upsert=True),
+        DeleteOne({"_id": "c"}),
+    ], ordered=False)
+    replaced = db.synced.replace_one({"_id": "d"}, {"v": 9})
+    values = sorted([doc["_id"], doc["v"]] for doc in db.synced.find())
+    return [result.inserted_count, result.matched_count, result.modified_count, result.upserted_count,
+            result.deleted_count, replaced.modified_count, values]
+
+def check_ping(db):
+    return db.command("ping").get("ok")
+
+CHECKS = [
+    ("number_game_filter", check_number_game_filter,
+     ["बालकः गच्छति", "वयम् अगच्छाम"]),
+    ("verb_game_filter", check_verb_game_filter,
+     ["बालकः गच्छति", "बालिका फलम् खादिष्यति", "वयम् अगच्छाम"]),
+    ("tense_filter", check_tense_filter,
+     ["बालकः गच्छति", "बालिका फलम् खादिष्यति", "वयम् अगच्छाम"]),
+    ("projection", check_projection, ["object", "sentence", "subject", "tense", "verb"]),
+    ("count_documents", check_count, [4, 2]),
+    ("users", check_users, [True, True, 1, 0, 1, 40]),
+    ("unordered_insert", check_unordered_insert, [True, 2]),
+    ("delete_many", check_delete, [1, 3]),
+    ("bulk_write", check_bulk_write,
+     [1, 2, 1, 1, 1, 1, [["a", 2], ["b", 1], ["d", 9], ["e", 5]]]),
+    ("ping", check_ping, 1.0),
+]
+
+def run_checks(name, db):
+    db.sentences.insert_many([dict(doc) for doc in SENTENCES])
+    failures = 0
+    for check_name, check, expected in CHECKS:
+        try:
+            result = check(db)
+        except Exception as e:
+            result = f"error: {e}"
+        if result != expected:
+            failures += 1
+            print(f"[{name}] {check_name}: FAIL (got {result!r}, expected {expected!r})")
+        else:
+            print(f"[{name}] {check_name}: ok")
+    return failures
+
+def available_backends():
+    backends = [("embedded", lambda: EmbeddedClient(":memory:"))]
+    if os.getenv("MONGODB_URI"):
+        backends.append(("mongo", lambda: MongoClient(os.getenv("MONGODB_URI"), serverSelectionTimeoutMS=5000)))
+    else:
+        print("MONGODB_URI not set, skipping the MongoDB backend")
+    return backends
+
+def main():
+    failures = 0
+    for name, make_client in available_backends():
+        client = make_client()
+        try:
+            if name == "mongo":
+                client.drop_database(PARITY_DB_NAME)
+            failures += run_checks(name, client[PARITY_DB_NAME])
+        finally:
+            if name == "mongo":
+                client.drop_database(PARITY_DB_NAME)
+            client.close()
+    print("All parity checks passed" if not failures else f"{failures} parity check(s) failed")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
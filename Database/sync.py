@@ -0,0 +1,144 @@
+import hashlib
+import json
+import os
+from collections import Counter
+
+from pymongo import DeleteOne, InsertOne, ReplaceOne
+
+try:
+    from .db import get_db_connection
+    from .versions import current_collection, publish, publish_documents, stage_copy
+except ImportError:  # run as a script from inside Database/
+    from db import get_db_connection
+    from versions import current_collection, publish, publish_documents, stage_copy
+
+# Diff-based corpus sync.
+#
+# Every record is stamped with a stable _id derived from what it *is* (for a
+# sentence: tense, verb, subject and object with their numbers) and a
+# content_hash of what it *says*. A sync reads only (_id, content_hash) from
+# the published collection and works out just the inserts, replacements and
+# deletes needed. They are applied to a staged copy of the current version
+# (versions.stage_copy()), never to the collection readers are using, and the
+# copy is published, so an edit switches in atomically and can be rolled back.
+#
+# Only (_id, content_hash) pairs are held in memory; the records themselves
+# are streamed, from a second read of the source when changes are written.
+#
+# When most of the collection would change anyway (first sync of a database
+# loaded without ids, or a change above SYNC_MAX_CHANGE_RATIO of the corpus)
+# the records are loaded into an empty staged version instead, skipping the
+# copy.
+
+SYNC_MAX_CHANGE_RATIO = float(os.getenv("SYNC_MAX_CHANGE_RATIO", "0.5"))
+SYNC_BATCH_SIZE = int(os.getenv("SYNC_BATCH_SIZE", "1000"))
+
+def _sentence_identity(record):
+    subject = record.get("subject") or {}
+    verb = record.get("verb") or {}
+    obj = record.get("object") or {}
+    return [record.get("tense"), verb.get("root"), verb.get("class"), subject.get("root"),
+            subject.get("number"), obj.get("root"), obj.get("number")]
+
+def _matching_identity(record):
+    return [record.get("subject_root"), record.get("verb_root"), record.get("tense")]
+
+IDENTITIES = {
+    "sentences": _sentence_identity,
+    "matching_game": _matching_identity,
+}
+
+def _digest(value):
+    text = json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=12).hexdigest()
+
+def content_hash(record):
+    return _digest({k: v for k, v in record.items() if k not in ("_id", "content_hash")})
+
+def stamp(name, record, occurrence=0):
+    """Copy of record with its stable _id and content_hash."""
+    digest = content_hash(record)
+    identity = IDENTITIES.get(name)
+    key = identity(record) if identity else digest
+    # Records with the same identity keep distinct ids in stream order
+    uid = _digest([key, occurrence] if occurrence else key)
+    return dict({k: v for k, v in record.items() if k != "_id"}, _id=uid, content_hash=digest)
+
+def iter_stamped(name, records):
+    """Stamped copies of records, once per _id (records with the same content and no identity collapse)."""
+    seen = Counter()
+    emitted = set()
+    identity = IDENTITIES.get(name)
+    for record in records:
+        key = json.dumps(identity(record), ensure_ascii=False, default=str) if identity else None
+        occurrence = seen[key] if key is not None else 0
+        if key is not None:
+            seen[key] += 1
+        doc = stamp(name, record, occurrence)
+        if doc["_id"] not in emitted:
+            emitted.add(doc["_id"])
+            yield doc
+
+def _batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def sync_documents(name, records, batch_size=None, max_change_ratio=None):
+    """Bring the published collection in line with records; returns change counts.
+
+    records is a list, or a function returning a fresh iterator over them: a
+    large file is then read twice (hashes, then the changed documents) instead
+    of being held in memory.
+    """
+    batch_size = batch_size or SYNC_BATCH_SIZE
+    max_change_ratio = SYNC_MAX_CHANGE_RATIO if max_change_ratio is None else max_change_ratio
+    read = records if callable(records) else lambda: records
+    desired = {doc["_id"]: doc["content_hash"] for doc in iter_stamped(name, read())}
+    collection = current_collection(name)
+    stored = {doc["_id"]: doc.get("content_hash") for doc in collection.find({}, {"content_hash": 1})}
+
+    inserts = {uid for uid in desired if uid not in stored}
+    updates = {uid for uid in desired if uid in stored and stored[uid] != desired[uid]}
+    deletes = [uid for uid in stored if uid not in desired]
+    changed = len(inserts) + len(updates) + len(deletes)
+    report = {
+        "collection": name,
+        "inserted": len(inserts),
+        "updated": len(updates),
+        "deleted": len(deletes),
+        "unchanged": len(desired) - len(inserts) - len(updates),
+        "total": len(desired),
+    }
+    if not changed:
+        report["mode"] = "noop"
+        return report
+    if not stored or changed > max_change_ratio * len(stored):
+        report["version"] = publish_documents(name, iter_stamped(name, read()), batch_size)
+        report["mode"] = "publish"
+        return report
+
+    def operations():
+        for doc in iter_stamped(name, read()):
+            if doc["_id"] in inserts:
+                yield InsertOne(doc)
+            elif doc["_id"] in updates:
+                yield ReplaceOne({"_id": doc["_id"]}, doc)
+        for uid in deletes:
+            yield DeleteOne({"_id": uid})
+
+    version, staged = stage_copy(name, batch_size)
+    try:
+        for batch in _batches(operations(), batch_size):
+            staged.bulk_write(batch, ordered=False)
+        report["version"] = publish(name, version)
+    except Exception:
+        get_db_connection().drop_collection(version)
+        raise
+    report["mode"] = "diff"
+    return report
@@ -0,0 +1,170 @@
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+
+try:
+    from .db import get_db_connection
+except ImportError:  # run as a script from inside Database/
+    from db import get_db_connection
+
+# Versioned corpus collections.
+#
+# A load never touches the collection readers are using. It fills a fresh
+# staging collection ("sentences__v<ms>_<random>", so concurrent loads never
+# share one) and then flips a pointer document in collection_versions with a
+# single update, so readers see either the old corpus or the new one, never a
+# partial one. The version it replaced stays as "previous" for instant
+# rollback and the one before that is dropped. Other versions may be another
+# load still filling its stage, so only those older than STAGE_MAX_AGE_HOURS
+# (24) are treated as abandoned and dropped.
+#
+# Collections without a pointer (a database loaded before versioning) resolve
+# to their plain name, so existing deployments keep working.
+#
+# The pointer also carries a revision counter, bumped by every publish and
+# rollback. marker() combines the two, and the game servers poll it to notice
+# a new corpus and reload. Small edits go through stage_copy(): the change is
+# applied to a staged copy of the current version, which is then published,
+# so they get the same atomic switch and rollback as a full load.
+#
+#   python Database/versions.py list sentences
+#   python Database/versions.py rollback sentences
+
+POINTERS = "collection_versions"
+STAGE_MAX_AGE_HOURS = float(os.getenv("STAGE_MAX_AGE_HOURS", "24"))
+
+def _pointer(name):
+    return get_db_connection()[POINTERS].find_one({"_id": name})
+
+def resolve(name):
+    """Physical collection that currently holds the published version of name."""
+    pointer = _pointer(name)
+    return pointer["current"] if pointer else name
+
+def current_collection(name):
+    return get_db_connection()[resolve(name)]
+
+def marker(name):
+    """Changes whenever the published contents of name may have changed."""
+    pointer = _pointer(name)
+    return f"{pointer['current']}#{pointer.get('revision', 0)}" if pointer else name
+
+def stage(name):
+    version = f"{name}__v{int(time.time() * 1000)}_{uuid.uuid4().hex[:6]}"
+    return version, get_db_connection()[version]
+
+def _staged_at(version):
+    """When version was staged (epoch ms), or None for a name not made by stage()."""
+    try:
+        return int(version.rsplit("__v", 1)[1].split("_")[0])
+    except (IndexError, ValueError):
+        return None
+
+def publish(name, version):
+    """Point name at version in one atomic update, keeping the old version as previous."""
+    try:
+        from .indexes import ensure_indexes
+    except ImportError:  # run as a script from inside Database/
+        from indexes import ensure_indexes
+    db = get_db_connection()
+    # Readers only ever see a version once its indexes are built
+    ensure_indexes(name, db[version])
+    pointer = _pointer(name)
+    if pointer:
+        current = pointer["current"]
+    else:
+        # First versioned load: the plain collection (if any) becomes the rollback target
+        current = name if name in db.list_collection_names() else None
+    result = db[POINTERS].update_one(
+        {"_id": name, "current": current} if pointer else {"_id": name},
+        {"$set": {
+            "current": version,
+            "previous": current,
+            "published_at": datetime.now(timezone.utc).isoformat(),
+            "count": db[version].count_documents({})
+        }, "$inc": {"revision": 1}},
+        upsert=pointer is None
+    )
+    if not result.matched_count and result.upserted_id is None:
+        raise Exception(f"{name} was published concurrently; {version} was not made current")
+    _prune(name, keep={version, current}, displaced=pointer.get("previous") if pointer else None)
+    return version
+
+def _prune(name, keep, displaced=None):
+    db = get_db_connection()
+    cutoff = (time.time() - STAGE_MAX_AGE_HOURS * 3600) * 1000
+    for collection in list_versions(name):
+        if collection in keep:
+            continue
+        staged_at = _staged_at(collection)
+        if collection == displaced or (staged_at is not None and staged_at < cutoff):
+            db.drop_collection(collection)
+
+def rollback(name):
+    db = get_db_connection()
+    pointer = _pointer(name)
+    if not pointer or not pointer.get("previous"):
+        raise Exception(f"No previous version of {name} to roll back to")
+    result = db[POINTERS].update_one(
+        {"_id": name, "current": pointer["current"], "previous": pointer["previous"]},
+        {"$set": {
+            "current": pointer["previous"],
+            "previous": pointer["current"],
+            "published_at": datetime.now(timezone.utc).isoformat(),
+            "count": db[pointer["previous"]].count_documents({})
+        }, "$inc": {"revision": 1}}
+    )
+    if not result.matched_count:
+        raise Exception(f"{name} was published or rolled back concurrently; the rollback was not applied")
+    return pointer["previous"]
+
+def list_versions(name):
+    prefix = f"{name}__v"
+    return sorted(c for c in get_db_connection().list_collection_names() if c.startswith(prefix))
+
+def describe(name):
+    pointer = _pointer(name) or {"current": name, "previous": None}
+    pointer.pop("_id", None)
+    pointer["versions"] = list_versions(name)
+    return pointer
+
+def _insert_batches(collection, documents, batch_size):
+    batch = []
+    for doc in documents:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            collection.insert_many(batch)
+            batch = []
+    if batch:
+        collection.insert_many(batch)
+
+def stage_copy(name, batch_size=1000):
+    """Stage a new version of name holding a copy of the current one; returns (version, collection)."""
+    version, collection = stage(name)
+    try:
+        _insert_batches(collection, current_collection(name).find({}), batch_size)
+    except Exception:
+        get_db_connection().drop_collection(version)
+        raise
+    return version, collection
+
+def publish_documents(name, documents, batch_size=1000):
+    """Load documents into a new staging version of name and publish it."""
+    version, collection = stage(name)
+    try:
+        _insert_batches(collection, documents, batch_size)
+        return publish(name, version)
+    except Exception:
+        get_db_connection().drop_collection(version)
+        raise
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3 or sys.argv[1] not in ("list", "rollback"):
+        print("usage: python versions.py list|rollback <collection>")
+        sys.exit(1)
+    command, name = sys.argv[1:]
+    if command == "rollback":
+        print(f"{name} now points at {rollback(name)}")
+    print(describe(name))
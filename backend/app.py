@@ -15,20 +15,33 @@ print("Files in root directory:", os.listdir(root_path))
 print("Files in Database directory:", os.listdir(os.path.join(root_path, 'Database')))
 
 try:
-    from Database.db import get_db_connection
+    from Database.db import get_db_connection, get_collection, get_pool_stats
+    from Database.versions import current_collection, describe, rollback
+    from Database.sync import sync_documents
     print("Database module imported successfully")
 except Exception as e:
     print("Failed to import Database.db:", str(e))
     raise
 
-from flask import Flask, jsonify, send_from_directory, request
+from flask import Flask, Response, jsonify, send_from_directory, request
 from flask_cors import CORS
 import subprocess
 import threading
+import importlib
+import argparse
 import time
-import requests
-import json
 from bson.json_util import dumps
+from werkzeug.serving import make_server
+from backend.helpers.upstream import Upstream
+from backend.helpers.health import HealthProber
+from backend.helpers.supervisor import ProcessSupervisor
+from backend.helpers.jobs import JobQueue
+from backend.helpers.wsgi import production_mode_requested, serve
+from backend.helpers.lexicon import DATASET_DIR
+from backend.helpers.jsonio import iter_records
+from backend.helpers.build_manifest import is_current, mark_synced
+from backend.helpers.streams import STREAM_HEADER
+from backend.helpers.reloader import admin_headers
 
 # Load environment variables
 load_dotenv()
@@ -41,7 +54,8 @@ app = Flask(__name__)
 CORS(app, resources={r"/api/*": {
     "origins": ["http://localhost:5173"],
     "methods": ["GET", "POST", "OPTIONS"],
-    "allow_headers": ["Content-Type", "Authorization"]
+    "allow_headers": ["Content-Type", "Authorization"],
+    "expose_headers": [STREAM_HEADER]
 }})
 
 # === Configuration ===
@@ -53,13 +67,81 @@ MTC_GAME_PORT = 5005
 DATABASE_PORT = 5006
 MAIN_PORT = 5000
 
-# === Server process holders ===
-sans_sent_process = None
-verb_game_process = None
-tense_game_process = None
-number_game_process = None
-mtc_game_process = None
-
+# === Upstream connection pools (see backend/helpers/upstream.py for limits) ===
+upstreams = {
+    "sentence_game": Upstream("sentence_game", f"http://localhost:{SANS_SENT_PORT}"),
+    "verb_game": Upstream("verb_game", f"http://localhost:{VERB_GAME_PORT}"),
+    "tense_game": Upstream("tense_game", f"http://localhost:{TENSE_GAME_PORT}"),
+    "number_game": Upstream("number_game", f"http://localhost:{NUMBER_GAME_PORT}"),
+    "matching_game": Upstream("matching_game", f"http://localhost:{MTC_GAME_PORT}"),
+    "database": Upstream("database", f"http://localhost:{DATABASE_PORT}"),
+}
+
+# Probes every upstream concurrently in the background; status routes read its table
+prober = HealthProber(upstreams)
+
+RELAYED_HEADERS = (STREAM_HEADER, "ETag", "Cache-Control")
+
+def relay(response):
+    # Pass the upstream body through as-is instead of decoding and re-encoding it
+    relayed = Response(response.content, status=response.status_code,
+                       content_type=response.headers.get("Content-Type", "application/json"))
+    for header in RELAYED_HEADERS:
+        if header in response.headers:
+            relayed.headers[header] = response.headers[header]
+    return relayed
+
+# === Game servers: (upstream name, module in servers/, port, label) ===
+GAME_SERVERS = [
+    ("sentence_game", "sans_sent_game", SANS_SENT_PORT, "Sentence Game Server"),
+    ("verb_game", "verb_game", VERB_GAME_PORT, "Verb Game Server"),
+    ("tense_game", "tense_game", TENSE_GAME_PORT, "Tense Game Server"),
+    ("number_game", "number_game", NUMBER_GAME_PORT, "Number Game Server"),
+    ("matching_game", "mtcGame", MTC_GAME_PORT, "Matching Game Server"),
+]
+
+# === Consolidated mode ===
+# GAME_MODE=consolidated (or --consolidated) imports every game into this
+# process instead of spawning five interpreters. All games share one corpus
+# through backend.helpers.corpus_store, the gateway calls their views directly
+# and each game's app is still served on its usual port so existing URLs work.
+local_games = {}
+local_servers = []
+
+def consolidated_mode_requested():
+    return os.getenv("GAME_MODE", "processes").lower() == "consolidated"
+
+def load_consolidated_games():
+    from backend.helpers import corpus_store
+    corpus_store.enable_shared_corpus()
+    for name, module_name, port, server_name in GAME_SERVERS:
+        start = time.perf_counter()
+        module = importlib.import_module(f"backend.servers.{module_name}")
+        local_games[module_name] = module
+        app.register_blueprint(module.bp, url_prefix=f"/games/{module_name}")
+        logger.info(f"Loaded {server_name} in-process in {time.perf_counter() - start:.2f}s")
+    return local_games
+
+def start_consolidated_servers():
+    for name, module_name, port, server_name in GAME_SERVERS:
+        try:
+            server = make_server("0.0.0.0", port, local_games[module_name].app, threaded=True)
+        except Exception as e:
+            logger.error(f"Error serving {server_name} on port {port}: {str(e)}")
+            continue
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        local_servers.append(server)
+        logger.info(f"{server_name} serving in-process on port {port}")
+
+def port_dispatcher():
+    # Production consolidated mode: gunicorn binds every game port and routes
+    # each request to the game app that owns the port it arrived on
+    apps = {str(port): local_games[module_name].app for name, module_name, port, server_name in GAME_SERVERS}
+    def dispatch(environ, start_response):
+        return apps.get(environ.get("SERVER_PORT"), app)(environ, start_response)
+    return dispatch
+
+# === Process mode: one child per game, supervised ===
 def start_server(script_path, port, server_name):
     try:
         logger.info(f"Starting {server_name} on port {port}...")
@@ -88,37 +170,104 @@ def start_server(script_path, port, server_name):
         logger.error(f"Error starting {server_name}: {str(e)}")
         return None
 
-def check_server_health(port, server_name):
+def spawn_game_server(name):
+    for upstream_name, module_name, port, server_name in GAME_SERVERS:
+        if upstream_name == name:
+            return start_server(f"{module_name}.py", port, server_name)
+    return None
+
+def probe_game_server(name):
+    upstream = upstreams[name]
     try:
-        response = requests.get(f"http://localhost:{port}/health", timeout=5)
-        return response.status_code == 200
-    except Exception as e:
-        logger.warning(f"Health check failed for {server_name}: {str(e)}")
+        return upstream.session.get(upstream.base_url + "/health", timeout=1).status_code == 200
+    except Exception:
         return False
 
+def drain_game_server(name, draining):
+    # Stop routing new proxy calls to the server, then let in-flight ones finish
+    upstream = upstreams[name]
+    upstream.draining = draining
+    if draining and not upstream.wait_idle(float(os.getenv("SUPERVISOR_DRAIN_TIMEOUT", "10"))):
+        logger.warning(f"{name} still had {upstream.in_flight} requests in flight after draining")
+
+supervisor = ProcessSupervisor(spawn_game_server, probe_game_server, drain=drain_game_server)
+
+# === Generation jobs ===
+# Generating and loading a corpus runs in the job queue's worker thread
+# through the generators' generate() API; the routes only enqueue and return
+# a job to poll at /api/jobs/<id>.
+
+GENERATORS = {
+    "sentences": {"module": "backend.dataset.gen", "script": "gen.py", "output": "sentences.json", "label": "Sentences"},
+    "matching_game": {"module": "backend.dataset.mtc_gen", "script": "mtc_gen.py", "output": "matching_game.json", "label": "Matching game data"},
+}
+
+def generation_runner(kind):
+    generator = GENERATORS[kind]
+
+    def run(job, force=False):
+        with job.stage("generate"):
+            module = importlib.import_module(generator["module"])
+            report = module.generate(force=force, on_shard=lambda shard: job.update(
+                shards_done=shard["done"], shards_total=shard["total"]))
+        output = report["path"]
+        generated = {"count": report["count"], "rebuilt": len(report["rebuilt"]), "reused": report["reused"]}
+        job.update(**generated)
+        if report["noop"] and is_current(output, DATASET_DIR / generator["script"], require_synced=True):
+            return {"generated": generated, "changes": {"mode": "noop"}}
+        with job.stage("load"):
+            # Write only the records that changed since the last load, streaming
+            # the file (read twice) rather than holding it in this worker
+            changes = sync_documents(kind, lambda: iter_records(output))
+            mark_synced(output)
+        if changes.get("mode") != "noop":
+            reload_games(kind)
+        return {"generated": generated, "changes": changes}
+    return run
+
+jobs = JobQueue({kind: generation_runner(kind) for kind in GENERATORS}, DATASET_DIR / ".jobs")
+
+# === Corpus reloads ===
+# Game servers poll the corpus version and reload by themselves (see
+# helpers/reloader.py); after a load or rollback the gateway asks the affected
+# ones to reload right away instead of at their next poll.
+RELOADS = {
+    "sentences": ["sentence_game", "verb_game", "tense_game", "number_game"],
+    "verbs": ["verb_game"],
+    "conjugations": ["verb_game"],
+    "matching_game": ["matching_game"],
+}
+
+def reload_games(collection):
+    for name, module_name, port, server_name in GAME_SERVERS:
+        if name not in RELOADS.get(collection, []):
+            continue
+        try:
+            if local_games:
+                local_games[module_name].corpus.trigger()
+            else:
+                upstreams[name].post("/admin/reload", headers=admin_headers())
+        except Exception as e:
+            logger.warning(f"Could not reload {server_name}: {str(e)}")
+
+def enqueue_generation(kind):
+    generator = GENERATORS[kind]
+    force = request.args.get("force") == "1"
+    try:
+        if not force and is_current(DATASET_DIR / generator["output"], DATASET_DIR / generator["script"], require_synced=True):
+            # Same inputs as the last build, which is already loaded
+            return jsonify({"status": "success", "message": f"{generator['label']} up to date", "changes": {"mode": "noop"}})
+        job, created = jobs.submit(kind, force=force)
+        message = f"{generator['label']} generation queued" if created else f"{generator['label']} generation already in progress"
+        return jsonify({"status": job.status, "message": message, "job": job.to_dict(), "poll": f"/api/jobs/{job.id}"}), 202
+    except Exception as e:
+        logger.error(f"Error queueing {kind} generation: {str(e)}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+for name, module_name, port, server_name in GAME_SERVERS:
+    supervisor.add(name, port, server_name)
+
 def start_background_servers():
-    global sans_sent_process, verb_game_process, tense_game_process, number_game_process, mtc_game_process
-    sans_sent_process = start_server("sans_sent_game.py", SANS_SENT_PORT, "Sentence Game Server")
-    verb_game_process = start_server("verb_game.py", VERB_GAME_PORT, "Verb Game Server")
-    tense_game_process = start_server("tense_game.py", TENSE_GAME_PORT, "Tense Game Server")
-    number_game_process = start_server("number_game.py", NUMBER_GAME_PORT, "Number Game Server")
-    mtc_game_process = start_server("mtcGame.py", MTC_GAME_PORT, "Matching Game Server")
-    for port, name in [
-        (SANS_SENT_PORT, "Sentence Game"),
-        (VERB_GAME_PORT, "Verb Game"),
-        (TENSE_GAME_PORT, "Tense Game"),
-        (NUMBER_GAME_PORT, "Number Game"),
-        (MTC_GAME_PORT, "Matching Game"),
-        (DATABASE_PORT, "Database")
-    ]:
-        for _ in range(5):
-            if check_server_health(port, name):
-                logger.info(f"✓ {name} Server is running")
-                break
-            logger.warning(f"Waiting for {name} Server...")
-            time.sleep(1)
-        else:
-            logger.error(f"✗ {name} Server failed to start")
+    return supervisor.start_all()
 
 # === Routes ===
 @app.route('/')
@@ -165,8 +314,7 @@ def number_game():
 @app.route('/api/sentences')
 def get_sentences():
     try:
-        db = get_db_connection()
-        sentences = list(db.sentences.find())
+        sentences = list(current_collection("sentences").find())
         return jsonify(dumps(sentences)), 200
     except Exception as e:
         logger.error(f"Error loading sentences: {str(e)}")
@@ -174,9 +322,11 @@ def get_sentences():
 
 @app.route('/api/get-game')
 def get_verb_game():
+    if local_games:
+        return local_games["verb_game"].get_game()
     try:
-        response = requests.get(f"http://localhost:{VERB_GAME_PORT}/api/get-game", timeout=10)
-        return jsonify(response.json()) if response.ok else jsonify({"error": "Failed to get game data"}), response.status_code
+        response = upstreams["verb_game"].get("/api/get-game", params=request.args)
+        return relay(response) if response.ok else jsonify({"error": "Failed to get game data"}), response.status_code
     except Exception as e:
         logger.error(f"Error fetching verb game data: {str(e)}")
         return jsonify({"error": str(e)}), 503
@@ -189,71 +339,78 @@ def get_number_game():
         response.headers.add('Access-Control-Allow-Methods', 'GET, OPTIONS')
         response.headers.add('Access-Control-Allow-Headers', 'Content-Type, Authorization')
         return response
+    if local_games:
+        return local_games["number_game"].get_sentence()
     try:
         headers = {}
         auth_header = request.headers.get('Authorization')
         if auth_header:
             headers['Authorization'] = auth_header
-        response = requests.get(f"http://localhost:{NUMBER_GAME_PORT}/api/get-number-game", headers=headers, timeout=10)
-        return jsonify(response.json()) if response.ok else jsonify({"error": "Failed to get number game data"}), response.status_code
+        response = upstreams["number_game"].get("/api/get-number-game", headers=headers, params=request.args)
+        return relay(response) if response.ok else jsonify({"error": "Failed to get number game data"}), response.status_code
     except Exception as e:
         logger.error(f"Error fetching number game data: {str(e)}")
         return jsonify({"error": str(e)}), 503
 
-@app.route('/api/generate-matching-game')
+@app.route('/api/generate-matching-game', methods=['GET', 'POST'])
 def generate_matching_game():
-    try:
-        dataset_path = Path(root_path) / "dataset"
-        if not dataset_path.exists():
-            logger.error("Dataset directory not found")
-            return jsonify({"status": "error", "message": "Dataset directory not found"}), 404
-        os.chdir(dataset_path)
-        result = subprocess.run([sys.executable, "mtc_gen.py"], capture_output=True, text=True)
-        os.chdir(Path(__file__).parent)
-        if result.returncode == 0:
-            # Reload generated matching_game.json into MongoDB
-            db = get_db_connection()
-            with open(dataset_path / 'matching_game.json', 'r', encoding='utf-8-sig') as f:
-                data = json.load(f)
-            db.matching_game.delete_many({})
-            db.matching_game.insert_many(data)
-            return jsonify({"status": "success", "message": "Matching game data generated and loaded to MongoDB", "output": result.stdout})
-        else:
-            logger.error(f"Failed to generate matching game data: {result.stderr}")
-            return jsonify({"status": "error", "message": "Failed to generate matching game data", "error": result.stderr}), 500
-    except Exception as e:
-        logger.error(f"Error running mtc_gen.py: {str(e)}")
-        return jsonify({"status": "error", "message": f"Error running mtc_gen.py: {str(e)}"}), 500
+    return enqueue_generation("matching_game")
+
+# === Matching game ===
+# Served from the matching game server's snapshot, the same bytes and ETag it
+# serves on its own port; the ETag follows the corpus version, so a client's
+# If-None-Match is passed through and answered with a 304 there.
 
 @app.route('/api/get-matching-game')
 def get_matching_game():
     try:
-        db = get_db_connection()
-        data = list(db.matching_game.find())
-        return jsonify(dumps(data)), 200
+        if local_games:
+            return local_games["mtcGame"].get_matching_game()
+        headers = {"If-None-Match": request.headers["If-None-Match"]} if "If-None-Match" in request.headers else {}
+        return relay(upstreams["matching_game"].get("/api/get-matching-game", params=request.args, headers=headers))
     except Exception as e:
         logger.error(f"Error loading matching game data: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/tense-question')
 def proxy_tense_question():
+    if local_games:
+        return local_games["tense_game"].get_tense_question()
     try:
-        response = requests.get(f"http://localhost:{TENSE_GAME_PORT}/api/get-tense-question", timeout=10)
-        return jsonify(response.json()) if response.ok else jsonify({"error": "Failed to get tense question"}), response.status_code
+        response = upstreams["tense_game"].get("/api/get-tense-question", params=request.args)
+        return relay(response) if response.ok else jsonify({"error": "Failed to get tense question"}), response.status_code
     except Exception as e:
         logger.error(f"Tense Game server error: {str(e)}")
         return jsonify({"error": f"Tense Game server error: {str(e)}"}), 503
 
+@app.route('/api/random-sentence')
+def proxy_random_sentence():
+    if local_games:
+        return local_games["sans_sent_game"].get_random_sentence()
+    try:
+        response = upstreams["sentence_game"].get("/get_random_sentence", params=request.args)
+        return relay(response) if response.ok else jsonify({"error": "Failed to get sentence"}), response.status_code
+    except Exception as e:
+        logger.error(f"Sentence Game server error: {str(e)}")
+        return jsonify({"error": f"Sentence Game server error: {str(e)}"}), 503
+
 @app.route('/api/status')
 def system_status():
+    prober.start()
+    health = prober.snapshot()
     return jsonify({
         "main_server": "online",
-        "sentence_game_server": "online" if check_server_health(SANS_SENT_PORT, "Sentence Game") else "offline",
-        "verb_game_server": "online" if check_server_health(VERB_GAME_PORT, "Verb Game") else "offline",
-        "tense_game_server": "online" if check_server_health(TENSE_GAME_PORT, "Tense Game") else "offline",
-        "number_game_server": "online" if check_server_health(NUMBER_GAME_PORT, "Number Game") else "offline",
-        "matching_game_server": "online" if check_server_health(MTC_GAME_PORT, "Matching Game") else "offline",
-        "database_server": "online" if check_server_health(DATABASE_PORT, "Database") else "offline",
+        "sentence_game_server": health["sentence_game"]["status"],
+        "verb_game_server": health["verb_game"]["status"],
+        "tense_game_server": health["tense_game"]["status"],
+        "number_game_server": health["number_game"]["status"],
+        "matching_game_server": health["matching_game"]["status"],
+        "database_server": health["database"]["status"],
+        "health": health,
+        "database_pool": get_pool_stats(),
+        "mode": "consolidated" if local_games else "processes",
+        "upstreams": {name: upstream.stats() for name, upstream in upstreams.items()},
+        "supervisor": supervisor.stats(),
         "ports": {
             "main": MAIN_PORT,
             "sentence_game": SANS_SENT_PORT,
@@ -265,76 +422,92 @@ def system_status():
         }
     })
 
+def server_status(name, port):
+    prober.start()
+    entry = prober.get(name)
+    return jsonify({
+        "status": entry["status"],
+        "port": port,
+        "url": f"http://localhost:{port}",
+        "latency_ms": entry["latency_ms"],
+        "last_seen": entry["last_seen"],
+        "failures": entry["failures"]
+    })
+
 @app.route('/api/sentence-status')
 def sentence_status():
-    status = check_server_health(SANS_SENT_PORT, "Sentence Game")
-    return jsonify({"status": "online" if status else "offline", "port": SANS_SENT_PORT, "url": f"http://localhost:{SANS_SENT_PORT}"})
+    return server_status("sentence_game", SANS_SENT_PORT)
 
 @app.route('/api/verb-status')
 def verb_status():
-    status = check_server_health(VERB_GAME_PORT, "Verb Game")
-    return jsonify({"status": "online" if status else "offline", "port": VERB_GAME_PORT, "url": f"http://localhost:{VERB_GAME_PORT}"})
+    return server_status("verb_game", VERB_GAME_PORT)
 
 @app.route('/api/tense-status')
 def tense_status():
-    status = check_server_health(TENSE_GAME_PORT, "Tense Game")
-    return jsonify({"status": "online" if status else "offline", "port": TENSE_GAME_PORT, "url": f"http://localhost:{TENSE_GAME_PORT}"})
+    return server_status("tense_game", TENSE_GAME_PORT)
 
 @app.route('/api/number-status')
 def number_status():
-    status = check_server_health(NUMBER_GAME_PORT, "Number Game")
-    return jsonify({"status": "online" if status else "offline", "port": NUMBER_GAME_PORT, "url": f"http://localhost:{NUMBER_GAME_PORT}"})
+    return server_status("number_game", NUMBER_GAME_PORT)
 
 @app.route('/api/mtc-status')
 def mtc_status():
-    status = check_server_health(MTC_GAME_PORT, "Matching Game")
-    return jsonify({"status": "online" if status else "offline", "port": MTC_GAME_PORT, "url": f"http://localhost:{MTC_GAME_PORT}"})
+    return server_status("matching_game", MTC_GAME_PORT)
 
 @app.route('/api/database-status')
 def database_status():
-    status = check_server_health(DATABASE_PORT, "Database")
-    return jsonify({"status": "online" if status else "offline", "port": DATABASE_PORT, "url": f"http://localhost:{DATABASE_PORT}"})
+    return server_status("database", DATABASE_PORT)
 
 @app.route('/api/restart-servers')
 def restart_servers():
-    global sans_sent_process, verb_game_process, tense_game_process, number_game_process, mtc_game_process
-    for process, name in [
-        (sans_sent_process, "Sentence Game Server"),
-        (verb_game_process, "Verb Game Server"),
-        (tense_game_process, "Tense Game Server"),
-        (number_game_process, "Number Game Server"),
-        (mtc_game_process, "Matching Game Server")
-    ]:
-        if process:
-            process.terminate()
-            logger.info(f"Stopped {name}")
-    threading.Thread(target=start_background_servers, daemon=True).start()
-    return jsonify({"message": "Servers are restarting..."})
+    if local_games:
+        return jsonify({"message": "Games run in-process (consolidated mode); nothing to restart"})
+    threading.Thread(target=supervisor.rolling_restart, daemon=True).start()
+    return jsonify({"message": "Servers are restarting one at a time..."})
+
+@app.route('/api/supervisor')
+def supervisor_status():
+    return jsonify(supervisor.stats())
 
-@app.route('/api/generate-sentences')
+@app.route('/api/generate-sentences', methods=['GET', 'POST'])
 def generate_sentences():
+    return enqueue_generation("sentences")
+
+@app.route('/api/jobs', methods=['GET', 'POST'])
+def list_jobs():
+    if request.method == 'POST':
+        body = request.get_json(silent=True) or {}
+        if body.get("kind") not in GENERATORS:
+            return jsonify({"error": f"kind must be one of {', '.join(GENERATORS)}"}), 400
+        job, created = jobs.submit(body["kind"], force=bool(body.get("force")))
+        return jsonify({"job": job.to_dict(), "created": created, "poll": f"/api/jobs/{job.id}"}), 202
+    return jsonify({"jobs": jobs.list()})
+
+@app.route('/api/jobs/<job_id>')
+def job_status(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": f"No job {job_id}"}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/corpus-versions')
+def corpus_versions():
     try:
-        dataset_path = Path(root_path) / "dataset"
-        if not dataset_path.exists():
-            logger.error("Dataset directory not found")
-            return jsonify({"status": "error", "message": "Dataset directory not found"}), 404
-        os.chdir(dataset_path)
-        result = subprocess.run([sys.executable, "gen.py"], capture_output=True, text=True)
-        os.chdir(Path(__file__).parent)
-        if result.returncode == 0:
-            # Reload generated sentences.json into MongoDB
-            db = get_db_connection()
-            with open(dataset_path / 'sentences.json', 'r', encoding='utf-8-sig') as f:
-                data = json.load(f)
-            db.sentences.delete_many({})
-            db.sentences.insert_many(data)
-            return jsonify({"status": "success", "message": "Sentences generated and loaded to MongoDB", "output": result.stdout})
-        else:
-            logger.error(f"Failed to generate sentences: {result.stderr}")
-            return jsonify({"status": "error", "message": result.stderr}), 500
+        return jsonify({name: describe(name) for name in ["sentences", "matching_game", "verbs", "nouns", "conjugations"]})
     except Exception as e:
-        logger.error(f"Error running gen.py: {str(e)}")
-        return jsonify({"status": "error", "message": str(e)}), 500
+        logger.error(f"Error reading corpus versions: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/rollback-corpus/<name>', methods=['POST'])
+def rollback_corpus(name):
+    try:
+        version = rollback(name)
+        reload_games(name)
+        logger.info(f"Rolled {name} back to {version}")
+        return jsonify({"status": "success", "collection": name, "current": version})
+    except Exception as e:
+        logger.error(f"Error rolling back {name}: {str(e)}")
+        return jsonify({"status": "error", "message": str(e)}), 400
 
 @app.route('/api/register', methods=['POST', 'OPTIONS'])
 def register_user():
@@ -345,8 +518,8 @@ def register_user():
         response.headers.add('Access-Control-Allow-Headers', 'Content-Type, Authorization')
         return response
     try:
-        response = requests.post(f'http://localhost:{DATABASE_PORT}/api/register', json=request.json, timeout=10)
-        return jsonify(response.json()), response.status_code
+        response = upstreams["database"].post('/api/register', json=request.json)
+        return relay(response)
     except Exception as e:
         logger.error(f"Error proxying register: {str(e)}")
         return jsonify({'error': 'Database server unavailable'}), 503
@@ -360,8 +533,8 @@ def login():
         response.headers.add('Access-Control-Allow-Headers', 'Content-Type, Authorization')
         return response
     try:
-        response = requests.post(f'http://localhost:{DATABASE_PORT}/api/login', json=request.json, timeout=10)
-        return jsonify(response.json()), response.status_code
+        response = upstreams["database"].post('/api/login', json=request.json)
+        return relay(response)
     except Exception as e:
         logger.error(f"Error proxying login: {str(e)}")
         return jsonify({'error': 'Database server unavailable'}), 503
@@ -376,8 +549,8 @@ def get_profile():
         return response
     try:
         headers = {'Authorization': request.headers.get('Authorization')}
-        response = requests.get(f'http://localhost:{DATABASE_PORT}/api/profile', headers=headers, timeout=10)
-        return jsonify(response.json()), response.status_code
+        response = upstreams["database"].get('/api/profile', headers=headers)
+        return relay(response)
     except Exception as e:
         logger.error(f"Error proxying profile: {str(e)}")
         return jsonify({'error': 'Database server unavailable'}), 503
@@ -392,8 +565,8 @@ def update_score():
         return response
     try:
         headers = {'Authorization': request.headers.get('Authorization')}
-        response = requests.post(f'http://localhost:{DATABASE_PORT}/api/update-score', json=request.json, headers=headers, timeout=10)
-        return jsonify(response.json()), response.status_code
+        response = upstreams["database"].post('/api/update-score', json=request.json, headers=headers)
+        return relay(response)
     except Exception as e:
         logger.error(f"Error proxying update-score: {str(e)}")
         return jsonify({'error': 'Database server unavailable'}), 503
@@ -401,28 +574,35 @@ def update_score():
 @app.route('/api/test', methods=['GET'])
 def test_endpoint():
     try:
-        response = requests.get(f'http://localhost:{DATABASE_PORT}/api/test', timeout=10)
-        return jsonify(response.json()), response.status_code
+        response = upstreams["database"].get('/api/test')
+        return relay(response)
     except Exception as e:
         logger.error(f"Error proxying test: {str(e)}")
         return jsonify({'error': 'Database server unavailable'}), 503
 
 def cleanup_processes():
-    global sans_sent_process, verb_game_process, tense_game_process, number_game_process, mtc_game_process
-    for process, name in [
-        (sans_sent_process, "Sentence Game Server"),
-        (verb_game_process, "Verb Game Server"),
-        (tense_game_process, "Tense Game Server"),
-        (number_game_process, "Number Game Server"),
-        (mtc_game_process, "Matching Game Server")
-    ]:
-        if process:
-            process.terminate()
-            logger.info(f"Stopped {name}")
+    supervisor.stop_all()
 
-if __name__ == '__main__':
+def start_process_mode():
+    # Runs in the one process that serves the gateway: the supervisor's child
+    # handles, the health table and the upstream counters all live there
     import atexit
-    logger.info("🕉️ Starting Sanskrit Learning System...")
     atexit.register(cleanup_processes)
     threading.Thread(target=start_background_servers, daemon=True).start()
-    app.run(debug=False, host='0.0.0.0', port=MAIN_PORT, use_reloader=False)
\ No newline at end of file
+    prober.start()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--consolidated', action='store_true', help='Run every game in this process over one shared corpus')
+    args = parser.parse_args()
+    logger.info("🕉️ Starting Sanskrit Learning System...")
+    if args.consolidated or consolidated_mode_requested():
+        load_consolidated_games()
+        if production_mode_requested():
+            serve(port_dispatcher(), MAIN_PORT, "gateway", extra_ports=[port for name, module_name, port, server_name in GAME_SERVERS])
+            sys.exit(0)
+        start_consolidated_servers()
+        prober.start()
+        serve(app, MAIN_PORT, "gateway")
+        sys.exit(0)
+    serve(app, MAIN_PORT, "gateway", workers=1, on_start=start_process_mode)
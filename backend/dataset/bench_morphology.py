@@ -0,0 +1,66 @@
+import argparse
+import os
+import sys
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from backend.helpers.lexicon import Lexicon, NUMBERS, TENSES
+from backend.helpers.morphology import Morphology, PERSONS
+
+# Benchmark: verb forms per second with the old per-call construction
+# (stem selection, halant stripping and suffix.replace on every form, as in
+# gen.py / verb_game.generate_distractors) against the compiled tables.
+#
+#   python bench_morphology.py [--rounds N]
+
+def bench(label, rounds, total_forms, fn):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    elapsed = time.perf_counter() - start
+    rate = rounds * total_forms / elapsed
+    print(f"{label:<32} {rate:>14,.0f} forms/sec")
+    return rate
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark verb form construction")
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    lexicon = Lexicon()
+    start = time.perf_counter()
+    morphology = Morphology(lexicon)
+    compile_ms = (time.perf_counter() - start) * 1000
+    verbs = lexicon.verbs
+    total_forms = len(verbs) * len(TENSES) * len(PERSONS) * len(NUMBERS)
+    print(f"Compiled {len(morphology.forms)} verb forms and {len(morphology.paradigms)} paradigms in {compile_ms:.1f} ms")
+
+    def per_call():
+        for verb in verbs:
+            for tense in TENSES:
+                for person in PERSONS:
+                    for number in NUMBERS:
+                        lexicon.get_verb_form(verb, person, number, tense)
+
+    def lookup():
+        verb_form = morphology.verb_form
+        for verb in verbs:
+            root, verb_class = verb["root"], verb["verb_class"]
+            for tense in TENSES:
+                for person in PERSONS:
+                    for number in NUMBERS:
+                        verb_form(root, verb_class, tense, person, number)
+
+    def paradigms():
+        paradigm = morphology.paradigm
+        for verb in verbs:
+            root, verb_class = verb["root"], verb["verb_class"]
+            for tense in TENSES:
+                list(paradigm(root, verb_class, tense).values())
+
+    before = bench("before: per-call construction", args.rounds, total_forms, per_call)
+    after = bench("after: compiled form lookup", args.rounds, total_forms, lookup)
+    full = bench("after: paradigm() per verb", args.rounds, total_forms, paradigms)
+    print(f"speedup: {after / before:.1f}x per form, {full / before:.1f}x for full paradigms")
+
+if __name__ == "__main__":
+    main()
@@ -1,199 +1,210 @@
-import json
-from declensions import (
-    a_stem_masc_declension,
-    ā_stem_fem_declension,
-    a_stem_neut_declension,
-    asmad_declension,
-    yushmad_declension
-)
-
-# Load nouns
-with open("nouns.json", "r", encoding="utf-8") as f:
-    noun_groups = json.load(f)
-
-nouns = []
-for key, roots in noun_groups.items():
-    parts = key.split("_")
-    gender = None if parts[0] == "none" else parts[0]
-    stem = None if parts[1] == "none" else parts[1]
-    for root, info in roots.items():
-        nouns.append({
-            "root": root,
-            "gender": gender,
-            "stem_type": stem,
-            "entity_classes": info["entity_classes"],
-            "usable_as_subject": info["usable_as_subject"],
-            "usable_as_object": info["usable_as_object"]
-        })
-
-# Load conjugations (now supports tenses)
-with open("conjugations.json", "r", encoding="utf-8") as f:
-    conjugations = json.load(f)
-
-# Load verbs and flatten
-with open("verbs.json", "r", encoding="utf-8") as f:
-    raw_verbs = json.load(f)
-
-verbs = []
-for verb_class, content in raw_verbs.items():
-    for verb_entry in content["verbs"]:
-        verb_entry["verb_class"] = verb_class
-        verbs.append(verb_entry)
-
-# Declensions
-declension_map = {
-    ("masc", "अ"): a_stem_masc_declension,
-    ("fem", "आ"): ā_stem_fem_declension,
-    ("neut", "अ"): a_stem_neut_declension
-}
-
-role_to_vibhakti = {
-    "subject": "प्रथमा",
-    "object": "द्वितीया"
-}
-
-number_index = {
-    "sg": 0,
-    "du": 1,
-    "pl": 2
-}
-
-def inflect_noun(noun, role):
-    root = noun["root"]
-    number = noun.get("number", "sg")
-    index = number_index[number]
-    vibhakti = role_to_vibhakti[role]
-
-    if root == "अस्मद्":
-        return asmad_declension[vibhakti][index]
-    elif root == "युष्मद्":
-        return yushmad_declension[vibhakti][index]
-
-    gender = noun.get("gender")
-    stem = noun.get("stem_type")
-    decl_table = declension_map.get((gender, stem))
-    if not decl_table or vibhakti not in decl_table:
-        return root
-
-    suffix = decl_table[vibhakti][index]
-
-    if gender == "fem" and stem == "आ":
-        return (root[:-1] if root.endswith("ा") else root) + suffix
-    else:
-        return root + suffix
-
-def get_verb_form(verb, person, number, tense="present"):
-    key = f"{person}_{number}"
-    verb_class = verb["verb_class"]
-
-    try:
-        suffix = conjugations[tense][verb_class][key]
-    except KeyError:
-        return verb["root"]  # fallback
-
-    # Choose the appropriate stem
-    if tense == "future":
-        stem = verb.get("future_stem", verb["root"])
-    elif tense == "past":
-        stem = verb.get("past_stem", verb["root"])
-    else:
-        stem = verb["root"]
-
-    # 🔻 Drop halant for all EXCEPT present 4P
-    if not (tense == "present" and verb_class == "4P"):
-        if stem.endswith("्"):
-            stem = stem[:-1]
-
-    return stem + suffix.replace("A", "")
-
-def get_valid_nouns(entity_class, role):
-    key = "usable_as_subject" if role == "subject" else "usable_as_object"
-    return [
-        n.copy() for n in nouns
-        if entity_class in n["entity_classes"] and n.get(key, False)
-    ]
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from backend.helpers.lexicon import DATASET_DIR, NUMBERS, TENSES, Lexicon
+from backend.helpers.morphology import Morphology
+from backend.helpers.jsonio import encoder_for
+from backend.helpers.build_manifest import build_partitioned, partition_fingerprint
+
+# Nouns, verbs, conjugations and declensions (shared with the virtual corpus
+# in backend/helpers/corpus.py so both produce identical sentences)
+def load_inputs(dataset_dir=None):
+    """(Re)read the dataset files; everything below works on these globals."""
+    global lexicon, nouns, conjugations, verbs, morphology, noun_index
+    lexicon = Lexicon(dataset_dir=dataset_dir)
+    nouns = lexicon.nouns
+    conjugations = lexicon.conjugations
+    verbs = lexicon.verbs
+    morphology = Morphology(lexicon)
+    noun_index = morphology.nouns
+
+load_inputs()
+
+def iter_sentences_for_verb(verb, tense="present"):
+    subjects = noun_index.for_classes(verb["allowed_subject_class"], "subject")
+    objects = noun_index.for_classes(verb.get("allowed_object_class", []), "object") if verb["requires_object"] else None
+
+    for subject in subjects:
+        person = subject.person
+        for number_index, number in enumerate(NUMBERS):
+            subject_form = subject.forms[number_index]
+            verb_form = morphology.verb_form(verb["root"], verb["verb_class"], tense, person, number)
+
+            if objects is not None:
+                for obj in objects:
+                    for obj_number_index, obj_number in enumerate(NUMBERS):
+                        object_form = obj.forms[obj_number_index]
+                        sentence = f"{subject_form} {object_form} {verb_form}"
+                        yield {
+                            "sentence": sentence,
+                            "tense": tense,
+                            "subject": {
+                                "root": subject.root,
+                                "form": subject_form,
+                                "number": number,
+                                "person": person,
+                                "gender": subject.gender,
+                                "stem": subject.stem
+                            },
+                            "object": {
+                                "root": obj.root,
+                                "form": object_form,
+                                "number": obj_number,
+                                "person": "3",
+                                "gender": obj.gender,
+                                "stem": obj.stem
+                            },
+                            "verb": {
+                                "root": verb["root"],
+                                "form": verb_form,
+                                "person": person,
+                                "number": number,
+                                "class": verb["verb_class"],
+                                "meaning": verb.get("meaning", "")
+                            }
+                        }
+            else:
+                sentence = f"{subject_form} {verb_form}"
+                yield {
+                    "sentence": sentence,
+                    "tense": tense,
+                    "subject": {
+                        "root": subject.root,
+                        "form": subject_form,
+                        "number": number,
+                        "person": person,
+                        "gender": subject.gender,
+                        "stem": subject.stem
+                    },
+                    "object": None,
+                    "verb": {
+                        "root": verb["root"],
+                        "form": verb_form,
+                        "person": person,
+                        "number": number,
+                        "class": verb["verb_class"],
+                        "meaning": verb.get("meaning", "")
+                    }
+                }
 
 def generate_sentence_for_verb(verb, tense="present"):
-    sentence_data = []
-    subject_classes = verb["allowed_subject_class"]
-    object_required = verb["requires_object"]
-    object_classes = verb.get("allowed_object_class", [])
-
-    for subj_class in subject_classes:
-        for subject in get_valid_nouns(subj_class, role="subject"):
-            for number in ["sg", "du", "pl"]:
-                subject["number"] = number
-                person = {"अस्मद्": "1", "युष्मद्": "2"}.get(subject["root"], "3")
-                subject_form = inflect_noun(subject, "subject")
-                verb_form = get_verb_form(verb, person, number, tense)
-
-                if object_required:
-                    for obj_class in object_classes:
-                        for obj in get_valid_nouns(obj_class, role="object"):
-                            for obj_number in ["sg", "du", "pl"]:
-                                obj["number"] = obj_number
-                                object_form = inflect_noun(obj, "object")
-                                sentence = f"{subject_form} {object_form} {verb_form}"
-                                sentence_data.append({
-                                    "sentence": sentence,
-                                    "tense": tense,
-                                    "subject": {
-                                        "root": subject["root"],
-                                        "form": subject_form,
-                                        "number": number,
-                                        "person": person,
-                                        "gender": subject["gender"],
-                                        "stem": subject["stem_type"]
-                                    },
-                                    "object": {
-                                        "root": obj["root"],
-                                        "form": object_form,
-                                        "number": obj_number,
-                                        "person": "3",
-                                        "gender": obj["gender"],
-                                        "stem": obj["stem_type"]
-                                    },
-                                    "verb": {
-                                        "root": verb["root"],
-                                        "form": verb_form,
-                                        "person": person,
-                                        "number": number,
-                                        "class": verb["verb_class"],
-                                        "meaning": verb.get("meaning", "")
-                                    }
-                                })
-                else:
-                    sentence = f"{subject_form} {verb_form}"
-                    sentence_data.append({
-                        "sentence": sentence,
-                        "tense": tense,
-                        "subject": {
-                            "root": subject["root"],
-                            "form": subject_form,
-                            "number": number,
-                            "person": person,
-                            "gender": subject["gender"],
-                            "stem": subject["stem_type"]
-                        },
-                        "object": None,
-                        "verb": {
-                            "root": verb["root"],
-                            "form": verb_form,
-                            "person": person,
-                            "number": number,
-                            "class": verb["verb_class"],
-                            "meaning": verb.get("meaning", "")
-                        }
-                    })
-    return sentence_data
+    return list(iter_sentences_for_verb(verb, tense))
 
-if __name__ == "__main__":
-    all_sentences = []
-    for tense in ["present", "past", "future"]: 
+def iter_corpus(tenses=TENSES):
+    for tense in tenses:
         for verb in verbs:
-            all_sentences.extend(generate_sentence_for_verb(verb, tense=tense))
-
-    with open("sentences.json", "w", encoding="utf-8") as f:
-        json.dump(all_sentences, f, ensure_ascii=False, indent=2)
+            yield from iter_sentences_for_verb(verb, tense=tense)
+
+# === Sharded build ===
+# Every (tense, verb) pair is independent, so the corpus is built as one shard
+# per pair. Shards are encoded in worker processes and written back in work
+# item order, which keeps the output byte-identical to a serial build.
+
+def work_items(tenses=TENSES):
+    return [(tense, index) for tense in tenses for index in range(len(verbs))]
+
+def build_shard(item, fmt="json"):
+    tense, verb_index = item
+    start = time.perf_counter()
+    encode = encoder_for(fmt)
+    encoded = [encode(record) for record in iter_sentences_for_verb(verbs[verb_index], tense)]
+    return {
+        "tense": tense,
+        "verb": verbs[verb_index]["root"],
+        "class": verbs[verb_index]["verb_class"],
+        "records": encoded,
+        "seconds": time.perf_counter() - start
+    }
+
+def _build_json_shard(item):
+    return build_shard(item, "json")
+
+def _build_ndjson_shard(item):
+    return build_shard(item, "ndjson")
+
+def iter_shards(items, fmt="json", workers=1):
+    shard_builder = _build_ndjson_shard if fmt == "ndjson" else _build_json_shard
+    if workers <= 1:
+        yield from map(shard_builder, items)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # map() hands results back in submission order
+        yield from executor.map(shard_builder, items)
+
+# === Incremental build ===
+# Each shard is one partition of the build manifest (see
+# backend/helpers/build_manifest.py): only partitions whose verb, conjugation
+# table or nouns changed are rebuilt, the rest are copied from the last output.
+
+def partition_key(tense, verb):
+    return f"{tense}/{verb['verb_class']}/{verb['root']}"
+
+def partitions(tenses=TENSES):
+    result = []
+    for item in work_items(tenses):
+        tense, verb_index = item
+        verb = verbs[verb_index]
+        used = list(noun_index.for_classes(verb["allowed_subject_class"], "subject"))
+        if verb["requires_object"]:
+            used += noun_index.for_classes(verb.get("allowed_object_class", []), "object")
+        result.append({
+            "key": partition_key(tense, verb),
+            "fingerprint": partition_fingerprint([verb], tense, conjugations.get(tense, {}).get(verb["verb_class"]), used),
+            "verb": verb["root"],
+            "nouns": sorted({noun.root for noun in used}),
+            "item": item
+        })
+    return result
+
+def build_corpus(output, fmt="json", compress=None, workers=1, tenses=TENSES, on_shard=None, force=False):
+    """Bring `output` up to date and return what was rebuilt, with per-shard timings."""
+    def build(items):
+        for done, shard in enumerate(iter_shards(items, fmt, workers), 1):
+            if on_shard:
+                on_shard(dict(shard, count=len(shard["records"]), done=done, total=len(items)))
+            yield shard
+
+    report = build_partitioned(output, __file__, partitions(tenses), build, fmt, compress, force)
+    report["workers"] = workers
+    return report
+
+def generate(output=None, fmt="json", compress=False, workers=1, force=False, on_shard=None):
+    """Re-read the inputs and bring the corpus file up to date (the API behind the CLI)."""
+    output = str(output or DATASET_DIR / f"sentences.{fmt}")
+    if compress and not output.endswith(".gz"):
+        output += ".gz"
+    load_inputs()
+    report = build_corpus(output, fmt=fmt, compress=compress, workers=workers, on_shard=on_shard, force=force)
+    report["path"] = output
+    return report
 
-    print(f"{len(all_sentences)} sentences generated across tenses and saved to 'sentences.json'.")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate the sentence corpus")
+    parser.add_argument("--format", choices=["json", "ndjson"], default="json")
+    parser.add_argument("--gzip", action="store_true", help="gzip-compress the output")
+    parser.add_argument("--output", help="output path (default: sentences.json / sentences.ndjson)")
+    parser.add_argument("--workers", type=int, default=1, help="build (verb, tense) shards in N processes")
+    parser.add_argument("--timings", action="store_true", help="print the build time of every shard")
+    parser.add_argument("--force", action="store_true", help="rebuild every partition, ignoring the build manifest")
+    args = parser.parse_args()
+
+    def report_shard(shard):
+        print(f"  {shard['tense']:<8} {shard['class']:<4} {shard['verb']}: "
+              f"{shard['count']} sentences in {shard['seconds'] * 1000:.1f} ms", file=sys.stderr)
+
+    report = generate(args.output, fmt=args.format, compress=args.gzip, workers=args.workers,
+                      force=args.force, on_shard=report_shard if args.timings else None)
+    output = report["path"]
+    count = report["count"]
+    if report["noop"]:
+        print(f"'{os.path.basename(output)}' is up to date ({count} sentences); nothing to rebuild.")
+        sys.exit(0)
+    shard_seconds = [shard["seconds"] for shard in report["shards"]]
+    print(f"Rebuilt {len(shard_seconds)} shards ({report['reused']} reused) with {args.workers} worker(s) "
+          f"in {report['seconds']:.2f}s (shard time total {sum(shard_seconds):.2f}s, "
+          f"slowest {max(shard_seconds, default=0) * 1000:.1f} ms)", file=sys.stderr)
+
+    print(f"{count} sentences generated across tenses and saved to '{os.path.basename(output)}'.")
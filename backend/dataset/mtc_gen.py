@@ -1,162 +1,72 @@
-import json
-from declensions import (
-    a_stem_masc_declension,
-    ā_stem_fem_declension,
-    a_stem_neut_declension,
-    asmad_declension,
-    yushmad_declension
-)
-
-# Load nouns
-with open("nouns.json", "r", encoding="utf-8") as f:
-    noun_groups = json.load(f)
-
-nouns = []
-for key, roots in noun_groups.items():
-    parts = key.split("_")
-    gender = None if parts[0] == "none" else parts[0]
-    stem = None if parts[1] == "none" else parts[1]
-    for root, info in roots.items():
-        nouns.append({
-            "root": root,
-            "gender": gender,
-            "stem_type": stem,
-            "entity_classes": info["entity_classes"],
-            "usable_as_subject": info["usable_as_subject"],
-            "usable_as_object": info["usable_as_object"]
-        })
-
-# Load conjugations (now supports tenses)
-with open("conjugations.json", "r", encoding="utf-8") as f:
-    conjugations = json.load(f)
-
-# Load verbs and flatten
-with open("verbs.json", "r", encoding="utf-8") as f:
-    raw_verbs = json.load(f)
-
-verbs = []
-for verb_class, content in raw_verbs.items():
-    for verb_entry in content["verbs"]:
-        verb_entry["verb_class"] = verb_class
-        verbs.append(verb_entry)
-
-# Declensions
-declension_map = {
-    ("masc", "अ"): a_stem_masc_declension,
-    ("fem", "आ"): ā_stem_fem_declension,
-    ("neut", "अ"): a_stem_neut_declension
-}
-
-role_to_vibhakti = {
-    "subject": "प्रथमा",
-    "object": "द्वितीया"
-}
-
-number_index = {
-    "sg": 0,
-    "du": 1,
-    "pl": 2
-}
-
-def inflect_noun(noun, role):
-    root = noun["root"]
-    number = noun.get("number", "sg")
-    index = number_index[number]
-    vibhakti = role_to_vibhakti[role]
-
-    if root == "अस्मद्":
-        return asmad_declension[vibhakti][index]
-    elif root == "युष्मद्":
-        return yushmad_declension[vibhakti][index]
-
-    gender = noun.get("gender")
-    stem = noun.get("stem_type")
-    decl_table = declension_map.get((gender, stem))
-    if not decl_table or vibhakti not in decl_table:
-        return root
-
-    suffix = decl_table[vibhakti][index]
-
-    if gender == "fem" and stem == "आ":
-        return (root[:-1] if root.endswith("ा") else root) + suffix
-    else:
-        return root + suffix
-
-def get_verb_form(verb, person, number, tense="present"):
-    key = f"{person}_{number}"
-    verb_class = verb["verb_class"]
-
-    try:
-        suffix = conjugations[tense][verb_class][key]
-    except KeyError:
-        return verb["root"]  # fallback
-
-    # Choose the appropriate stem
-    if tense == "future":
-        stem = verb.get("future_stem", verb["root"])
-    elif tense == "past":
-        stem = verb.get("past_stem", verb["root"])
-    else:
-        stem = verb["root"]
-
-    # Drop halant for all EXCEPT present 4P
-    if not (tense == "present" and verb_class == "4P"):
-        if stem.endswith("्"):
-            stem = stem[:-1]
-
-    return stem + suffix.replace("A", "")
-
-def get_valid_nouns(entity_class, role):
-    key = "usable_as_subject" if role == "subject" else "usable_as_object"
-    return [
-        n.copy() for n in nouns
-        if entity_class in n["entity_classes"] and n.get(key, False)
-    ]
+import argparse
+import os
+import sys
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from backend.helpers.lexicon import DATASET_DIR, NUMBERS, TENSES, Lexicon
+from backend.helpers.morphology import Morphology
+from backend.helpers.jsonio import encoder_for
+from backend.helpers.build_manifest import build_partitioned, partition_fingerprint
+
+def load_inputs(dataset_dir=None):
+    """(Re)read the dataset files; everything below works on these globals."""
+    global lexicon, nouns, conjugations, verbs, morphology, noun_index
+    lexicon = Lexicon(dataset_dir=dataset_dir)
+    nouns = lexicon.nouns
+    conjugations = lexicon.conjugations
+    verbs = lexicon.verbs
+    morphology = Morphology(lexicon)
+    noun_index = morphology.nouns
+
+load_inputs()
+
+def iter_subject_verb_pairs(verb, tense="present"):
+    for subject in noun_index.for_classes(verb["allowed_subject_class"], "subject"):
+        person = subject.person
+        for number_index, number in enumerate(NUMBERS):
+            yield {
+                "subject": {
+                    "root": subject.root,
+                    "form": subject.forms[number_index],
+                    "number": number,
+                    "person": person,
+                    "gender": subject.gender,
+                    "stem": subject.stem
+                },
+                "verb": {
+                    "root": verb["root"],
+                    "form": morphology.verb_form(verb["root"], verb["verb_class"], tense, person, number),
+                    "person": person,
+                    "number": number,
+                    "class": verb["verb_class"],
+                    "meaning": verb.get("meaning", ""),
+                    "tense": tense
+                }
+            }
 
 def generate_subject_verb_pairs(verb, tense="present"):
-    pairs = []
-    subject_classes = verb["allowed_subject_class"]
-    
-    for subj_class in subject_classes:
-        for subject in get_valid_nouns(subj_class, role="subject"):
-            for number in ["sg", "du", "pl"]:
-                subject["number"] = number
-                person = {"अस्मद्": "1", "युष्मद्": "2"}.get(subject["root"], "3")
-                subject_form = inflect_noun(subject, "subject")
-                verb_form = get_verb_form(verb, person, number, tense)
-                
-                pairs.append({
-                    "subject": {
-                        "root": subject["root"],
-                        "form": subject_form,
-                        "number": number,
-                        "person": person,
-                        "gender": subject["gender"],
-                        "stem": subject["stem_type"]
-                    },
-                    "verb": {
-                        "root": verb["root"],
-                        "form": verb_form,
-                        "person": person,
-                        "number": number,
-                        "class": verb["verb_class"],
-                        "meaning": verb.get("meaning", ""),
-                        "tense": tense
-                    }
-                })
-    return pairs
-
-def create_matching_game_data(pairs):
-    # Organize by subject root and verb root
+    return list(iter_subject_verb_pairs(verb, tense))
+
+def iter_all_pairs(tenses=TENSES):
+    for tense in tenses:
+        for verb in verbs:
+            if not verb["requires_object"]:  # Only use verbs that don't require objects
+                yield from iter_subject_verb_pairs(verb, tense)
+
+def iter_matching_game_data(pairs):
+    # Organize by subject root and verb root. A key seen again (two verbs
+    # sharing a root, a noun listed twice) overwrites the forms it had, so the
+    # last values win. Every pair of a key lies in one (tense, verb root)
+    # partition, so build_shards() only ever holds one partition's entries.
     game_data = {}
-    
+
     for pair in pairs:
         subj_root = pair["subject"]["root"]
         verb_root = pair["verb"]["root"]
         tense = pair["verb"]["tense"]
-        
+
         key = f"{subj_root}_{verb_root}_{tense}"
-        
+
         if key not in game_data:
             game_data[key] = {
                 "subject_root": subj_root,
@@ -166,29 +76,85 @@ def create_matching_game_data(pairs):
                 "verb_forms": {"sg": None, "du": None, "pl": None},
                 "meaning": pair["verb"]["meaning"]
             }
-        
+
         number = pair["subject"]["number"]
         game_data[key]["subject_forms"][number] = pair["subject"]["form"]
         game_data[key]["verb_forms"][number] = pair["verb"]["form"]
-    
-    # Convert to list and filter out incomplete entries
-    final_data = []
+
+    # Only complete entries, in order of first appearance
     for entry in game_data.values():
         if all(entry["subject_forms"].values()) and all(entry["verb_forms"].values()):
-            final_data.append(entry)
-    
-    return final_data
+            yield entry
+
+# === Incremental build ===
+# Entries are keyed by (subject, verb root, tense), so every (tense, verb root)
+# is an independent partition of the build manifest (see
+# backend/helpers/build_manifest.py). Only partitions whose verb, conjugation
+# table or subject nouns changed are regenerated.
+
+def partitions(tenses=TENSES):
+    result = []
+    for tense in tenses:
+        roots = {}
+        for verb in verbs:
+            if not verb["requires_object"]:
+                roots.setdefault(verb["root"], []).append(verb)
+        for root, root_verbs in roots.items():
+            used = [noun for verb in root_verbs for noun in noun_index.for_classes(verb["allowed_subject_class"], "subject")]
+            tables = [conjugations.get(tense, {}).get(verb["verb_class"]) for verb in root_verbs]
+            result.append({
+                "key": f"{tense}/{root}",
+                "fingerprint": partition_fingerprint(root_verbs, tense, tables, used),
+                "verb": root,
+                "nouns": sorted({noun.root for noun in used}),
+                "item": (tense, root_verbs)
+            })
+    return result
+
+def build_shards(items, fmt="json", on_shard=None):
+    encode = encoder_for(fmt)
+    for done, (tense, root_verbs) in enumerate(items, 1):
+        start = time.perf_counter()
+        pairs = (pair for verb in root_verbs for pair in iter_subject_verb_pairs(verb, tense))
+        shard = {
+            "tense": tense,
+            "verb": root_verbs[0]["root"],
+            "records": [encode(entry) for entry in iter_matching_game_data(pairs)],
+            "seconds": time.perf_counter() - start
+        }
+        if on_shard:
+            on_shard(dict(shard, count=len(shard["records"]), done=done, total=len(items)))
+        yield shard
+
+def build_matching_game(output, fmt="json", compress=None, tenses=TENSES, force=False, on_shard=None):
+    """Bring `output` up to date and return what was rebuilt."""
+    return build_partitioned(output, __file__, partitions(tenses), lambda items: build_shards(items, fmt, on_shard),
+                             fmt, compress, force)
+
+def generate(output=None, fmt="json", compress=False, force=False, on_shard=None):
+    """Re-read the inputs and bring the matching game file up to date (the API behind the CLI)."""
+    output = str(output or DATASET_DIR / f"matching_game.{fmt}")
+    if compress and not output.endswith(".gz"):
+        output += ".gz"
+    load_inputs()
+    report = build_matching_game(output, fmt=fmt, compress=compress, force=force, on_shard=on_shard)
+    report["path"] = output
+    return report
 
 if __name__ == "__main__":
-    all_pairs = []
-    for tense in ["present", "past", "future"]: 
-        for verb in verbs:
-            if not verb["requires_object"]:  # Only use verbs that don't require objects
-                all_pairs.extend(generate_subject_verb_pairs(verb, tense))
-    
-    matching_game_data = create_matching_game_data(all_pairs)
-    
-    with open("matching_game.json", "w", encoding="utf-8") as f:
-        json.dump(matching_game_data, f, ensure_ascii=False, indent=2)
-    
-    print(f"{len(matching_game_data)} matching game entries created and saved to 'matching_game.json'.")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Generate the matching game data")
+    parser.add_argument("--format", choices=["json", "ndjson"], default="json")
+    parser.add_argument("--gzip", action="store_true", help="gzip-compress the output")
+    parser.add_argument("--output", help="output path (default: matching_game.json / matching_game.ndjson)")
+    parser.add_argument("--force", action="store_true", help="rebuild every partition, ignoring the build manifest")
+    args = parser.parse_args()
+
+    report = generate(args.output, fmt=args.format, compress=args.gzip, force=args.force)
+    output = report["path"]
+    count = report["count"]
+    if report["noop"]:
+        print(f"'{os.path.basename(output)}' is up to date ({count} entries); nothing to rebuild.")
+        sys.exit(0)
+
+    print(f"{count} matching game entries created and saved to '{os.path.basename(output)}' "
+          f"({len(report['rebuilt'])} partitions rebuilt, {report['reused']} reused).")
@@ -0,0 +1,196 @@
+import bisect
+import random
+from collections import Counter
+import threading
+
+from flask import request
+
+# Stratified question selection.
+#
+# The loaded corpus is grouped once into buckets keyed by every facet a drill
+# can filter on: tense, subject person and number, verb class and root, and
+# whether the sentence has an object. A filter combination (any subset of the
+# facets) resolves to the buckets that match it; that list and an alias table
+# over it are built on first use and cached, so every later draw is two random
+# numbers: the alias table picks a bucket, then an index inside it.
+#
+# Draws are uniform over the matching sentences by default. ?balance=<facet>
+# weights the buckets so each value of that facet is equally likely (say, as
+# many dual as singular questions) however unevenly the corpus covers them.
+#
+# A batch of k different questions draws with rejection while repeats are
+# rare. Once the rejections outnumber k (k close to the number of matching
+# sentences, or most of the weight on a few of them), the rest of the batch
+# is drawn without replacement: a bucket in proportion to the weight of its
+# sentences not yet chosen, then one of those. A batch is only short when
+# fewer than k sentences match, and no step enumerates more than about 2k
+# sentences, so the virtual corpus's buckets (helpers/corpus.py) stay lazy.
+#
+#   ?tense=past&number=du&class=4P   ?object=no&balance=person
+
+FACETS = ("tense", "person", "number", "class", "root", "object")
+SELECTION_CACHE_SIZE = 1024
+
+def facet_key(entry):
+    subject = entry.get("subject") or {}
+    verb = entry.get("verb") or {}
+    return (entry.get("tense"), subject.get("person"), subject.get("number"),
+            verb.get("class"), verb.get("root"), "yes" if entry.get("object") else "no")
+
+def _object_filter(value):
+    value = value.lower()
+    if value in ("yes", "true", "1"):
+        return "yes"
+    if value in ("no", "false", "0"):
+        return "no"
+    raise ValueError("object must be yes or no")
+
+def requested_selection():
+    """(filters, balance) from the current request's query string, or None when there are none."""
+    filters = {}
+    for facet in FACETS:
+        value = request.args.get(facet)
+        if value:
+            filters[facet] = _object_filter(value) if facet == "object" else value
+    balance = request.args.get("balance")
+    if balance and balance not in FACETS:
+        raise ValueError(f"balance must be one of {', '.join(FACETS)}")
+    if not filters and not balance:
+        return None
+    return filters, balance
+
+class AliasTable:
+    """Walker/Vose alias table: O(1) draws from a fixed discrete distribution."""
+
+    def __init__(self, weights):
+        n = len(weights)
+        total = float(sum(weights))
+        prob = [weight * n / total for weight in weights]
+        alias = list(range(n))
+        small = [i for i, p in enumerate(prob) if p < 1.0]
+        large = [i for i, p in enumerate(prob) if p >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            alias[less] = more
+            prob[more] -= 1.0 - prob[less]
+            (small if prob[more] < 1.0 else large).append(more)
+        for i in small + large:
+            prob[i] = 1.0
+        self.prob = prob
+        self.alias = alias
+        self.weights = weights
+
+    def draw(self, rng=random):
+        i = rng.randrange(len(self.prob))
+        return i if rng.random() < self.prob[i] else self.alias[i]
+
+class BucketIndex:
+    def __init__(self, entries):
+        if hasattr(entries, "facet_buckets"):
+            # The virtual corpus knows its buckets from its layout; nothing is decoded
+            buckets = entries.facet_buckets()
+        else:
+            buckets = {}
+            for index, entry in enumerate(entries):
+                buckets.setdefault(facet_key(entry), []).append(index)
+        self.buckets = buckets
+        self._selections = {}
+        self._lock = threading.Lock()
+
+    def select(self, filters, balance=None):
+        """(matching buckets, alias table over them, sentence count, bucket offsets) for a filter combination."""
+        key = (tuple(sorted(filters.items())), balance)
+        selection = self._selections.get(key)
+        if selection is not None:
+            return selection
+        positions = [(FACETS.index(facet), value) for facet, value in filters.items()]
+        matching = [(bucket_key, bucket) for bucket_key, bucket in self.buckets.items()
+                    if all(bucket_key[position] == value for position, value in positions)]
+        lists = [bucket for bucket_key, bucket in matching]
+        weights = [len(bucket) for bucket in lists]
+        if balance and matching:
+            position = FACETS.index(balance)
+            strata = {}
+            for bucket_key, bucket in matching:
+                strata[bucket_key[position]] = strata.get(bucket_key[position], 0) + len(bucket)
+            weights = [len(bucket) / strata[bucket_key[position]] for bucket_key, bucket in matching]
+        offsets = []
+        total = 0
+        for bucket in lists:
+            offsets.append(total)
+            total += len(bucket)
+        selection = (lists, AliasTable(weights) if lists else None, total, offsets)
+        with self._lock:
+            if len(self._selections) >= SELECTION_CACHE_SIZE:
+                self._selections.clear()
+            self._selections[key] = selection
+        return selection
+
+    def draw(self, filters, balance=None, rng=random):
+        """Index of one matching entry, or None when nothing matches."""
+        lists, table, total, offsets = self.select(filters, balance)
+        if not total:
+            return None
+        bucket = lists[table.draw(rng)]
+        return bucket[rng.randrange(len(bucket))]
+
+    def sample(self, k, filters, balance=None, rng=random):
+        """Up to k different matching indices."""
+        lists, table, total, offsets = self.select(filters, balance)
+        if k >= total:
+            indices = [index for bucket in lists for index in bucket]
+            rng.shuffle(indices)
+            return indices
+        chosen = []
+        seen = set()
+        taken = Counter()
+        rejected = 0
+        while len(chosen) < k:
+            if rejected > k:
+                return chosen + self._sample_rest(k - len(chosen), lists, table.weights, seen, taken, rng)
+            position = table.draw(rng)
+            bucket = lists[position]
+            index = bucket[rng.randrange(len(bucket))]
+            if index in seen:
+                rejected += 1
+                continue
+            seen.add(index)
+            taken[position] += 1
+            chosen.append(index)
+        return chosen
+
+    @staticmethod
+    def _sample_rest(k, lists, weights, seen, taken, rng):
+        """k more unseen indices, weighted like draws, without replacement; taken counts seen per bucket."""
+        mass = [weight * (len(bucket) - taken[position]) / len(bucket)
+                for position, (bucket, weight) in enumerate(zip(lists, weights))]
+        rest = []
+        while len(rest) < k:
+            remaining = sum(mass)
+            if remaining <= 0:
+                break
+            target = rng.random() * remaining
+            position = 0
+            while position < len(mass) - 1 and (target >= mass[position] or not mass[position]):
+                target -= mass[position]
+                position += 1
+            bucket = lists[position]
+            if taken[position] * 2 < len(bucket):
+                # Mostly unseen: a few redraws at most
+                index = bucket[rng.randrange(len(bucket))]
+                while index in seen:
+                    index = bucket[rng.randrange(len(bucket))]
+            else:
+                # At least half seen, so the bucket holds at most 2k indices
+                index = rng.choice([index for index in bucket if index not in seen])
+            seen.add(index)
+            taken[position] += 1
+            mass[position] = weights[position] * (len(bucket) - taken[position]) / len(bucket)
+            rest.append(index)
+        return rest
+
+    def nth(self, position, filters):
+        """Index of the position-th matching entry (buckets in index order)."""
+        lists, table, total, offsets = self.select(filters)
+        bucket = bisect.bisect_right(offsets, position) - 1
+        return lists[bucket][position - offsets[bucket]]
@@ -0,0 +1,191 @@
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+from backend.helpers.jsonio import open_text
+from backend.helpers.lexicon import DATASET_DIR
+
+# Build manifest for the generated corpora (sentences.json, matching_game.json).
+#
+# The generators split their output into (verb, tense) partitions. For every
+# output file the manifest (dataset/.build_manifest.json) records the hashes of
+# the dataset inputs and of the generator code it was built from, and for
+# every partition a fingerprint of exactly what went into it: the verb entry,
+# the conjugation table of its class and tense, and the inflected nouns it
+# combines (which also makes declensions.py edits show up). It also records
+# which nouns each partition used and where its records sit in the file.
+#
+# A rebuild regenerates only the partitions whose fingerprint changed and
+# copies every other partition's text from the previous output. When the
+# inputs and code hash the same as last time and the output is still the file
+# we wrote, it does nothing at all.
+
+MANIFEST_PATH = DATASET_DIR / ".build_manifest.json"
+INPUT_FILES = ["nouns.json", "verbs.json", "conjugations.json", "declensions.py"]
+HELPERS_DIR = Path(__file__).resolve().parent
+CODE_FILES = [HELPERS_DIR / name for name in
+              ("lexicon.py", "noun_index.py", "morphology.py", "jsonio.py", "build_manifest.py")]
+
+def digest(value):
+    text = json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=list)
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+def file_digest(path):
+    try:
+        with open(path, "rb") as f:
+            return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+    except FileNotFoundError:
+        return None
+
+def input_digests(dataset_dir=None):
+    dataset_dir = Path(dataset_dir or DATASET_DIR)
+    return {name: file_digest(dataset_dir / name) for name in INPUT_FILES}
+
+def code_digest(script):
+    return digest([file_digest(path) for path in [*CODE_FILES, Path(script)]])
+
+def partition_fingerprint(verbs, tense, conjugation_table, nouns):
+    """Everything a (verb, tense) partition is generated from."""
+    return digest({"verbs": verbs, "tense": tense, "conjugations": conjugation_table, "nouns": nouns})
+
+def read_manifest(path=None):
+    try:
+        with open(path or MANIFEST_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def write_manifest(manifest, path=None):
+    path = str(path or MANIFEST_PATH)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+
+def output_key(output):
+    return os.path.relpath(os.path.abspath(output), DATASET_DIR)
+
+def _settings(script, fmt, compress):
+    return {"code": code_digest(script), "format": fmt, "gzip": bool(compress)}
+
+def _matches(entry, output, inputs, settings):
+    return bool(entry) and entry.get("inputs") == inputs and entry.get("settings") == settings \
+        and os.path.exists(output) and os.path.getsize(output) == entry.get("size")
+
+def is_current(output, script, fmt="json", compress=False, require_synced=False, manifest_path=None):
+    """True when output was built from the current inputs and code (and loaded, if require_synced)."""
+    entry = read_manifest(manifest_path).get("outputs", {}).get(output_key(output))
+    if not _matches(entry, output, input_digests(), _settings(script, fmt, compress)):
+        return False
+    return not require_synced or entry.get("synced") == entry.get("build")
+
+def mark_synced(output, manifest_path=None):
+    """Record that the current build of output has been loaded into the database."""
+    manifest = read_manifest(manifest_path)
+    entry = manifest.get("outputs", {}).get(output_key(output))
+    if entry:
+        entry["synced"] = entry.get("build")
+        write_manifest(manifest, manifest_path)
+
+def _write_span(fp, text, fmt, written):
+    """Append a partition's records; returns (offset of its text, total chars written)."""
+    if fmt != "ndjson":
+        separator = "[\n" if written == 0 else ",\n"
+        fp.write(separator)
+        written += len(separator)
+    fp.write(text)
+    return written, written + len(text)
+
+def build_partitioned(output, script, partitions, build, fmt="json", compress=None, force=False, manifest_path=None):
+    """Incrementally write output from partitions.
+
+    partitions is a list of dicts with key, fingerprint, verb, nouns and item,
+    in output order. build(items) yields one shard per item, in order, with its
+    encoded "records". Returns a report of what was rebuilt and reused.
+    """
+    start = time.perf_counter()
+    compress = bool(compress)
+    manifest = read_manifest(manifest_path)
+    outputs = manifest.setdefault("outputs", {})
+    key = output_key(output)
+    entry = outputs.get(key)
+    inputs = input_digests()
+    settings = _settings(script, fmt, compress)
+    report = {"output": key, "rebuilt": [], "reused": 0, "removed": [], "shards": []}
+
+    if not force and _matches(entry, output, inputs, settings):
+        report.update(noop=True, count=entry["count"], seconds=time.perf_counter() - start)
+        return report
+
+    previous = {}
+    if not force and entry and entry.get("settings") == settings \
+            and os.path.exists(output) and os.path.getsize(output) == entry.get("size"):
+        previous = {p["key"]: p for p in entry.get("partitions", [])}
+    report["removed"] = sorted(set(previous) - {p["key"] for p in partitions})
+    stale = [p for p in partitions
+             if p["key"] not in previous or previous[p["key"]]["fingerprint"] != p["fingerprint"]]
+    report["rebuilt"] = [p["key"] for p in stale]
+    report["reused"] = len(partitions) - len(stale)
+    build_id = digest([[p["key"], p["fingerprint"]] for p in partitions])
+
+    if previous and not stale and not report["removed"] and [p["key"] for p in partitions] == list(previous):
+        # Inputs changed but not in a way that reaches the output (formatting, unused nouns)
+        entry.update(inputs=inputs, build=build_id, built_at=time.time())
+        write_manifest(manifest, manifest_path)
+        report.update(noop=True, count=entry["count"], seconds=time.perf_counter() - start)
+        return report
+
+    old_text = ""
+    if report["reused"]:
+        with open_text(output, "r", compress) as fp:
+            old_text = fp.read()
+
+    shards = iter(build([p["item"] for p in stale]))
+    stale_keys = set(report["rebuilt"])
+    written = 0
+    count = 0
+    records = []
+    tmp = f"{output}.tmp"
+    with open_text(tmp, "w", compress) as fp:
+        for partition in partitions:
+            if partition["key"] in stale_keys:
+                shard = next(shards)
+                report["shards"].append({k: v for k, v in shard.items() if k != "records"})
+                report["shards"][-1]["count"] = len(shard["records"])
+                joiner = "" if fmt == "ndjson" else ",\n"
+                text, partition_count = joiner.join(shard["records"]), len(shard["records"])
+            else:
+                old = previous[partition["key"]]
+                text, partition_count = old_text[old["offset"]:old["offset"] + old["length"]], old["count"]
+            offset = written
+            if partition_count:
+                offset, written = _write_span(fp, text, fmt, written)
+            count += partition_count
+            records.append({
+                "key": partition["key"],
+                "verb": partition["verb"],
+                "nouns": partition["nouns"],
+                "fingerprint": partition["fingerprint"],
+                "offset": offset,
+                "length": len(text) if partition_count else 0,
+                "count": partition_count
+            })
+        if fmt != "ndjson":
+            fp.write("\n]" if count else "[]")
+    os.replace(tmp, output)
+
+    outputs[key] = {
+        "inputs": inputs,
+        "settings": settings,
+        "build": build_id,
+        "synced": entry.get("synced") if entry else None,
+        "built_at": time.time(),
+        "size": os.path.getsize(output),
+        "count": count,
+        "partitions": records
+    }
+    write_manifest(manifest, manifest_path)
+    report.update(noop=False, count=count, seconds=time.perf_counter() - start)
+    return report
@@ -0,0 +1,199 @@
+import os
+import random
+from bisect import bisect_right
+from collections.abc import Sequence
+
+from backend.helpers.lexicon import Lexicon, NUMBERS, TENSES
+from backend.helpers.morphology import Morphology
+
+# Virtual sentence corpus.
+#
+# gen.py enumerates, for every tense and verb, subject class x subject noun x
+# number (x object class x object noun x object number when the verb needs an
+# object). That space is a mixed-radix number: each (tense, verb) pair is a
+# block whose size is known up front, so sentence #k can be decoded directly
+# instead of materialising sentences.json. Indices follow gen.py's order, so
+# corpus[k] is exactly the k-th sentence gen.py would write.
+#
+# The same layout gives the facet buckets of helpers/buckets.py without
+# decoding anything: within a block, each (subject, number) pair covers a
+# contiguous chunk of indices, so the sentences of one person and number are a
+# few evenly spaced runs of chunks (see facet_buckets()).
+
+def use_virtual_corpus():
+    return os.getenv("SENTENCE_SOURCE", "mongo").lower() == "virtual"
+
+class _Block:
+    __slots__ = ("tense", "verb", "subjects", "objects", "size")
+
+    def __init__(self, tense, verb, subjects, objects):
+        self.tense = tense
+        self.verb = verb
+        self.subjects = subjects
+        self.objects = objects
+        per_subject_number = len(objects) * len(NUMBERS) if verb["requires_object"] else 1
+        self.size = len(subjects) * len(NUMBERS) * per_subject_number
+
+class IndexRuns(Sequence):
+    """Sorted indices stored as runs (start, chunks, chunk size, stride between chunk starts)."""
+
+    def __init__(self):
+        self.runs = []
+        self.offsets = []
+        self.size = 0
+
+    def add(self, start, chunks, chunk, stride):
+        self.runs.append((start, chunk, stride))
+        self.offsets.append(self.size)
+        self.size += chunks * chunk
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, position):
+        if not 0 <= position < self.size:
+            raise IndexError("index out of range")
+        run = bisect_right(self.offsets, position) - 1
+        start, chunk, stride = self.runs[run]
+        q, r = divmod(position - self.offsets[run], chunk)
+        return start + q * stride + r
+
+class SentenceCorpus(Sequence):
+    """Random-access view of every sentence gen.py can generate.
+
+    transitive=True/False keeps only verbs that do / do not take an object
+    (False matches the number game's {"object": None} filter).
+    """
+
+    def __init__(self, lexicon=None, tenses=TENSES, transitive=None, morphology=None):
+        self.morphology = morphology or Morphology(lexicon or Lexicon())
+        self.lexicon = self.morphology.lexicon
+        self.noun_index = self.morphology.nouns
+        self.blocks = []
+        self.offsets = []
+        total = 0
+        for tense in tenses:
+            for verb in self.lexicon.verbs:
+                if transitive is not None and bool(verb["requires_object"]) != transitive:
+                    continue
+                subjects = self.noun_index.for_classes(verb["allowed_subject_class"], "subject")
+                objects = self.noun_index.for_classes(verb.get("allowed_object_class", []), "object") if verb["requires_object"] else ()
+                block = _Block(tense, verb, subjects, objects)
+                if block.size:
+                    self.blocks.append(block)
+                    self.offsets.append(total)
+                    total += block.size
+        self.size = total
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.size))]
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("sentence index out of range")
+        position = bisect_right(self.offsets, index) - 1
+        return self._decode(self.blocks[position], index - self.offsets[position])
+
+    def shape(self):
+        """Radices of every (tense, verb) block: subjects, numbers, objects, object numbers."""
+        return [
+            {
+                "tense": block.tense,
+                "verb": block.verb["root"],
+                "class": block.verb["verb_class"],
+                "subjects": len(block.subjects),
+                "numbers": len(NUMBERS),
+                "objects": len(block.objects),
+                "object_numbers": len(NUMBERS) if block.objects else 0,
+                "size": block.size,
+            }
+            for block in self.blocks
+        ]
+
+    def facet_buckets(self):
+        """{helpers.buckets.facet_key: IndexRuns} for every sentence, built from the block layout."""
+        buckets = {}
+        for block, offset in zip(self.blocks, self.offsets):
+            verb = block.verb
+            chunk = len(block.objects) * len(NUMBERS) if block.objects else 1
+            stride = len(NUMBERS) * chunk
+            has_object = "yes" if block.objects else "no"
+            # Subjects in a row that share a person form one evenly spaced run per number
+            first = 0
+            for i in range(1, len(block.subjects) + 1):
+                if i < len(block.subjects) and block.subjects[i].person == block.subjects[first].person:
+                    continue
+                person = block.subjects[first].person
+                for number_index, number in enumerate(NUMBERS):
+                    key = (block.tense, person, number, verb["verb_class"], verb["root"], has_object)
+                    runs = buckets.get(key)
+                    if runs is None:
+                        runs = buckets[key] = IndexRuns()
+                    runs.add(offset + first * stride + number_index * chunk, i - first, chunk, stride)
+                first = i
+        return buckets
+
+    def sample(self, k=1, rng=random):
+        return [self[i] for i in rng.sample(range(self.size), k)]
+
+    def choice(self, rng=random):
+        return self[rng.randrange(self.size)]
+
+    def _decode(self, block, offset):
+        verb = block.verb
+        tense = block.tense
+        if block.objects:
+            object_span = len(block.objects) * len(NUMBERS)
+            subject_index, rest = divmod(offset, len(NUMBERS) * object_span)
+            number_index, rest = divmod(rest, object_span)
+            object_index, object_number_index = divmod(rest, len(NUMBERS))
+        else:
+            subject_index, number_index = divmod(offset, len(NUMBERS))
+
+        subject = block.subjects[subject_index]
+        number = NUMBERS[number_index]
+        person = subject.person
+        subject_form = subject.forms[number_index]
+        verb_form = self.morphology.verb_form(verb["root"], verb["verb_class"], tense, person, number)
+
+        obj = None
+        if block.objects:
+            noun = block.objects[object_index]
+            object_form = noun.forms[object_number_index]
+            sentence = f"{subject_form} {object_form} {verb_form}"
+            obj = {
+                "root": noun.root,
+                "form": object_form,
+                "number": NUMBERS[object_number_index],
+                "person": "3",
+                "gender": noun.gender,
+                "stem": noun.stem
+            }
+        else:
+            sentence = f"{subject_form} {verb_form}"
+
+        return {
+            "sentence": sentence,
+            "tense": tense,
+            "subject": {
+                "root": subject.root,
+                "form": subject_form,
+                "number": number,
+                "person": person,
+                "gender": subject.gender,
+                "stem": subject.stem
+            },
+            "object": obj,
+            "verb": {
+                "root": verb["root"],
+                "form": verb_form,
+                "person": person,
+                "number": number,
+                "class": verb["verb_class"],
+                "meaning": verb.get("meaning", "")
+            }
+        }
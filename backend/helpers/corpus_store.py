@@ -0,0 +1,95 @@
+import copy
+import os
+import threading
+
+from Database.versions import current_collection, marker
+from Database.embedded import apply_projection, matches
+from backend.helpers.build_manifest import INPUT_FILES
+from backend.helpers.corpus import SentenceCorpus, use_virtual_corpus
+from backend.helpers.lexicon import DATASET_DIR
+
+# Process-wide corpus store used by the game servers.
+#
+# A standalone game server queries MongoDB directly. When every game runs in
+# one process (the gateway's consolidated mode) the store is switched to
+# shared mode: each collection is read once into an immutable tuple and the
+# servers filter that single copy in memory instead of each holding their own.
+# Servers must treat the returned documents as read-only. Reads always go to
+# the published version of a collection (see Database/versions.py).
+#
+# corpus_marker() tells the servers when to reload: the version marker of the
+# collections they read, or the dataset files' mtimes for the virtual corpus.
+# The shared copies and the virtual corpora are rebuilt when it changes.
+#
+# The content_hash the corpus sync stamps on every document (Database/sync.py)
+# is bookkeeping, not corpus data: find() never returns it.
+
+INTERNAL_FIELDS = ("content_hash",)
+
+_shared = False
+_lock = threading.Lock()
+_collections = {}
+_virtual = {}
+_virtual_marker = None
+
+def enable_shared_corpus():
+    global _shared
+    _shared = True
+
+def shared_corpus_enabled():
+    return _shared
+
+def dataset_marker():
+    stamps = []
+    for name in INPUT_FILES:
+        try:
+            stamps.append(f"{os.stat(DATASET_DIR / name).st_mtime_ns:x}")
+        except FileNotFoundError:
+            stamps.append("-")
+    return "files:" + ",".join(stamps)
+
+def corpus_marker(names, virtual=None):
+    """Changes whenever the corpus a server built from the collections names may have changed."""
+    if use_virtual_corpus() if virtual is None else virtual:
+        return dataset_marker()
+    return ";".join(marker(name) for name in names)
+
+def _shared_collection(name):
+    version = marker(name)
+    cached = _collections.get(name)
+    if cached is None or cached[0] != version:
+        with _lock:
+            cached = _collections.get(name)
+            if cached is None or cached[0] != version:
+                cached = (version, tuple(current_collection(name).find({}, _projection(None))))
+                _collections[name] = cached
+    return cached[1]
+
+def _projection(projection):
+    """projection with the internal fields left out (an inclusion projection already omits them)."""
+    if projection and any(value for key, value in projection.items() if key != "_id"):
+        return projection
+    return dict(projection or {}, **{field: 0 for field in INTERNAL_FIELDS})
+
+def find(name, query=None, projection=None):
+    if not _shared:
+        return list(current_collection(name).find(query, _projection(projection)))
+    docs = [doc for doc in _shared_collection(name) if matches(doc, query)]
+    if projection:
+        docs = [apply_projection(copy.deepcopy(doc), projection) for doc in docs]
+    return docs
+
+def virtual_corpus(transitive=None):
+    """One SentenceCorpus per filter, all sharing a single compiled morphology."""
+    global _virtual_marker
+    version = dataset_marker()
+    with _lock:
+        if version != _virtual_marker:
+            _virtual.clear()
+            _virtual_marker = version
+        corpus = _virtual.get(transitive)
+        if corpus is None:
+            morphology = next(iter(_virtual.values())).morphology if _virtual else None
+            corpus = SentenceCorpus(transitive=transitive, morphology=morphology)
+            _virtual[transitive] = corpus
+    return corpus
@@ -0,0 +1,87 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Background health prober for the gateway.
+#
+# Every HEALTH_PROBE_INTERVAL seconds (5) all upstreams are probed at once on
+# their /health route with a HEALTH_PROBE_TIMEOUT (2 s) budget. The results are
+# kept in a table, so status routes read a dict instead of doing network
+# calls. Each entry is replaced as a whole, so readers never see half an update.
+
+def _env_float(name, default):
+    value = os.getenv(name)
+    return float(value) if value else default
+
+class HealthProber:
+    def __init__(self, upstreams, interval=None, timeout=None, path="/health"):
+        self.upstreams = upstreams
+        self.interval = interval or _env_float("HEALTH_PROBE_INTERVAL", 5.0)
+        self.timeout = timeout or _env_float("HEALTH_PROBE_TIMEOUT", 2.0)
+        self.path = path
+        self.table = {
+            name: {"status": "unknown", "latency_ms": None, "last_seen": None,
+                   "last_checked": None, "failures": 0, "error": None}
+            for name in upstreams
+        }
+        self._executor = ThreadPoolExecutor(max_workers=max(len(upstreams), 1), thread_name_prefix="health")
+        self._stop = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def _probe(self, name):
+        upstream = self.upstreams[name]
+        start = time.perf_counter()
+        try:
+            response = upstream.session.get(upstream.base_url + self.path, timeout=self.timeout)
+            error = None if response.status_code == 200 else f"HTTP {response.status_code}"
+        except Exception as e:
+            error = str(e)
+        return name, (time.perf_counter() - start) * 1000, error
+
+    def probe_all(self):
+        now = time.time()
+        for name, latency_ms, error in self._executor.map(self._probe, list(self.upstreams)):
+            previous = self.table[name]
+            if error is None:
+                entry = {"status": "online", "latency_ms": round(latency_ms, 2), "last_seen": now,
+                         "last_checked": now, "failures": 0, "error": None}
+            else:
+                entry = dict(previous, status="offline", last_checked=now,
+                             failures=previous["failures"] + 1, error=error)
+            if entry["status"] != previous["status"]:
+                logger.info(f"Health: {name} is now {entry['status']}")
+            self.table[name] = entry
+        return self.table
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.probe_all()
+            except Exception as e:
+                logger.error(f"Health probe round failed: {str(e)}")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="health-prober", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def get(self, name):
+        return self.table[name]
+
+    def is_online(self, name):
+        return self.table[name]["status"] == "online"
+
+    def snapshot(self):
+        return dict(self.table)
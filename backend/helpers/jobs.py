@@ -0,0 +1,221 @@
+import fcntl
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Background job queue for the gateway's generate/load work.
+#
+# Request handlers only submit a job and return its id; a worker thread runs
+# jobs in the process that submitted them. A submit for a kind that already
+# has a queued or running job returns that job instead of adding another, so
+# a burst of clicks costs one generation. Handlers poll the job for status,
+# progress and per-stage timings. The last JOB_HISTORY jobs (50) are kept for
+# polling after they finish.
+#
+# The gateway may run as several gunicorn workers, so job state lives on
+# disk, not in process memory: one JSON file per job under JOB_DIR (written
+# atomically), read back by whichever worker gets the poll. Submits take an
+# exclusive lock on JOB_DIR/.lock, so two workers never both queue the same
+# kind, and runs take JOB_DIR/.run, so jobs still run one at a time across
+# workers. A queued or running job whose process has died is reported as
+# failed.
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+@contextmanager
+def _locked(path):
+    with open(path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+class Job:
+    def __init__(self, kind, params, save=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.params = params
+        self.status = "queued"
+        self.progress = {}
+        self.timings = {}
+        self.result = None
+        self.error = None
+        self.requests = 1
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.pid = os.getpid()
+        self._save = save
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_dict(cls, data, save=None):
+        job = cls(data["kind"], data["params"], save)
+        for key, value in data.items():
+            setattr(job, key, value)
+        return job
+
+    def save(self):
+        if self._save:
+            self._save(self)
+
+    def update(self, **progress):
+        with self._lock:
+            self.progress = dict(self.progress, **progress)
+        self.save()
+
+    @contextmanager
+    def stage(self, name):
+        """Time one step of the job and show it as the current stage while it runs."""
+        self.update(stage=name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.timings[name] = round(time.perf_counter() - start, 3)
+            self.save()
+
+    @property
+    def active(self):
+        return self.status in ("queued", "running")
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "id": self.id,
+                "kind": self.kind,
+                "params": self.params,
+                "status": self.status,
+                "progress": dict(self.progress),
+                "timings": dict(self.timings),
+                "result": self.result,
+                "error": self.error,
+                "requests": self.requests,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "pid": self.pid,
+            }
+
+class JobQueue:
+    def __init__(self, runners, directory, history=None):
+        self.runners = runners
+        self.directory = Path(os.getenv("JOB_DIR") or directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.history = history or int(os.getenv("JOB_HISTORY", "50"))
+        # Live objects for the jobs this process queued and runs
+        self.jobs = {}
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    # === Job files ===
+    def _path(self, job_id):
+        return self.directory / f"{job_id}.json"
+
+    def _save(self, job):
+        path = self._path(job.id)
+        try:
+            # Other workers count their joins into the file; keep them
+            with open(path, encoding="utf-8") as f:
+                job.requests = max(job.requests, json.load(f).get("requests", 0))
+        except (OSError, ValueError):
+            pass
+        tmp = path.with_name(f".{job.id}.{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(job.to_dict(), f, default=str)
+        os.replace(tmp, path)
+
+    def _load(self, path):
+        try:
+            with open(path, encoding="utf-8") as f:
+                job = Job.from_dict(json.load(f))
+        except (OSError, ValueError, KeyError):
+            # Trimmed, or being replaced right now
+            return None
+        if job.active and not _alive(job.pid):
+            job.status = "failed"
+            job.error = job.error or f"the worker running this job (pid {job.pid}) exited"
+        return job
+
+    def _stored(self):
+        jobs = [self._load(path) for path in self.directory.glob("*.json")]
+        return sorted((job for job in jobs if job is not None), key=lambda job: job.created_at)
+
+    # === Queue ===
+    def submit(self, kind, **params):
+        """Queue a job of kind (or join the active one); returns (job, created)."""
+        if kind not in self.runners:
+            raise KeyError(f"Unknown job kind: {kind}")
+        with self._lock, _locked(self.directory / ".lock"):
+            stored = self._stored()
+            for job in stored:
+                if job.kind == kind and job.active:
+                    # Owned by this process: count it on the live object, which saves it
+                    job = self.jobs.get(job.id) or job
+                    job._save = job._save or self._save
+                    job.requests += 1
+                    job.save()
+                    return job, False
+            job = Job(kind, params, self._save)
+            job.save()
+            self.jobs[job.id] = job
+            self._trim(stored)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._work, name="jobs", daemon=True)
+                self._thread.start()
+        self._queue.put(job)
+        logger.info(f"Job {job.id} ({kind}) queued")
+        return job, True
+
+    def get(self, job_id):
+        if job_id in self.jobs:
+            return self.jobs[job_id]
+        if not job_id.isalnum():
+            return None
+        return self._load(self._path(job_id))
+
+    def list(self):
+        return [job.to_dict() for job in reversed(self._stored())]
+
+    def _trim(self, stored):
+        finished = [job for job in stored if not job.active]
+        for job in finished[:max(len(stored) + 1 - self.history, 0)]:
+            self._path(job.id).unlink(missing_ok=True)
+            self.jobs.pop(job.id, None)
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            # One job at a time across every worker process
+            with _locked(self.directory / ".run"):
+                job.status = "running"
+                job.started_at = time.time()
+                job.save()
+                try:
+                    job.result = self.runners[job.kind](job, **job.params)
+                    job.status = "succeeded"
+                except Exception as e:
+                    logger.error(f"Job {job.id} ({job.kind}) failed: {str(e)}")
+                    job.error = str(e)
+                    job.status = "failed"
+                job.finished_at = time.time()
+                job.update(stage="done")
+            logger.info(f"Job {job.id} ({job.kind}) {job.status} in {job.finished_at - job.started_at:.2f}s")
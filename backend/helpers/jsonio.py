@@ -0,0 +1,116 @@
+import gzip
+import io
+import json
+
+# Streaming JSON helpers for corpus files. Records are written one at a time
+# so memory stays flat no matter how large the corpus is.
+
+def is_gzip_path(path):
+    return str(path).endswith(".gz")
+
+def open_text(path, mode="r", compress=None):
+    """Open a UTF-8 text file, transparently gzip-compressed for *.gz paths."""
+    if compress is None:
+        compress = is_gzip_path(path)
+    if compress:
+        return io.TextIOWrapper(gzip.open(path, mode.replace("t", "") + "b"), encoding="utf-8", newline="")
+    return open(path, mode, encoding="utf-8", newline="")
+
+def encode_ndjson(record):
+    return json.dumps(record, ensure_ascii=False) + "\n"
+
+def encode_array_item(record):
+    # One element of json.dump(records, indent=2) with the surrounding indent
+    return "  " + json.dumps(record, ensure_ascii=False, indent=2).replace("\n", "\n  ")
+
+def encoder_for(fmt):
+    return encode_ndjson if fmt == "ndjson" else encode_array_item
+
+def write_encoded(items, fp, fmt="json"):
+    """Write records already encoded with encoder_for(fmt)."""
+    count = 0
+    if fmt == "ndjson":
+        for item in items:
+            fp.write(item)
+            count += 1
+        return count
+    for item in items:
+        fp.write("[\n" if count == 0 else ",\n")
+        fp.write(item)
+        count += 1
+    fp.write("\n]" if count else "[]")
+    return count
+
+def write_ndjson(records, fp):
+    return write_encoded(map(encode_ndjson, records), fp, "ndjson")
+
+def write_json_array(records, fp):
+    """Write records as a JSON array, byte-identical to json.dump(..., indent=2)."""
+    return write_encoded(map(encode_array_item, records), fp, "json")
+
+def write_records(records, path, fmt="json", compress=None):
+    with open_text(path, "w", compress) as fp:
+        if fmt == "ndjson":
+            return write_ndjson(records, fp)
+        return write_json_array(records, fp)
+
+def iter_records(path):
+    """Yield the records of a corpus file (JSON array, or NDJSON for *.ndjson / *.jsonl, maybe gzipped)."""
+    name = str(path)[:-3] if is_gzip_path(path) else str(path)
+    with open_text(path) as fp:
+        yield from (iter_ndjson(fp) if name.endswith((".ndjson", ".jsonl")) else iter_json_array(fp))
+
+def iter_ndjson(fp):
+    for line in fp:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+def iter_json_array(fp, chunk_size=1 << 16):
+    """Yield the elements of a top-level JSON array one at a time.
+
+    A top-level object is yielded as a single record. Only one chunk plus the
+    element being decoded is held in memory.
+    """
+    decoder = json.JSONDecoder()
+    buffer = fp.read(chunk_size).lstrip("﻿")
+    position = 0
+    eof = not buffer
+
+    def skip(chars):
+        nonlocal buffer, position, eof
+        while True:
+            while position < len(buffer) and buffer[position] in chars:
+                position += 1
+            if position < len(buffer) or eof:
+                return
+            chunk = fp.read(chunk_size)
+            eof = not chunk
+            buffer, position = chunk, 0
+
+    skip(" \t\r\n")
+    if position >= len(buffer):
+        return
+    if buffer[position] != "[":
+        yield json.loads(buffer[position:] + fp.read())
+        return
+    position += 1
+    while True:
+        skip(" \t\r\n,")
+        if position >= len(buffer):
+            raise ValueError("Unterminated JSON array")
+        if buffer[position] == "]":
+            return
+        try:
+            record, end = decoder.raw_decode(buffer, position)
+            if end == len(buffer) and not eof:
+                raise json.JSONDecodeError("Element may continue in the next chunk", buffer, end)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            chunk = fp.read(chunk_size)
+            eof = not chunk
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        yield record
+        position = end
@@ -0,0 +1,135 @@
+import importlib.util
+import json
+from pathlib import Path
+
+# Loads the dataset inputs (nouns.json, verbs.json, conjugations.json and
+# declensions.py) the same way gen.py / mtc_gen.py do, without depending on
+# the current working directory.
+
+DATASET_DIR = Path(__file__).resolve().parent.parent / "dataset"
+
+TENSES = ["present", "past", "future"]
+NUMBERS = ["sg", "du", "pl"]
+
+role_to_vibhakti = {
+    "subject": "प्रथमा",
+    "object": "द्वितीया"
+}
+
+number_index = {
+    "sg": 0,
+    "du": 1,
+    "pl": 2
+}
+
+def load_json(name, dataset_dir=None):
+    with open(Path(dataset_dir or DATASET_DIR) / name, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def load_declensions(dataset_dir=None):
+    path = Path(dataset_dir or DATASET_DIR) / "declensions.py"
+    spec = importlib.util.spec_from_file_location("dataset_declensions", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def flatten_nouns(noun_groups):
+    nouns = []
+    for key, roots in noun_groups.items():
+        parts = key.split("_")
+        gender = None if parts[0] == "none" else parts[0]
+        stem = None if parts[1] == "none" else parts[1]
+        for root, info in roots.items():
+            nouns.append({
+                "root": root,
+                "gender": gender,
+                "stem_type": stem,
+                "entity_classes": info["entity_classes"],
+                "usable_as_subject": info["usable_as_subject"],
+                "usable_as_object": info["usable_as_object"]
+            })
+    return nouns
+
+def flatten_verbs(raw_verbs):
+    verbs = []
+    for verb_class, content in raw_verbs.items():
+        for verb_entry in content["verbs"]:
+            verb_entry["verb_class"] = verb_class
+            verbs.append(verb_entry)
+    return verbs
+
+def load_nouns(dataset_dir=None):
+    return flatten_nouns(load_json("nouns.json", dataset_dir))
+
+def load_verbs(dataset_dir=None):
+    return flatten_verbs(load_json("verbs.json", dataset_dir))
+
+def load_conjugations(dataset_dir=None):
+    return load_json("conjugations.json", dataset_dir)
+
+def person_of(root):
+    return {"अस्मद्": "1", "युष्मद्": "2"}.get(root, "3")
+
+class Lexicon:
+    """Nouns, verbs, conjugations and declension tables loaded once."""
+
+    def __init__(self, nouns=None, verbs=None, conjugations=None, dataset_dir=None):
+        self.nouns = nouns if nouns is not None else load_nouns(dataset_dir)
+        self.verbs = verbs if verbs is not None else load_verbs(dataset_dir)
+        self.conjugations = conjugations if conjugations is not None else load_conjugations(dataset_dir)
+        declensions = load_declensions(dataset_dir)
+        self.asmad_declension = declensions.asmad_declension
+        self.yushmad_declension = declensions.yushmad_declension
+        self.declension_map = {
+            ("masc", "अ"): declensions.a_stem_masc_declension,
+            ("fem", "आ"): declensions.ā_stem_fem_declension,
+            ("neut", "अ"): declensions.a_stem_neut_declension
+        }
+
+    def inflect_noun(self, noun, role):
+        root = noun["root"]
+        number = noun.get("number", "sg")
+        index = number_index[number]
+        vibhakti = role_to_vibhakti[role]
+
+        if root == "अस्मद्":
+            return self.asmad_declension[vibhakti][index]
+        elif root == "युष्मद्":
+            return self.yushmad_declension[vibhakti][index]
+
+        gender = noun.get("gender")
+        stem = noun.get("stem_type")
+        decl_table = self.declension_map.get((gender, stem))
+        if not decl_table or vibhakti not in decl_table:
+            return root
+
+        suffix = decl_table[vibhakti][index]
+
+        if gender == "fem" and stem == "आ":
+            return (root[:-1] if root.endswith("ा") else root) + suffix
+        else:
+            return root + suffix
+
+    def get_verb_form(self, verb, person, number, tense="present"):
+        key = f"{person}_{number}"
+        verb_class = verb["verb_class"]
+
+        try:
+            suffix = self.conjugations[tense][verb_class][key]
+        except KeyError:
+            return verb["root"]  # fallback
+
+        # Choose the appropriate stem
+        if tense == "future":
+            stem = verb.get("future_stem") or verb["root"]
+        elif tense == "past":
+            stem = verb.get("past_stem") or verb["root"]
+        else:
+            stem = verb["root"]
+
+        # Drop halant for all EXCEPT present 4P
+        if not (tense == "present" and verb_class == "4P"):
+            if stem.endswith("्"):
+                stem = stem[:-1]
+
+        return stem + suffix.replace("A", "")
@@ -0,0 +1,53 @@
+from types import MappingProxyType
+
+from backend.helpers.lexicon import Lexicon, NUMBERS
+from backend.helpers.noun_index import NounIndex
+
+# Compiled morphology shared by the generators and the game servers.
+#
+# conjugations.json, verbs.json and declensions.py are compiled once into flat
+# tables: every verb form keyed by (root, class, tense, person, number), every
+# paradigm keyed by (root, class, tense), and every noun form through the
+# NounIndex. Stem selection, halant stripping and the "A" placeholder are all
+# resolved at compile time by Lexicon.get_verb_form, the reference rules.
+
+PERSONS = ["1", "2", "3"]
+PERSON_NUMBER_KEYS = [f"{person}_{number}" for number in NUMBERS for person in PERSONS]
+
+class Morphology:
+    def __init__(self, lexicon=None, verbs=None, conjugations=None):
+        if lexicon is None:
+            lexicon = Lexicon(verbs=verbs, conjugations=conjugations)
+        self.lexicon = lexicon
+        self.nouns = NounIndex(lexicon)
+        self.verbs = {}
+        self.forms = {}
+        self.paradigms = {}
+        for verb in lexicon.verbs:
+            root, verb_class = verb["root"], verb["verb_class"]
+            self.verbs.setdefault((root, verb_class), verb)
+            for tense in lexicon.conjugations:
+                table = lexicon.conjugations[tense].get(verb_class)
+                if not table:
+                    continue
+                paradigm = {}
+                for key in table:
+                    person, number = key.split("_")
+                    form = lexicon.get_verb_form(verb, person, number, tense)
+                    paradigm[key] = form
+                    self.forms[(root, verb_class, tense, person, number)] = form
+                self.paradigms[(root, verb_class, tense)] = MappingProxyType(paradigm)
+
+    def verb(self, root, verb_class):
+        return self.verbs.get((root, verb_class))
+
+    def verb_form(self, root, verb_class, tense, person, number):
+        # Falls back to the bare root like gen.py when no conjugation exists
+        return self.forms.get((root, verb_class, tense, person, number), root)
+
+    def paradigm(self, root, verb_class, tense):
+        """All person/number forms ("1_sg" ... "3_pl") of a verb, or None."""
+        return self.paradigms.get((root, verb_class, tense))
+
+    def noun_forms(self, entity_classes, role):
+        return self.nouns.for_classes(entity_classes, role)
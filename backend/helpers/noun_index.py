@@ -0,0 +1,51 @@
+from collections import namedtuple
+
+from backend.helpers.lexicon import Lexicon, NUMBERS, person_of
+
+# Precompiled noun index: every noun usable in a role is inflected once for
+# all three numbers and filed under each of its entity classes, so the
+# generators and servers only do dictionary lookups.
+
+# forms is a tuple ordered like NUMBERS (sg, du, pl)
+InflectedNoun = namedtuple("InflectedNoun", ["root", "gender", "stem", "person", "forms"])
+
+ROLES = {
+    "subject": "usable_as_subject",
+    "object": "usable_as_object"
+}
+
+class NounIndex:
+    def __init__(self, lexicon=None):
+        lexicon = lexicon or Lexicon()
+        index = {}
+        for noun in lexicon.nouns:
+            for role, usable in ROLES.items():
+                if not noun.get(usable, False):
+                    continue
+                entry = InflectedNoun(
+                    root=noun["root"],
+                    gender=noun["gender"],
+                    stem=noun["stem_type"],
+                    person=person_of(noun["root"]),
+                    forms=tuple(lexicon.inflect_noun(dict(noun, number=number), role) for number in NUMBERS)
+                )
+                for entity_class in noun["entity_classes"]:
+                    index.setdefault((entity_class, role), []).append(entry)
+        self._index = {key: tuple(entries) for key, entries in index.items()}
+        self._by_classes = {}
+
+    def lookup(self, entity_class, role):
+        """Nouns of one entity class usable in `role`, in nouns.json order."""
+        return self._index.get((entity_class, role), ())
+
+    def for_classes(self, entity_classes, role):
+        """Nouns for each class in turn (a noun listed under two classes appears twice)."""
+        key = (tuple(entity_classes), role)
+        nouns = self._by_classes.get(key)
+        if nouns is None:
+            nouns = tuple(noun for entity_class in entity_classes for noun in self.lookup(entity_class, role))
+            self._by_classes[key] = nouns
+        return nouns
+
+    def keys(self):
+        return self._index.keys()
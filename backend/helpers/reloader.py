@@ -0,0 +1,202 @@
+import hmac
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from backend.helpers.corpus_store import corpus_marker
+
+logger = logging.getLogger(__name__)
+
+# Hot corpus reload for the game servers.
+#
+# A server keeps everything it builds from the corpus (sentences, pre-encoded
+# responses, bucket index, lookup tables) in one snapshot object and reads it
+# through reloader.snapshot, once per request. build(version) gets the corpus
+# marker read just before it, to tag what it builds. A poller thread checks the
+# corpus marker (helpers/corpus_store.py) every CORPUS_POLL_INTERVAL seconds
+# (30; 0 turns polling off) and, when it changed, builds a new snapshot in the
+# background while the old one keeps serving, then swaps the reference. POST
+# /admin/reload does the same on demand (?wait=1 to block until it is in).
+#
+# A rebuild that fails, or comes back empty where the old snapshot was not,
+# is not swapped in; the error shows up in /health.
+#
+# Under gunicorn the first snapshot is built in the master before the fork
+# and every worker serves its own copy. Threads do not survive the fork, so
+# the poller starts lazily, in whichever process first reads the snapshot.
+# An on-demand reload reaches one worker only; it touches a stamp file
+# shared by its sibling workers (keyed by the parent pid), and their pollers
+# check it every second and reload too.
+#
+# /admin/reload only answers loopback callers, or any caller sending the
+# ADMIN_TOKEN secret in the X-Admin-Token header when one is set.
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+ADMIN_HEADER = "X-Admin-Token"
+STAMP_INTERVAL = 1.0
+
+CORPUS_POLL_INTERVAL = float(os.getenv("CORPUS_POLL_INTERVAL", "30"))
+
+class SnapshotReloader:
+    def __init__(self, name, build, collections, size=len, interval=None, virtual=None):
+        self.name = name
+        self.build = build
+        self.collections = collections
+        self.virtual = virtual
+        self.size = size
+        self.interval = CORPUS_POLL_INTERVAL if interval is None else interval
+        self._snapshot = None
+        self.version = None
+        self.loaded_at = None
+        self.load_seconds = None
+        self.reloads = 0
+        self.error = None
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._poller_pid = None
+        self._stamp = None
+        self.reload()
+
+    @property
+    def snapshot(self):
+        if self._poller_pid != os.getpid():
+            self.start()
+        return self._snapshot
+
+    def start(self):
+        """Start this process's poller (a forked worker has none until it reads the snapshot)."""
+        with self._start_lock:
+            if self._poller_pid == os.getpid():
+                return
+            self._poller_pid = os.getpid()
+            self._stamp = self._read_stamp()
+            threading.Thread(target=self._poll, name=f"{self.name}-reload", daemon=True).start()
+        # A sibling asked for a reload before this worker had a poller
+        if self._stamp and self.loaded_at and self._stamp / 1e9 > self.loaded_at:
+            self.trigger(broadcast=False)
+
+    @property
+    def reloading(self):
+        return self._lock.locked()
+
+    def current_marker(self):
+        return corpus_marker(self.collections, self.virtual)
+
+    def reload(self, version=None):
+        """Build a new snapshot and swap it in; False when skipped or failed."""
+        if not self._lock.acquire(blocking=False):
+            logger.info(f"{self.name}: a reload is already running")
+            return False
+        try:
+            if version is None:
+                try:
+                    version = self.current_marker()
+                except Exception as e:
+                    logger.warning(f"{self.name}: could not read the corpus version: {str(e)}")
+            start = time.perf_counter()
+            snapshot = self.build(version)
+            if self._snapshot is not None and self.size(self._snapshot) and not self.size(snapshot):
+                raise Exception("the new corpus is empty; keeping the current one")
+            # One reference assignment: requests see the old snapshot or the new one
+            self._snapshot = snapshot
+            self.version = version
+            self.loaded_at = time.time()
+            self.load_seconds = round(time.perf_counter() - start, 3)
+            self.reloads += 1
+            self.error = None
+            logger.info(f"{self.name}: loaded corpus {version} ({self.size(snapshot)} entries) "
+                        f"in {self.load_seconds:.2f}s")
+            return True
+        except Exception as e:
+            logger.error(f"{self.name}: reload failed: {str(e)}")
+            self.error = str(e)
+            return False
+        finally:
+            self._lock.release()
+
+    # === Sibling workers ===
+    def _stamp_path(self):
+        return os.path.join(tempfile.gettempdir(), f"corpus-reload-{self.name}-{os.getppid()}")
+
+    def _read_stamp(self):
+        try:
+            return os.stat(self._stamp_path()).st_mtime_ns
+        except OSError:
+            return None
+
+    def _write_stamp(self):
+        path = self._stamp_path()
+        try:
+            with open(path, "a"):
+                os.utime(path)
+            self._stamp = self._read_stamp()
+        except OSError as e:
+            logger.warning(f"{self.name}: could not signal the other workers: {str(e)}")
+
+    def trigger(self, wait=False, broadcast=True):
+        """Reload now (wait) or in the background; returns whether one was started."""
+        if self.reloading:
+            return False
+        if broadcast:
+            self._write_stamp()
+        if wait:
+            return self.reload()
+        threading.Thread(target=self.reload, name=f"{self.name}-reload-now", daemon=True).start()
+        return True
+
+    def _poll(self):
+        next_check = time.monotonic() + self.interval
+        while True:
+            time.sleep(STAMP_INTERVAL)
+            stamp = self._read_stamp()
+            if stamp != self._stamp:
+                self._stamp = stamp
+                logger.info(f"{self.name}: reload requested by another worker")
+                self.trigger(broadcast=False)
+            if self.interval <= 0 or time.monotonic() < next_check:
+                continue
+            next_check = time.monotonic() + self.interval
+            try:
+                version = self.current_marker()
+            except Exception as e:
+                logger.warning(f"{self.name}: could not read the corpus version: {str(e)}")
+                continue
+            if version != self.version:
+                logger.info(f"{self.name}: corpus changed ({self.version} -> {version}), reloading")
+                self.reload(version)
+
+    def status(self):
+        return {
+            "version": self.version,
+            "entries": self.size(self._snapshot) if self._snapshot is not None else 0,
+            "loaded_at": self.loaded_at,
+            "age_seconds": round(time.time() - self.loaded_at, 1) if self.loaded_at else None,
+            "load_seconds": self.load_seconds,
+            "reloads": self.reloads,
+            "reloading": self.reloading,
+            "poll_interval": self.interval,
+            "error": self.error
+        }
+
+def admin_allowed(request):
+    if ADMIN_TOKEN:
+        return hmac.compare_digest(request.headers.get(ADMIN_HEADER, ""), ADMIN_TOKEN)
+    return request.remote_addr in ("127.0.0.1", "::1")
+
+def admin_headers():
+    """Headers for the gateway's own calls to /admin/reload."""
+    return {ADMIN_HEADER: ADMIN_TOKEN} if ADMIN_TOKEN else {}
+
+def reload_response(reloader, request):
+    """(body, status) for POST /admin/reload."""
+    if not admin_allowed(request):
+        return {"error": "Forbidden"}, 403
+    reloader.start()
+    if request.args.get("wait") != "1":
+        started = reloader.trigger()
+        return {"started": started, "corpus": reloader.status()}, 202 if started else 409
+    if reloader.trigger(wait=True):
+        return {"started": True, "corpus": reloader.status()}, 200
+    return {"started": False, "corpus": reloader.status()}, 500 if reloader.error else 409
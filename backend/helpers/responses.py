@@ -0,0 +1,139 @@
+import json
+import logging
+import os
+import random
+import time
+
+from bson import json_util
+from flask import Response, request
+
+from backend.helpers.buckets import BucketIndex, requested_selection
+from backend.helpers.corpus import use_virtual_corpus
+from backend.helpers.streams import STREAM_HEADER, pool_key, requested_stream
+
+logger = logging.getLogger(__name__)
+
+# Pre-encoded responses for the random-question endpoints.
+#
+# The sentence set only changes on a reload, so each server renders the
+# response for every sentence once at load time, straight to JSON bytes
+# (ObjectIds included). A request then picks one and sends it as is. With the
+# virtual corpus (USE_VIRTUAL_CORPUS) holding every response would defeat the
+# point of not materialising sentences, so responses are rendered per request
+# instead.
+#
+# Every game endpoint also takes ?count=N and then answers with a JSON array of
+# N different questions in one round trip. N is capped by
+# <GAME>_MAX_BATCH_SIZE, then MAX_BATCH_SIZE (50).
+#
+# Both kinds of request can be narrowed with the facet filters of
+# helpers/buckets.py (?tense=, ?person=, ?number=, ?class=, ?root=, ?object=,
+# ?balance=); draws then come from the cache's bucket index. ?stream= serves
+# them in a per-session no-repeat order instead (helpers/streams.py), over the
+# pool named by the corpus version the cache was built from and the filters.
+
+def encode_body(payload):
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=json_util.default).encode("utf-8")
+
+def json_response(body, status=200, stream=None):
+    response = Response(body, status=status, mimetype="application/json")
+    if stream is not None:
+        response.headers[STREAM_HEADER] = stream.token()
+    return response
+
+def json_array(bodies):
+    return b"[" + b",".join(bodies) + b"]"
+
+def max_batch_size(name):
+    value = os.getenv(f"{name.upper()}_MAX_BATCH_SIZE") or os.getenv("MAX_BATCH_SIZE")
+    return int(value) if value else 50
+
+def requested_count(name, default=None):
+    """?count= of the current request (default when absent); ValueError when out of range."""
+    value = request.args.get("count")
+    if value is None:
+        return default
+    limit = max_batch_size(name)
+    try:
+        count = int(value)
+    except ValueError:
+        count = 0
+    if count < 1 or count > limit:
+        raise ValueError(f"Invalid question count (1-{limit} allowed)")
+    return count
+
+def requested_query(name, default=None):
+    """(count, selection, stream) of the current request; ValueError for a bad count or filter."""
+    count, selection, stream = requested_count(name, default), requested_selection(), requested_stream(name)
+    if stream is not None and selection and selection[1]:
+        raise ValueError("balance cannot be combined with a stream")
+    return count, selection, stream
+
+class ResponseCache:
+    """render(entry) for every entry, computed up front."""
+
+    def __init__(self, entries, render, name="responses", precompute=None, version=None):
+        self.entries = entries
+        self.render = render
+        self.version = version
+        self.responses = None
+        if precompute is None:
+            precompute = not use_virtual_corpus()
+        if precompute:
+            start = time.perf_counter()
+            self.responses = [render(entry) for entry in entries]
+            size = sum(len(part) for response in self.responses for part in response if isinstance(part, bytes))
+            logger.info(f"Pre-encoded {len(self.responses)} {name} ({size / 1e6:.1f} MB) "
+                        f"in {time.perf_counter() - start:.2f}s")
+        start = time.perf_counter()
+        self.buckets = BucketIndex(entries)
+        logger.info(f"Indexed {name} into {len(self.buckets.buckets)} buckets "
+                    f"in {time.perf_counter() - start:.2f}s")
+
+    def __len__(self):
+        return len(self.entries)
+
+    def at(self, index):
+        if self.responses is not None:
+            return self.responses[index]
+        return self.render(self.entries[index])
+
+    def choice(self, selection=None, stream=None):
+        """One random response; selection is (filters, balance) from requested_selection()."""
+        if stream is not None:
+            return self.sample(1, selection, stream)[0]
+        if selection:
+            index = self.buckets.draw(*selection)
+            if index is None:
+                raise LookupError("No questions match the filters")
+            return self.at(index)
+        if self.responses is not None:
+            return self.responses[random.randrange(len(self.responses))]
+        return self.render(random.choice(self.entries))
+
+    def sample(self, k, selection=None, stream=None):
+        """k different responses."""
+        if stream is not None:
+            return [self.at(index) for index in self._stream_indices(stream, k, selection)]
+        if selection:
+            indices = self.buckets.sample(k, *selection)
+            if not indices:
+                raise LookupError("No questions match the filters")
+            return [self.at(index) for index in indices]
+        if self.responses is not None:
+            return random.sample(self.responses, min(k, len(self.responses)))
+        return [self.render(entry) for entry in random.sample(self.entries, min(k, len(self.entries)))]
+
+    def batch(self, k, selection=None, stream=None):
+        """Bodies of up to k different servable (200) responses."""
+        return [response[1] for response in self.sample(k, selection, stream) if response[0] == 200]
+
+    def _stream_indices(self, stream, k, selection):
+        filters = selection[0] if selection else None
+        total = self.buckets.select(filters)[2] if filters else len(self.entries)
+        if not total:
+            raise LookupError("No questions match the filters")
+        positions = stream.take(total, k, pool_key(self.version, filters))
+        if filters:
+            return [self.buckets.nth(position, filters) for position in positions]
+        return positions
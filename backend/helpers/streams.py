@@ -0,0 +1,125 @@
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import struct
+
+from flask import request
+
+logger = logging.getLogger(__name__)
+
+# Per-session question streams.
+#
+# A stream walks the corpus in a shuffled order without keeping a seen list:
+# position i of the walk is permute(i), a keyed pseudo-random permutation of
+# 0..size-1 (a small Feistel network over the next power of four, cycle-walked
+# back into range). The whole session state is seed, cursor and size plus a
+# digest of the pool being walked (the corpus version and the normalized
+# facet filters), carried by the client in a signed token:
+#
+#   GET /api/get-game?stream=new        start a stream
+#   X-Question-Stream: <token>          response header, the stream's next state
+#   GET /api/get-game?stream=<token>    next question, never one already served
+#
+# No question repeats until the stream has been through every one; it then
+# reshuffles with a fresh seed (a ?count= batch that spans the reshuffle
+# still holds N different questions). ?count= takes the next N, and the facet filters
+# of helpers/buckets.py permute the matching pool instead. The stream restarts
+# when the pool changes: other filters or a reloaded corpus, even one that
+# happens to have the same size. Tokens are signed with STREAM_SECRET (a random
+# per-process key when unset, so streams restart with the server); a token
+# that does not verify starts a new stream rather than failing the request.
+
+STREAM_HEADER = "X-Question-Stream"
+FEISTEL_ROUNDS = 4
+# seed, cursor, size, pool digest
+PAYLOAD = ">QII8s"
+SECRET = os.getenv("STREAM_SECRET", "").encode("utf-8") or secrets.token_bytes(32)
+
+def _round(seed, round_index, value, mask):
+    key = struct.pack(">QB", seed, round_index)
+    digest = hashlib.blake2b(value.to_bytes(8, "big"), key=key, digest_size=8).digest()
+    return int.from_bytes(digest, "big") & mask
+
+def permute(position, size, seed):
+    """Image of position under the seed's permutation of range(size)."""
+    half = max(1, ((size - 1).bit_length() + 1) // 2)
+    mask = (1 << half) - 1
+    value = position
+    while True:
+        left, right = value >> half, value & mask
+        for round_index in range(FEISTEL_ROUNDS):
+            left, right = right, left ^ _round(seed, round_index, right, mask)
+        value = (left << half) | right
+        if value < size:
+            return value
+
+def pool_key(version, filters):
+    """Digest of the pool a stream walks: the corpus version and the filters."""
+    text = json.dumps([version, sorted((filters or {}).items())], ensure_ascii=False, default=str)
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+
+def _encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+def _decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+class Stream:
+    def __init__(self, name, seed=None, cursor=0, size=0, pool=bytes(8)):
+        self.name = name
+        self.seed = secrets.randbits(64) if seed is None else seed
+        self.cursor = cursor
+        self.size = size
+        self.pool = pool
+
+    def take(self, size, k, pool=bytes(8)):
+        """Positions (in range(size)) of the next k questions from pool (see pool_key()); advances the cursor."""
+        if size != self.size or pool != self.pool:
+            self.seed, self.cursor, self.size, self.pool = secrets.randbits(64), 0, size, pool
+        positions = []
+        batch = set()
+        while len(positions) < min(k, size):
+            if self.cursor >= size:
+                self.seed, self.cursor = secrets.randbits(64), 0
+            position = permute(self.cursor, size, self.seed)
+            self.cursor += 1
+            # A batch that straddles a reshuffle skips what it already holds
+            if position in batch:
+                continue
+            batch.add(position)
+            positions.append(position)
+        return positions
+
+    def _signature(self, payload):
+        return hmac.new(SECRET, self.name.encode("utf-8") + payload, hashlib.blake2b).digest()[:9]
+
+    def token(self):
+        payload = struct.pack(PAYLOAD, self.seed, self.cursor, self.size, self.pool)
+        return f"{_encode(payload)}.{_encode(self._signature(payload))}"
+
+    @classmethod
+    def from_token(cls, name, token):
+        """The stream a token describes, or a new one when it does not verify."""
+        stream = cls(name)
+        try:
+            payload, signature = (_decode(part) for part in token.split("."))
+            if hmac.compare_digest(signature, stream._signature(payload)):
+                stream.seed, stream.cursor, stream.size, stream.pool = struct.unpack(PAYLOAD, payload)
+                return stream
+        except (ValueError, struct.error):
+            pass
+        logger.debug(f"Unrecognised {name} stream token, starting a new stream")
+        return stream
+
+def requested_stream(name):
+    """Stream named by ?stream= of the current request, or None."""
+    token = request.args.get("stream")
+    if token is None:
+        return None
+    if token in ("", "new"):
+        return Stream(name)
+    return Stream.from_token(name, token)
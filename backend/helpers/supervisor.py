@@ -0,0 +1,210 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Supervisor for the game server child processes.
+#
+# - start_all() spawns every child at once and waits for their readiness
+#   probes in parallel, so cold start costs the slowest server, not the sum.
+# - A monitor thread notices children that exit and restarts them with
+#   exponential backoff (SUPERVISOR_BACKOFF_BASE doubling up to
+#   SUPERVISOR_BACKOFF_MAX seconds; the streak resets once a child has stayed
+#   up longer than the maximum backoff).
+# - restart(name) drains first: the drain callback (the gateway holds new
+#   proxy calls and waits for in-flight ones) runs before the child is
+#   terminated, and releases the held calls once the new child is ready.
+# - Recovery and restarts take the child's lock, so only one of them ever
+#   spawns a replacement.
+# - stats() exposes cold start, per-child start and recovery (MTTR) timings.
+
+def _env_float(name, default):
+    value = os.getenv(name)
+    return float(value) if value else default
+
+class ManagedProcess:
+    def __init__(self, name, port, label):
+        self.name = name
+        self.port = port
+        self.label = label
+        self.process = None
+        self.state = "stopped"
+        self.lock = threading.Lock()
+        self.restarts = 0
+        self.crashes = 0
+        self.failure_streak = 0
+        self.last_exit_code = None
+        self.started_at = None
+        self.ready_at = None
+        self.crashed_at = None
+        self.start_seconds = None
+        self.recovery_seconds = []
+
+    def stats(self):
+        recoveries = self.recovery_seconds
+        return {
+            "state": self.state,
+            "pid": self.process.pid if self.process else None,
+            "port": self.port,
+            "restarts": self.restarts,
+            "crashes": self.crashes,
+            "failure_streak": self.failure_streak,
+            "last_exit_code": self.last_exit_code,
+            "start_seconds": self.start_seconds,
+            "uptime_seconds": round(time.time() - self.ready_at, 1) if self.state == "ready" else None,
+            "last_recovery_seconds": recoveries[-1] if recoveries else None,
+            "mean_recovery_seconds": round(sum(recoveries) / len(recoveries), 3) if recoveries else None,
+        }
+
+class ProcessSupervisor:
+    def __init__(self, spawn, probe, drain=None, ready_timeout=None, poll_interval=None,
+                 backoff_base=None, backoff_max=None):
+        """spawn(name) -> Popen or None, probe(name) -> bool, drain(name, on) -> None."""
+        self.spawn = spawn
+        self.probe = probe
+        self.drain = drain
+        self.ready_timeout = ready_timeout or _env_float("SUPERVISOR_READY_TIMEOUT", 30.0)
+        self.poll_interval = poll_interval or _env_float("SUPERVISOR_POLL_INTERVAL", 0.25)
+        self.backoff_base = backoff_base or _env_float("SUPERVISOR_BACKOFF_BASE", 1.0)
+        self.backoff_max = backoff_max or _env_float("SUPERVISOR_BACKOFF_MAX", 30.0)
+        self.children = {}
+        self.cold_start_seconds = None
+        self._stop = threading.Event()
+        self._monitor = None
+
+    def add(self, name, port, label):
+        self.children[name] = ManagedProcess(name, port, label)
+
+    # === Lifecycle ===
+    def _launch(self, child):
+        child.state = "starting"
+        child.started_at = time.time()
+        child.process = self.spawn(child.name)
+        if child.process is None:
+            child.crashed_at = child.crashed_at or time.time()
+            child.state = "crashed"
+            return False
+        deadline = child.started_at + self.ready_timeout
+        while time.time() < deadline:
+            if child.process.poll() is not None:
+                break
+            if self.probe(child.name):
+                child.ready_at = time.time()
+                child.start_seconds = round(child.ready_at - child.started_at, 3)
+                child.state = "ready"
+                logger.info(f"✓ {child.label} ready in {child.start_seconds:.2f}s (pid {child.process.pid})")
+                return True
+            time.sleep(self.poll_interval)
+        logger.error(f"✗ {child.label} failed to become ready")
+        self._terminate(child)
+        child.last_exit_code = child.process.poll()
+        child.crashed_at = child.crashed_at or time.time()
+        child.state = "crashed"
+        return False
+
+    def start_all(self):
+        self._stop.clear()
+        start = time.time()
+        with ThreadPoolExecutor(max_workers=max(len(self.children), 1)) as pool:
+            results = dict(zip(self.children, pool.map(self._launch, self.children.values())))
+        self.cold_start_seconds = round(time.time() - start, 3)
+        logger.info(f"Cold start finished in {self.cold_start_seconds:.2f}s")
+        if self._monitor is None or not self._monitor.is_alive():
+            self._monitor = threading.Thread(target=self._watch, name="supervisor", daemon=True)
+            self._monitor.start()
+        return results
+
+    def _terminate(self, child, timeout=10):
+        process = child.process
+        if process and process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(timeout=timeout)
+            except Exception:
+                process.kill()
+                process.wait()
+
+    def stop_all(self):
+        self._stop.set()
+        for child in self.children.values():
+            with child.lock:
+                child.state = "stopped"
+                self._terminate(child)
+                logger.info(f"Stopped {child.label}")
+
+    # === Crash recovery ===
+    def _backoff(self, child):
+        return min(self.backoff_base * 2 ** max(child.failure_streak - 1, 0), self.backoff_max)
+
+    def _recover(self, child):
+        # A restart or another recovery already owns the child
+        if not child.lock.acquire(blocking=False):
+            return
+        try:
+            if child.state != "crashed" or self._stop.is_set():
+                return
+            delay = self._backoff(child)
+            logger.warning(f"{child.label} exited with code {child.last_exit_code}; restarting in {delay:.1f}s")
+            if self._stop.wait(delay):
+                return
+            child.restarts += 1
+            if self._launch(child):
+                child.recovery_seconds.append(round(child.ready_at - child.crashed_at, 3))
+                child.crashed_at = None
+            else:
+                child.failure_streak += 1
+        finally:
+            child.lock.release()
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            for child in self.children.values():
+                if child.state != "ready" or child.process is None:
+                    # locked() only saves starting a thread; _recover itself takes the lock
+                    if child.state == "crashed" and not child.lock.locked():
+                        threading.Thread(target=self._recover, args=(child,), daemon=True).start()
+                    continue
+                if child.lock.locked():
+                    # A restart is replacing this process
+                    continue
+                code = child.process.poll()
+                if code is None:
+                    continue
+                child.last_exit_code = code
+                child.crashes += 1
+                child.crashed_at = time.time()
+                if child.ready_at and child.crashed_at - child.ready_at > self.backoff_max:
+                    child.failure_streak = 0
+                child.failure_streak += 1
+                child.state = "crashed"
+                threading.Thread(target=self._recover, args=(child,), daemon=True).start()
+
+    # === Rolling restarts ===
+    def restart(self, name):
+        child = self.children[name]
+        with child.lock:
+            start = time.time()
+            child.state = "draining"
+            if self.drain:
+                self.drain(name, True)
+            try:
+                self._terminate(child)
+                child.restarts += 1
+                ready = self._launch(child)
+            finally:
+                if self.drain:
+                    self.drain(name, False)
+            logger.info(f"Restarted {child.label} in {time.time() - start:.2f}s")
+            return ready
+
+    def rolling_restart(self):
+        return {name: self.restart(name) for name in self.children}
+
+    def stats(self):
+        return {
+            "cold_start_seconds": self.cold_start_seconds,
+            "children": {name: child.stats() for name, child in self.children.items()},
+        }
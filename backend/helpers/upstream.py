@@ -0,0 +1,127 @@
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Pooled keep-alive clients for the servers the gateway proxies to.
+#
+# Every upstream gets its own requests.Session with a bounded connection pool
+# and a bounded number of in-flight requests. When an upstream is slow its
+# slots fill up and further calls fail fast with UpstreamBusy (a 503 at the
+# gateway) instead of tying up every gateway worker thread. While an upstream
+# is draining for a restart, calls are held until it is back (up to
+# DRAIN_WAIT seconds) rather than rejected. A held call keeps its slot, so a
+# restart parks at most MAX_IN_FLIGHT threads per upstream; the rest fail
+# fast as usual.
+#
+# Limits come from the environment, per upstream first and then globally:
+#   UPSTREAM_<NAME>_MAX_CONNECTIONS / UPSTREAM_MAX_CONNECTIONS   pooled sockets (10)
+#   UPSTREAM_<NAME>_MAX_IN_FLIGHT   / UPSTREAM_MAX_IN_FLIGHT     concurrent calls (16)
+#   UPSTREAM_<NAME>_ACQUIRE_TIMEOUT / UPSTREAM_ACQUIRE_TIMEOUT   wait for a slot, s (0.05)
+#   UPSTREAM_<NAME>_CONNECT_TIMEOUT / UPSTREAM_CONNECT_TIMEOUT   s (2)
+#   UPSTREAM_<NAME>_READ_TIMEOUT    / UPSTREAM_READ_TIMEOUT      s (10)
+#   UPSTREAM_<NAME>_DRAIN_WAIT      / UPSTREAM_DRAIN_WAIT        hold during a restart, s (30)
+
+class UpstreamBusy(Exception):
+    pass
+
+def _env(name, key, default, cast):
+    value = os.getenv(f"UPSTREAM_{name.upper()}_{key}") or os.getenv(f"UPSTREAM_{key}")
+    return cast(value) if value else default
+
+def get_upstream_options(name):
+    return {
+        "max_connections": _env(name, "MAX_CONNECTIONS", 10, int),
+        "max_in_flight": _env(name, "MAX_IN_FLIGHT", 16, int),
+        "acquire_timeout": _env(name, "ACQUIRE_TIMEOUT", 0.05, float),
+        "connect_timeout": _env(name, "CONNECT_TIMEOUT", 2.0, float),
+        "read_timeout": _env(name, "READ_TIMEOUT", 10.0, float),
+        "drain_wait": _env(name, "DRAIN_WAIT", 30.0, float),
+    }
+
+class Upstream:
+    def __init__(self, name, base_url, **options):
+        self.name = name
+        self.base_url = base_url.rstrip("/")
+        self.options = dict(get_upstream_options(name), **options)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.options["max_connections"])
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._slots = threading.BoundedSemaphore(self.options["max_in_flight"])
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.requests = 0
+        self.rejected = 0
+        self.errors = 0
+        self._open = threading.Event()
+        self._open.set()
+
+    @property
+    def draining(self):
+        return not self._open.is_set()
+
+    @draining.setter
+    def draining(self, value):
+        if value:
+            self._open.clear()
+        else:
+            self._open.set()
+
+    def request(self, method, path, timeout=None, **kwargs):
+        if not self._slots.acquire(timeout=self.options["acquire_timeout"]):
+            with self._lock:
+                self.rejected += 1
+            raise UpstreamBusy(f"{self.name} is busy ({self.options['max_in_flight']} requests in flight or held)")
+        if self.draining and not self._open.wait(self.options["drain_wait"]):
+            self._slots.release()
+            with self._lock:
+                self.rejected += 1
+            raise UpstreamBusy(f"{self.name} is restarting")
+        with self._lock:
+            self.in_flight += 1
+            self.requests += 1
+        try:
+            return self.session.request(
+                method,
+                self.base_url + path,
+                timeout=timeout or (self.options["connect_timeout"], self.options["read_timeout"]),
+                **kwargs
+            )
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._slots.release()
+
+    def wait_idle(self, timeout=10.0, poll_interval=0.05):
+        deadline = time.monotonic() + timeout
+        while self.in_flight and time.monotonic() < deadline:
+            time.sleep(poll_interval)
+        return self.in_flight == 0
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "url": self.base_url,
+                "in_flight": self.in_flight,
+                "requests": self.requests,
+                "rejected": self.rejected,
+                "errors": self.errors,
+                "draining": self.draining,
+                "options": self.options,
+            }
+
+    def close(self):
+        self.session.close()
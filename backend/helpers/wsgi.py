@@ -0,0 +1,84 @@
+import gc
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Launch helper shared by the gateway, the game servers and Database/app.py.
+#
+# SERVER_MODE=production serves the app with gunicorn instead of the Flask
+# dev server. The app (and with it the corpus) is already loaded when serve()
+# is called, so the master preloads it and forked workers share those pages
+# copy-on-write; gc.freeze() keeps the collector from touching (and so
+# copying) them afterwards. Workers and threads come from <NAME>_WORKERS /
+# <NAME>_THREADS, then WEB_WORKERS / WEB_THREADS. A caller that keeps
+# process-local state every request must see (child process handles, say)
+# passes workers=1 and gets its concurrency from threads alone. Background
+# threads and child processes must not be started before serve(): threads
+# do not survive the fork. Pass them as on_start, which runs in the serving
+# process (each gunicorn worker after it boots, or before the dev server).
+
+def production_mode_requested():
+    return os.getenv("SERVER_MODE", "development").lower() == "production"
+
+def _env_int(name, key, default):
+    value = os.getenv(f"{name.upper()}_{key}") or os.getenv(f"WEB_{key}")
+    return int(value) if value else default
+
+def get_server_options(name):
+    return {
+        "workers": _env_int(name, "WORKERS", os.cpu_count() or 1),
+        "threads": _env_int(name, "THREADS", 4),
+        "timeout": _env_int(name, "TIMEOUT", 30),
+        "keepalive": _env_int(name, "KEEPALIVE", 5),
+    }
+
+def _run_dev_server(app, host, port, debug, on_start):
+    # With the reloader on, only the child it spawns (WERKZEUG_RUN_MAIN) serves
+    if on_start and (not debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true"):
+        on_start()
+    app.run(host=host, port=port, debug=debug, use_reloader=debug)
+
+def serve(app, port, name, host="0.0.0.0", debug=False, extra_ports=(), workers=None, on_start=None):
+    """Run app on port (and extra_ports) with gunicorn in production mode, else the dev server."""
+    if not production_mode_requested():
+        _run_dev_server(app, host, port, debug, on_start)
+        return
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        logger.error("SERVER_MODE=production needs gunicorn (pip install gunicorn); using the Flask dev server")
+        _run_dev_server(app, host, port, False, on_start)
+        return
+
+    options = get_server_options(name)
+    if workers is not None:
+        if _env_int(name, "WORKERS", workers) != workers:
+            logger.warning(f"{name} runs {workers} worker(s); ignoring {options['workers']} from the environment")
+        options["workers"] = workers
+    config = {
+        "bind": [f"{host}:{p}" for p in (port, *extra_ports)],
+        "workers": options["workers"],
+        "threads": options["threads"],
+        "timeout": options["timeout"],
+        "keepalive": options["keepalive"],
+        "preload_app": True,
+        "proc_name": name,
+    }
+    if on_start:
+        config["post_worker_init"] = lambda worker: on_start()
+
+    class Server(BaseApplication):
+        def load_config(self):
+            for key, value in config.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    # Move everything loaded so far out of the collector's reach before forking
+    gc.collect()
+    gc.freeze()
+    logger.info(f"Starting {name} with gunicorn on {', '.join(config['bind'])} "
+                f"({options['workers']} workers x {options['threads']} threads)")
+    Server().run()
@@ -3,173 +3,121 @@ import os
 # Add project root to sys.path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 import random
-import re
+import json
+import hashlib
 import logging
-from flask import Flask, jsonify
+from flask import Blueprint, Flask, Response, jsonify, request
 from flask_cors import CORS
-from pymongo import MongoClient
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
+bp = Blueprint("mtc_game", __name__)
 CORS(app)
 
 try:
     from Database.db import get_db_connection
     db = get_db_connection()
     matching_game_collection = db["matching_game"]
-    sentences_collection = db["sentences"]
-    conjugations_collection = db["conjugations"]
-    verbs_collection = db["verbs"]
     logger.info("Connected to MongoDB")
 except Exception as e:
     logger.error(f"MongoDB connection failed: {e}")
     matching_game_collection = None
-    sentences_collection = None
-    conjugations_collection = None
-    verbs_collection = None
-    print(f"❌ MongoDB connection failed: {e}")
-    matching_game_collection = None
-    sentences_collection = None
-    conjugations_collection = None
-    verbs_collection = None
-# === Load data from MongoDB ===
-def load_sentences():
-    try:
-        if sentences_collection is None:
-            raise Exception("Sentences collection not available")
-        return list(sentences_collection.find({
-            "sentence": {"$exists": True},
-            "verb.form": {"$exists": True},
-            "verb.root": {"$exists": True},
-            "verb.class": {"$exists": True},
-            "tense": {"$in": ["present", "past", "future"]},
-            "subject.form": {"$exists": True},
-            "subject.person": {"$exists": True},
-            "subject.number": {"$exists": True}
-        }))
-    except Exception as e:
-        print(f"❌ Failed to load sentences: {e}")
-        return []
-
-def load_conjugations():
+from Database import indexes
+from backend.helpers import corpus_store
+from backend.helpers.wsgi import serve
+from backend.helpers.responses import requested_count
+from backend.helpers.reloader import SnapshotReloader, reload_response
+
+# === Matching game snapshot ===
+# The matching game set is read once. The full set is served as pre-encoded
+# bytes with an ETag derived from the corpus version marker read before the
+# set was (see helpers/reloader.py) and the bytes themselves (a database
+# without a version pointer has a fixed marker), so clients revalidate with
+# If-None-Match and get a 304 instead of the whole set until a new version is
+# published. The gateway serves this same snapshot. Rounds for
+# ?tense=&count= are drawn from per-tense pools that only hold entries whose
+# six forms are all different (the UI tells the tiles apart by their text).
+
+FORM_NUMBERS = ["sg", "du", "pl"]
+
+def has_distinct_forms(entry):
+    forms = [entry["subject_forms"][n] for n in FORM_NUMBERS] + [entry["verb_forms"][n] for n in FORM_NUMBERS]
+    return all(forms) and len(set(forms)) == len(forms)
+
+def build_matching_snapshot(entries, version):
+    body = json.dumps(entries, ensure_ascii=False).encode("utf-8")
+    pools = {}
+    for entry in entries:
+        if has_distinct_forms(entry):
+            pools.setdefault(entry["tense"], []).append(entry)
+    return {
+        "entries": entries,
+        "body": body,
+        "etag": hashlib.blake2b(str(version).encode("utf-8") + b"\0" + body, digest_size=12).hexdigest(),
+        "pools": pools,
+        "playable": [entry for pool in pools.values() for entry in pool]
+    }
+
+def load_matching_game(version):
     try:
-        if conjugations_collection is None:
-            raise Exception("Conjugations collection not available")
-        combined = {}
-        for doc in conjugations_collection.find():
-            for tense in ["present", "past", "future"]:
-                if tense in doc:
-                    combined[tense] = doc[tense]
-        return combined
-    except Exception as e:
-        print(f"❌ Failed to load conjugations: {e}")
-        return {}
-
-def load_verbs():
-    try:
-        if verbs_collection is None:
-            raise Exception("Verbs collection not available")
-        flat_verbs = []
-        for doc in verbs_collection.find():
-            for vclass in doc:
-                if vclass in ["1P", "4P", "6P", "10P"]:
-                    for verb in doc[vclass].get("verbs", []):
-                        verb["verb_class"] = vclass
-                        flat_verbs.append(verb)
-        return flat_verbs
+        if matching_game_collection is None:
+            raise Exception("MongoDB not connected")
+        # Filter only documents that have the full expected structure
+        entries = corpus_store.find("matching_game", indexes.query("matching_game.mtc_game"), {"_id": 0})
+        snapshot = build_matching_snapshot(entries, version)
+        logger.info(f"Loaded {len(entries)} matching game entries ({len(snapshot['playable'])} playable)")
+        return snapshot
     except Exception as e:
-        print(f"❌ Failed to load verbs: {e}")
-        return []
+        logger.error(f"Failed to load matching game data: {e}")
+        return None
 
 # === Load data ===
-sentences = load_sentences()
-conjugations = load_conjugations()
-verbs = load_verbs()
-
-# === Helper Functions ===
-def label(person, number):
-    person_map = {"1": "First person", "2": "Second person", "3": "Third person"}
-    number_map = {"sg": "singular", "du": "dual", "pl": "plural"}
-    return f"{person_map.get(person)} {number_map.get(number)}"
-
-def replace_verb_with_blank(text, form):
-    words = text.split()
-    if form in words:
-        words[words.index(form)] = "_____"
-    else:
-        words[-1] = "_____"
-    return " ".join(words)
-
-def generate_distractors(correct_form, root, vclass, tense):
-    if tense not in conjugations or vclass not in conjugations[tense]:
-        return []
-
-    stem = root
-    matching = next((v for v in verbs if v["root"] == root and v["verb_class"] == vclass), None)
-    if tense == "past":
-        stem = matching.get("past_stem", root)
-    elif tense == "future":
-        stem = matching.get("future_stem", root)
-
-    distractors = []
-    for key, suffix in conjugations[tense][vclass].items():
-        try:
-            if stem.endswith("्"):
-                stem = stem[:-1]
-            form = stem + suffix.replace("A", "")
-            if form != correct_form:
-                distractors.append(form)
-        except:
-            continue
-    return random.sample(distractors, min(3, len(distractors)))
-
-def generate_explanation(sentence):
-    subject = sentence.get("subject", {})
-    verb = sentence.get("verb", {})
-    obj = sentence.get("object", {})
-
-    parts = [
-        f"Subject '{subject.get('form', '')}' is in {label(subject.get('person'), subject.get('number'))} form.",
-        f"Verb root: '{verb.get('root')}', class {verb.get('class')}, meaning: '{verb.get('meaning', '')}.",
-        f"This verb {'requires' if obj else 'does not require'} an object.",
-        f"The correct form is '{verb.get('form')}' to match the subject.",
-        f"Full sentence: {sentence.get('sentence')}"
-    ]
-    return " ".join(parts)
+# The served matching game, rebuilt in the background when the collection
+# changes (it is always read from the database, even with the virtual corpus)
+corpus = SnapshotReloader("matching_game", load_matching_game, ["matching_game"],
+                          size=lambda snapshot: len(snapshot["entries"]) if snapshot else 0, virtual=False)
 
 # === API Route ===
-@app.route('/api/get-matching-game', methods=['GET'])
+@bp.route('/api/get-matching-game', methods=['GET'])
 def get_matching_game():
+    snapshot = corpus.snapshot
+    if snapshot is None:
+        return jsonify({"error": "Matching game data not loaded"}), 500
+    if "tense" in request.args or "count" in request.args:
+        return sample_rounds(snapshot)
+    response = Response(snapshot["body"], mimetype="application/json")
+    response.set_etag(snapshot["etag"])
+    response.headers["Cache-Control"] = "no-cache"
+    return response.make_conditional(request)
+
+def sample_rounds(snapshot):
+    tense = request.args.get("tense")
+    pool = snapshot["pools"].get(tense) if tense else snapshot["playable"]
+    if pool is None:
+        return jsonify({"error": f"Unknown tense: {tense}"}), 400
     try:
-        if matching_game_collection is None:
-            raise Exception("MongoDB not connected")
-        
-        # Filter only documents that have the full expected structure
-        data = list(matching_game_collection.find({
-            "subject_root": {"$exists": True},
-            "verb_root": {"$exists": True},
-            "subject_forms.sg": {"$exists": True},
-            "subject_forms.du": {"$exists": True},
-            "subject_forms.pl": {"$exists": True},
-            "verb_forms.sg": {"$exists": True},
-            "verb_forms.du": {"$exists": True},
-            "verb_forms.pl": {"$exists": True},
-            "tense": {"$exists": True},
-            "meaning": {"$exists": True}
-        }, {"_id": 0}))  # Optional: Exclude _id
-        
-        return jsonify(data)
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        count = requested_count("matching_game", default=1)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    # No entry twice in one response; the cost follows count, not the set size
+    rounds = random.sample(pool, min(count, len(pool)))
+    return jsonify({"tense": tense, "count": len(rounds), "version": snapshot["etag"], "rounds": rounds})
 
 
-@app.route("/health")
+@bp.route("/health")
 def health():
-    return jsonify({"status": "healthy", "server": "verb_game"}), 200
+    return jsonify({"status": "healthy", "server": "verb_game", "corpus": corpus.status()}), 200
+
+@bp.route("/admin/reload", methods=["POST"])
+def admin_reload():
+    body, status = reload_response(corpus, request)
+    return jsonify(body), status
+
+app.register_blueprint(bp)
 
 if __name__ == "__main__":
-    print(f"Loaded {len(sentences)} sentences")
-    app.run(debug=True, port=5005)
+    print(f"Loaded {corpus.status()['entries']} matching game entries")
+    serve(app, 5005, "mtc_game", host="127.0.0.1", debug=os.getenv("FLASK_DEBUG", "1") == "1")
@@ -5,16 +5,21 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')
 # Verify sys.path for debugging (optional, can be removed in production)
 print("sys.path:", sys.path)
 
-from flask import Flask, jsonify
+from flask import Blueprint, Flask, jsonify, request
 from flask_cors import CORS
 from Database.db import get_db_connection
-import random
+from Database import indexes
+from backend.helpers import corpus_store
+from backend.helpers.wsgi import serve
+from backend.helpers.corpus import use_virtual_corpus
+from backend.helpers.reloader import SnapshotReloader, reload_response
 import argparse
 import logging
-from flask import Response
 from bson.json_util import dumps
+from backend.helpers.responses import ResponseCache, encode_body, json_array, json_response, requested_query
 
 app = Flask(__name__)
+bp = Blueprint("number_game", __name__)
 CORS(app, resources={
     r"/api/*": {
         "origins": ["http://localhost:5173"],
@@ -35,49 +40,74 @@ except Exception as e:
     logger.error(f"Failed to connect to MongoDB: {str(e)}")
     db = None
 
-# Load sentences at startup
-logger.info("Loading sentences from MongoDB")
-try:
-    if db is None:
-        raise Exception("No MongoDB connection")
-    all_sentences = list(db.sentences.find({
-        "object": None,
-        "subject.person": {"$in": ["1", "2", "3"]},
-        "subject.number": {"$in": ["sg", "du", "pl"]}
-    })) 
-    logger.info(f"Loaded {len(all_sentences)} sentences without requires_object")
-except Exception as e:
-    logger.error(f"Error loading sentences: {str(e)}")
-    all_sentences = []
+def load_sentences():
+    logger.info("Loading sentences from MongoDB")
+    try:
+        if use_virtual_corpus():
+            sentences = corpus_store.virtual_corpus(transitive=False)
+        elif db is None:
+            raise Exception("No MongoDB connection")
+        else:
+            sentences = corpus_store.find("sentences", indexes.query("sentences.number_game"))
+        logger.info(f"Loaded {len(sentences)} sentences without requires_object")
+        return sentences
+    except Exception as e:
+        logger.error(f"Error loading sentences: {str(e)}")
+        return []
+
+# Storage bookkeeping stamped by the corpus sync, not part of the question
+INTERNAL_FIELDS = ("_id", "content_hash")
+
+def render_sentence(sentence):
+    if not (sentence.get("subject") and sentence.get("subject").get("person") and sentence.get("subject").get("number")):
+        logger.warning(f"Invalid sentence data: {sentence}")
+        return 400, encode_body({"error": "Invalid sentence data"})
+    return 200, dumps({k: v for k, v in sentence.items() if k not in INTERNAL_FIELDS}).encode("utf-8")
 
-@app.route("/api/get-number-game", methods=["GET"])
+# Sentences and their responses, rebuilt in the background when the corpus changes
+corpus = SnapshotReloader("number_game", lambda version: ResponseCache(load_sentences(), render_sentence, "number game responses", version=version),
+                          ["sentences"])
+
+@bp.route("/api/get-number-game", methods=["GET"])
 def get_sentence():
-    logger.info("Received request for /api/get-number-game")
-    if not all_sentences:
+    responses = corpus.snapshot
+    if not responses:
         logger.warning("No sentences available")
         return jsonify({"error": "No sentences available"}), 404
-    sentence = random.choice(all_sentences)
-    if not (sentence.get("subject") and sentence.get("subject").get("person") and sentence.get("subject").get("number")):
-        logger.warning(f"Invalid sentence data: {sentence}")
-        return jsonify({"error": "Invalid sentence data"}), 400
-    logger.info(f"Returning sentence: {sentence.get('sentence')}")
-    return Response(dumps(sentence), mimetype="application/json")
+    try:
+        count, selection, stream = requested_query("number_game")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        if count is not None:
+            return json_response(json_array(responses.batch(count, selection, stream)), stream=stream)
+        status, body = responses.choice(selection, stream)
+    except LookupError as e:
+        return jsonify({"error": str(e)}), 404
+    return json_response(body, status, stream)
 
-@app.route("/health", methods=["GET"])
+@bp.route("/health", methods=["GET"])
 def health():
     logger.info("Health check requested")
     try:
-        if not all_sentences:
+        if not corpus.snapshot:
             logger.error("No sentences available in database")
-            return jsonify({"status": "unhealthy", "error": "No sentences available"}), 500
-        return jsonify({"status": "healthy", "server": "number_game"}), 200
+            return jsonify({"status": "unhealthy", "error": "No sentences available", "corpus": corpus.status()}), 500
+        return jsonify({"status": "healthy", "server": "number_game", "corpus": corpus.status()}), 200
     except Exception as e:
         logger.error(f"Health check failed: {str(e)}")
         return jsonify({"status": "unhealthy", "error": str(e)}), 500
 
+@bp.route("/admin/reload", methods=["POST"])
+def admin_reload():
+    body, status = reload_response(corpus, request)
+    return jsonify(body), status
+
+app.register_blueprint(bp)
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--port", type=int, default=5004)
     args = parser.parse_args()
     logger.info(f"Starting Number Game Server on port {args.port}")
-    app.run(host="0.0.0.0", port=args.port, debug=True)
\ No newline at end of file
+    serve(app, args.port, "number_game", debug=os.getenv("FLASK_DEBUG", "1") == "1")
\ No newline at end of file
@@ -4,15 +4,19 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')
 # Verify sys.path for debugging
 print("sys.path:", sys.path)
 
-from flask import Flask, jsonify, send_from_directory
+from flask import Blueprint, Flask, jsonify, request, send_from_directory
 from flask_cors import CORS
-import random
 from Database.db import get_db_connection
-from bson.json_util import dumps
+from backend.helpers import corpus_store
+from backend.helpers.wsgi import serve
+from backend.helpers.corpus import use_virtual_corpus
+from backend.helpers.reloader import SnapshotReloader, reload_response
+from backend.helpers.responses import ResponseCache, encode_body, json_array, json_response, requested_query
 import logging
 import argparse
 
 app = Flask(__name__)
+bp = Blueprint("sans_sent_game", __name__)
 CORS(app)
 
 # Configure logging
@@ -30,43 +34,28 @@ except Exception as e:
 
 # Load sentences data
 def load_sentences():
+    if use_virtual_corpus():
+        sentences = corpus_store.virtual_corpus()
+        logger.info(f"Using virtual sentence corpus with {len(sentences)} sentences")
+        return sentences
     try:
         if sentences_collection is None:
             raise Exception("No MongoDB connection")
-        sentences = list(sentences_collection.find())
+        sentences = corpus_store.find("sentences")
         logger.info(f"Successfully loaded {len(sentences)} sentences from MongoDB")
         return sentences
     except Exception as e:
         logger.error(f"Error loading sentences: {str(e)}")
         return []
 
-sentences = load_sentences()
-
-@app.route('/health')
-def health():
-    return jsonify({"status": "healthy", "server": "sentence_game"})
-
-@app.route('/')
-def home():
-    return send_from_directory('../games', 'sent_game.html')
-
-@app.route('/get_random_sentence')
-def get_random_sentence():
-    if not sentences:
-        logger.warning("No sentences available")
-        return jsonify({"error": "No sentences available"}), 404
-    
-    sentence_data = random.choice(sentences)
-    
+def render_sentence(sentence_data):
     # Create hint data
     hint = {
         "subject": sentence_data["subject"] if sentence_data.get("subject") else None,
         "object": sentence_data["object"] if sentence_data.get("object") else None,
         "verb": sentence_data["verb"]
     }
-    
-    logger.info(f"Returning sentence: {sentence_data.get('sentence')}")
-    return jsonify({
+    return 200, encode_body({
         "sentence": sentence_data["sentence"],
         "subject": sentence_data["subject"],
         "object": sentence_data["object"],
@@ -75,10 +64,47 @@ def get_random_sentence():
         "hint": hint
     })
 
+# Sentences and their responses, rebuilt in the background when the corpus changes
+corpus = SnapshotReloader("sentence_game", lambda version: ResponseCache(load_sentences(), render_sentence, "sentence responses", version=version),
+                          ["sentences"])
+
+@bp.route('/health')
+def health():
+    return jsonify({"status": "healthy", "server": "sentence_game", "corpus": corpus.status()})
+
+@bp.route('/admin/reload', methods=['POST'])
+def admin_reload():
+    body, status = reload_response(corpus, request)
+    return jsonify(body), status
+
+@bp.route('/')
+def home():
+    return send_from_directory('../games', 'sent_game.html')
+
+@bp.route('/get_random_sentence')
+def get_random_sentence():
+    responses = corpus.snapshot
+    if not responses:
+        logger.warning("No sentences available")
+        return jsonify({"error": "No sentences available"}), 404
+    try:
+        count, selection, stream = requested_query("sentence_game")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        if count is not None:
+            return json_response(json_array(responses.batch(count, selection, stream)), stream=stream)
+        status, body = responses.choice(selection, stream)
+    except LookupError as e:
+        return jsonify({"error": str(e)}), 404
+    return json_response(body, status, stream)
+
+app.register_blueprint(bp)
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument('--port', type=int, default=5001)
     args = parser.parse_args()
     
     logger.info(f"Starting Sentence Game Server on port {args.port}")
-    app.run(debug=True, host='0.0.0.0', port=args.port)
\ No newline at end of file
+    serve(app, args.port, "sans_sent_game", debug=os.getenv("FLASK_DEBUG", "1") == "1")
\ No newline at end of file
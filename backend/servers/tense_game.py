@@ -1,8 +1,13 @@
-from flask import Flask, jsonify, request
+from flask import Blueprint, Flask, jsonify, request
 from flask_cors import CORS
-import random
 import logging
 from Database.db import get_db_connection
+from Database import indexes
+from backend.helpers import corpus_store
+from backend.helpers.wsgi import serve
+from backend.helpers.corpus import use_virtual_corpus
+from backend.helpers.reloader import SnapshotReloader, reload_response
+from backend.helpers.responses import ResponseCache, encode_body, json_array, json_response, requested_query
 import argparse
 
 # Configure logging
@@ -10,6 +15,7 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
+bp = Blueprint("tense_game", __name__)
 CORS(app, resources={r"/api/*": {
     "origins": ["http://localhost:5173"],
     "methods": ["GET"],
@@ -18,16 +24,18 @@ CORS(app, resources={r"/api/*": {
 
 # Load data
 def load_questions():
+    if use_virtual_corpus():
+        questions = corpus_store.virtual_corpus()
+        logger.info(f"Using virtual sentence corpus with {len(questions)} sentences")
+        return questions
     try:
-        db = get_db_connection()
-        questions = list(db.sentences.find({"tense": {"$exists": True, "$ne": ""}, "sentence": {"$exists": True}}))
+        questions = corpus_store.find("sentences", indexes.query("sentences.tense_game"))
         logger.info(f"Loaded {len(questions)} sentences from MongoDB")
         return questions
     except Exception as e:
         logger.error(f"Error loading sentences: {str(e)}")
         return []
 
-all_questions = load_questions()
 
 # Generate explanation for each sentence
 def generate_explanation(q):
@@ -55,68 +63,82 @@ def generate_explanation(q):
         logger.error(f"Error generating explanation for {q.get('sentence', 'unknown')}: {str(e)}")
         return "Error generating explanation."
 
-# Add explanation to each question
-for q in all_questions:
-    q["explanation"] = generate_explanation(q)
+def render_question(q):
+    return 200, encode_body({
+        "sentence": q.get("sentence", ""),
+        "tense": q.get("tense", ""),
+        "explanation": generate_explanation(q),
+        "verb": q.get("verb", {}),
+        "subject": q.get("subject", {}),
+        "object": q.get("object", {})
+    })
+
+# Questions and their responses, rebuilt in the background when the corpus changes
+corpus = SnapshotReloader("tense_game", lambda version: ResponseCache(load_questions(), render_question, "tense questions", version=version),
+                          ["sentences"])
 
 # Route to serve a single random question
-@app.route("/api/get-tense-question", methods=["GET"])
+@bp.route("/api/get-tense-question", methods=["GET"])
 def get_tense_question():
-    if not all_questions:
+    responses = corpus.snapshot
+    if not responses:
         logger.error("No questions available in database")
         return jsonify({"error": "No questions available"}), 404
-    question = random.choice(all_questions)
-    logger.info(f"Serving question: {question.get('sentence', 'Unknown')}")
-    return jsonify({
-        "sentence": question.get("sentence", ""),
-        "tense": question.get("tense", ""),
-        "explanation": question.get("explanation", ""),
-        "verb": question.get("verb", {}),
-        "subject": question.get("subject", {}),
-        "object": question.get("object", {})
-    })
+    try:
+        count, selection, stream = requested_query("tense_game")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        if count is not None:
+            return json_response(json_array(responses.batch(count, selection, stream)), stream=stream)
+        status, body = responses.choice(selection, stream)
+    except LookupError as e:
+        return jsonify({"error": str(e)}), 404
+    return json_response(body, status, stream)
 
 # Route to serve multiple questions
-@app.route("/api/get-tense-questions", methods=["GET"])
+@bp.route("/api/get-tense-questions", methods=["GET"])
 def get_tense_questions():
     try:
-        count = int(request.args.get("count", 5))
-        if count < 1 or count > 50:
-            logger.error(f"Invalid question count: {count}")
-            return jsonify({"error": "Invalid question count (1-50 allowed)"}), 400
-        if not all_questions:
+        try:
+            count, selection, stream = requested_query("tense_game", default=5)
+        except ValueError as e:
+            logger.error(f"Invalid question request: {str(e)}")
+            return jsonify({"error": str(e)}), 400
+        responses = corpus.snapshot
+        if not responses:
             logger.error("No questions available in database")
             return jsonify({"error": "No questions available"}, []), 404
-        selected_questions = random.sample(all_questions, min(count, len(all_questions)))
-        cleaned_questions = [
-            {
-                "sentence": q.get("sentence", ""),
-                "tense": q.get("tense", ""),
-                "explanation": q.get("explanation", ""),
-                "verb": q.get("verb", {}),
-                "subject": q.get("subject", {}),
-                "object": q.get("object", {})
-            } for q in selected_questions
-        ]
-        logger.info(f"Serving {len(cleaned_questions)} questions")
-        return jsonify(cleaned_questions)
+        try:
+            selected = responses.batch(count, selection, stream)
+        except LookupError as e:
+            return jsonify({"error": str(e), "data": []}), 404
+        logger.info(f"Serving {len(selected)} questions")
+        return json_response(json_array(selected), stream=stream)
     except Exception as e:
         logger.error(f"Error serving questions: {str(e)}")
         return jsonify({"error": f"Failed to load questions: {str(e)}", "data": []}), 500
 
-@app.route("/health")
+@bp.route("/health")
 def health():
     try:
         db = get_db_connection()
         db.command('ping')
-        return jsonify({"status": "healthy"}), 200
+        return jsonify({"status": "healthy", "corpus": corpus.status()}), 200
     except Exception as e:
         logger.error(f"Health check failed: {str(e)}")
         return jsonify({"status": "unhealthy", "error": str(e)}), 500
 
+@bp.route("/admin/reload", methods=["POST"])
+def admin_reload():
+    body, status = reload_response(corpus, request)
+    return jsonify(body), status
+
+app.register_blueprint(bp)
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--port", type=int, default=5003)
     args = parser.parse_args()
     logger.info(f"Starting Tense Game Server on port {args.port}")
-    app.run(host="0.0.0.0", port=args.port, debug=False)
\ No newline at end of file
+    serve(app, args.port, "tense_game")
\ No newline at end of file
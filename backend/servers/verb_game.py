@@ -8,9 +8,17 @@ print("sys.path:", sys.path)
 import random
 import json
 import re
-from flask import Flask, jsonify, request
+from flask import Blueprint, Flask, jsonify, request
 from flask_cors import CORS
 from Database.db import get_db_connection
+from Database.versions import current_collection
+from Database import indexes
+from backend.helpers import corpus_store
+from backend.helpers.wsgi import serve
+from backend.helpers.corpus import SentenceCorpus, use_virtual_corpus
+from backend.helpers.morphology import Morphology
+from backend.helpers.reloader import SnapshotReloader, reload_response
+from backend.helpers.responses import ResponseCache, encode_body, json_array, json_response, requested_query
 from bson.json_util import dumps
 import logging
 import argparse
@@ -20,6 +28,7 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
+bp = Blueprint("verb_game", __name__)
 CORS(app, resources={
     r"/api/*": {
         "origins": ["http://localhost:5173"],
@@ -43,20 +52,15 @@ except Exception as e:
 
 # === Load data ===
 def load_sentences():
+    if use_virtual_corpus():
+        sentences = corpus_store.virtual_corpus()
+        logger.info(f"Using virtual sentence corpus with {len(sentences)} sentences")
+        return sentences
     try:
         if sentences_collection is None:
             logger.error("No MongoDB connection")
             return []
-        sentences = list(sentences_collection.find({
-            "sentence": {"$exists": True},
-            "verb.form": {"$exists": True},
-            "verb.root": {"$exists": True},
-            "verb.class": {"$exists": True},
-            "tense": {"$exists": True, "$in": ["present", "past", "future"]},
-            "subject.form": {"$exists": True},
-            "subject.person": {"$exists": True},
-            "subject.number": {"$exists": True}
-        }))
+        sentences = corpus_store.find("sentences", indexes.query("sentences.verb_game"))
         logger.info(f"Loaded {len(sentences)} sentences from MongoDB")
         return sentences
     except Exception as e:
@@ -69,7 +73,7 @@ def load_conjugations():
             logger.error("No MongoDB connection")
             return {}
         conjugations = {}
-        for doc in conjugations_collection.find():
+        for doc in corpus_store.find("conjugations"):
             for tense in ["present", "past", "future"]:
                 if tense in doc:
                     conjugations[tense] = {k: v for k, v in doc[tense].items() if k in ["1P", "4P", "6P", "10P"]}
@@ -85,7 +89,7 @@ def load_verbs():
             logger.error("No MongoDB connection")
             return []
         verbs = []
-        for doc in verbs_collection.find():
+        for doc in corpus_store.find("verbs"):
             for vclass in ["1P", "4P", "6P", "10P"]:
                 if vclass in doc and "verbs" in doc[vclass]:
                     for verb in doc[vclass]["verbs"]:
@@ -105,9 +109,7 @@ def load_verbs():
         logger.error(f"Error loading verbs: {str(e)}")
         return []
 
-sentences = load_sentences()
-conjugations = load_conjugations()
-verbs = load_verbs()
+DEVANAGARI_WORD = re.compile(r'^[\u0900-\u097F]+$')
 
 # === Helper Functions ===
 def label(person, number):
@@ -131,70 +133,39 @@ def replace_verb_with_blank(text, form):
         logger.error(f"Error in replace_verb_with_blank: {str(e)}")
         return text
 
-def generate_distractors(correct_form, root, vclass, tense, person, number):
-    try:
-        if tense not in conjugations or vclass not in conjugations[tense]:
-            logger.warning(f"No conjugations for tense: {tense}, class: {vclass}")
-            return []
-        
-        # Select stem per gen.py rules
-        matching = next((v for v in verbs if v.get("root") == root and v.get("verb_class") == vclass), None)
-        if not matching:
+def build_distractor_table(morphology):
+    # (root, class, tense, person, number) -> every other distinct, valid form
+    # of the same paradigm, so a request only has to pick two of them.
+    table = {}
+    for (root, vclass, tense), paradigm in morphology.paradigms.items():
+        for pn, correct_form in paradigm.items():
+            person, number = pn.split("_")
+            candidates = []
+            for other_pn, form in paradigm.items():
+                if (other_pn != pn and form and
+                    form != correct_form and
+                    form not in candidates and
+                    DEVANAGARI_WORD.match(form)):
+                    candidates.append(form)
+            table[(root, vclass, tense, person, number)] = tuple(candidates)
+    return table
+
+def generate_distractors(game, correct_form, root, vclass, tense, person, number):
+    candidates = game["distractors"].get((root, vclass, tense, person, number))
+    if candidates is None:
+        if game["morphology"].verb(root, vclass) is None:
             logger.warning(f"No verb found for root: {root}, class: {vclass}")
-            return []
-        
-        if tense == "past":
-            stem = matching.get("past_stem", root)
-        elif tense == "future":
-            stem = matching.get("future_stem", root)
         else:
-            stem = root
-        
-        # Preserve halant for present tense, 4P verbs
-        if not (tense == "present" and vclass == "4P"):
-            if stem.endswith("्"):
-                stem = stem[:-1]
-        
-        # Define all possible person/number combinations
-        person_numbers = [
-            "1_sg", "2_sg", "3_sg",
-            "1_du", "2_du", "3_du",
-            "1_pl", "2_pl", "3_pl"
-        ]
-        # Exclude the correct form's person/number
-        correct_person_number = f"{person}_{number}"
-        available_person_numbers = [pn for pn in person_numbers if pn != correct_person_number]
-        
-        distractors = []
-        # Generate distractors using same verb root/stem
-        for pn in random.sample(available_person_numbers, len(available_person_numbers)):
-            try:
-                suffix = conjugations[tense][vclass].get(pn)
-                if not suffix:
-                    logger.warning(f"No suffix for {tense}, {vclass}, {pn}")
-                    continue
-                form = stem + suffix.replace("A", "")
-                if (form != correct_form and 
-                    form not in distractors and 
-                    re.match(r'^[\u0900-\u097F]+$', form)):
-                    distractors.append(form)
-                if len(distractors) >= 2:  # Stop when we have 2 distractors
-                    break
-            except Exception as e:
-                logger.warning(f"Error generating distractor for {pn}: {str(e)}")
-                continue
-        
-        # Log warning if insufficient distractors
-        if len(distractors) < 2:
-            logger.warning(f"Insufficient distractors for {correct_form} (tense: {tense}, class: {vclass}, person: {person}, number: {number}): {distractors}")
-            # Return what we have to avoid breaking the game
-            return distractors[:2]
-        
-        logger.info(f"Generated distractors for {correct_form} (tense: {tense}, class: {vclass}, person: {person}, number: {number}): {distractors[:2]}")
-        return distractors[:2]
-    except Exception as e:
-        logger.error(f"Error in generate_distractors: {str(e)}")
+            logger.warning(f"No conjugations for tense: {tense}, class: {vclass}")
         return []
+    if correct_form in candidates:
+        # The stored sentence disagrees with the compiled paradigm
+        candidates = [form for form in candidates if form != correct_form]
+    if len(candidates) < 2:
+        logger.warning(f"Insufficient distractors for {correct_form} (tense: {tense}, class: {vclass}, person: {person}, number: {number}): {list(candidates)}")
+        # Return what we have to avoid breaking the game
+        return list(candidates)
+    return random.sample(candidates, 2)
 
 def generate_explanation(sentence):
     try:
@@ -213,87 +184,144 @@ def generate_explanation(sentence):
         logger.error(f"Error generating explanation for {sentence.get('sentence', 'unknown')}: {str(e)}")
         return "Error generating explanation."
 
+# === Pre-encoded questions ===
+# Everything in a verb game response except the options is fixed per
+# sentence, so it is encoded at load time as the JSON text before and after
+# the options array. A request only draws the distractors, shuffles three
+# strings and splices them in.
+
+def render_game(q):
+    """(status, head, tail, distractor key); tail is None for a ready error body."""
+    if not all([
+        q.get("sentence"),
+        q.get("verb"),
+        q["verb"].get("form"),
+        q.get("tense"),
+        q.get("subject"),
+        q["subject"].get("form"),
+        q["subject"].get("person"),
+        q["subject"].get("number")
+    ]):
+        logger.error(f"Invalid sentence: {q.get('sentence', 'unknown')}")
+        return 404, encode_body({"error": "Invalid sentence data"}), None, None
+
+    if not DEVANAGARI_WORD.match(q["verb"]["form"]):
+        logger.error(f"Invalid verb form: {q['verb']['form']}")
+        return 404, encode_body({"error": "Invalid verb form"}), None, None
+
+    if q.get("tense") not in ["present", "past", "future"]:
+        logger.error(f"Invalid tense: {q.get('tense')}")
+        return 404, encode_body({"error": "Invalid tense"}), None, None
+
+    head = encode_body({
+        "sentence": replace_verb_with_blank(q["sentence"], q["verb"]["form"]),
+        "correct": q["verb"]["form"]
+    })[:-1] + b',"options":'
+    tail = b"," + encode_body({
+        "hint": f"Subject '{q['subject']['form']}' is {label(q['subject']['person'], q['subject']['number'])} in {q['tense']} tense.",
+        "explanation": generate_explanation(q)
+    })[1:]
+    key = (q["verb"]["form"], q["verb"]["root"], q["verb"]["class"], q["tense"],
+           q["subject"]["person"], q["subject"]["number"])
+    return 200, head, tail, key
+
+def load_game(version):
+    """Everything a request reads, built together so a reload swaps it in one piece."""
+    sentences = load_sentences()
+    if isinstance(sentences, SentenceCorpus):
+        # The virtual corpus carries the dataset inputs it was built from
+        conjugations = sentences.lexicon.conjugations
+        verbs = sentences.lexicon.verbs
+        morphology = sentences.morphology
+    else:
+        conjugations = load_conjugations()
+        verbs = load_verbs()
+        # Compiled verb paradigms shared with the corpus generators
+        morphology = Morphology(verbs=verbs, conjugations=conjugations)
+    distractors = build_distractor_table(morphology)
+    logger.info(f"Precomputed distractors for {len(distractors)} verb forms")
+    return {
+        "sentences": sentences,
+        "verbs": verbs,
+        "morphology": morphology,
+        "distractors": distractors,
+        "responses": ResponseCache(sentences, render_game, "verb game questions", version=version)
+    }
+
+corpus = SnapshotReloader("verb_game", load_game, ["sentences", "conjugations", "verbs"],
+                          size=lambda game: len(game["sentences"]))
+
+def finish_game(game, head, tail, key):
+    """Draw and splice in the options; None when the paradigm has too few forms."""
+    options = [key[0]] + generate_distractors(game, *key)
+    if len(options) < 3:
+        logger.error(f"Insufficient options ({len(options)}) for verb form: {key[0]}")
+        return None
+    random.shuffle(options)
+    return head + encode_body(options) + tail
+
 # === API Route ===
-@app.route("/api/get-game", methods=["GET", "OPTIONS"])
+@bp.route("/api/get-game", methods=["GET", "OPTIONS"])
 def get_game():
     if request.method == "OPTIONS":
         logger.info("Handling OPTIONS request for /api/get-game")
         return jsonify({}), 200
     
     try:
-        if not sentences:
+        game = corpus.snapshot
+        if not game or not game["sentences"]:
             logger.error("No sentences available")
             return jsonify({"error": "No sentences available"}), 404
         
-        q = random.choice(sentences)
-        if not all([
-            q.get("sentence"), 
-            q.get("verb"), 
-            q["verb"].get("form"), 
-            q.get("tense"), 
-            q.get("subject"), 
-            q["subject"].get("form"), 
-            q["subject"].get("person"), 
-            q["subject"].get("number")
-        ]):
-            logger.error(f"Invalid sentence selected: {q.get('sentence', 'unknown')}")
-            return jsonify({"error": "Invalid sentence data"}), 404
-        
-        if not re.match(r'^[\u0900-\u097F]+$', q["verb"]["form"]):
-            logger.error(f"Invalid verb form: {q['verb']['form']}")
-            return jsonify({"error": "Invalid verb form"}), 404
-        
-        if q.get("tense") not in ["present", "past", "future"]:
-            logger.error(f"Invalid tense: {q.get('tense')}")
-            return jsonify({"error": "Invalid tense"}), 404
-        
-        sentence = replace_verb_with_blank(q["sentence"], q["verb"]["form"])
-        distractors = generate_distractors(
-            q["verb"]["form"], 
-            q["verb"]["root"], 
-            q["verb"]["class"], 
-            q["tense"],
-            q["subject"]["person"],
-            q["subject"]["number"]
-        )
-        options = [q["verb"]["form"]] + distractors
-        
-        if len(options) < 3:
-            logger.error(f"Insufficient options ({len(options)}) for sentence: {q['sentence']}")
-            return jsonify({"error": "Insufficient options available"}), 404
-        
-        random.shuffle(options)
-        logger.info(f"Serving question: {sentence} with options: {options}")
-        
-        return jsonify({
-            "sentence": sentence,
-            "correct": q["verb"]["form"],
-            "options": options,
-            "hint": f"Subject '{q['subject']['form']}' is {label(q['subject']['person'], q['subject']['number'])} in {q['tense']} tense.",
-            "explanation": generate_explanation(q)
-        })
+        try:
+            count, selection, stream = requested_query("verb_game")
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        try:
+            if count is not None:
+                bodies = [finish_game(game, head, tail, key)
+                          for status, head, tail, key in game["responses"].sample(count, selection, stream) if tail]
+                return json_response(json_array([body for body in bodies if body]), stream=stream)
+            status, head, tail, key = game["responses"].choice(selection, stream)
+        except LookupError as e:
+            return jsonify({"error": str(e)}), 404
+
+        if tail is None:
+            return json_response(head, status, stream)
+        body = finish_game(game, head, tail, key)
+        if body is None:
+            return json_response(encode_body({"error": "Insufficient options available"}), 404, stream)
+        return json_response(body, stream=stream)
     except Exception as e:
         logger.error(f"Error serving game: {str(e)}")
         return jsonify({"error": f"Failed to load question: {str(e)}"}), 500
 
 # === Health check route ===
-@app.route("/health", methods=["GET"])
+@bp.route("/health", methods=["GET"])
 def health():
     try:
-        if sentences_collection is None or sentences_collection.count_documents({}) == 0:
+        if sentences_collection is None or current_collection("sentences").count_documents({}) == 0:
             logger.error("No sentences available in database")
             return jsonify({"status": "unhealthy", "error": "No sentences available"}), 500
         logger.info("Health check successful")
-        return jsonify({"status": "healthy", "server": "verb_game"}), 200
+        return jsonify({"status": "healthy", "server": "verb_game", "corpus": corpus.status()}), 200
     except Exception as e:
         logger.error(f"Health check failed: {str(e)}")
         return jsonify({"status": "unhealthy", "error": str(e)}), 500
 
+@bp.route("/admin/reload", methods=["POST"])
+def admin_reload():
+    body, status = reload_response(corpus, request)
+    return jsonify(body), status
+
+app.register_blueprint(bp)
+
 # === Start server ===
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--port", type=int, default=5002)
     args = parser.parse_args()
     logger.info(f"Starting Verb Game Server on port {args.port}")
-    logger.info(f"Loaded {len(sentences)} sentences, {len(verbs)} verbs")
-    app.run(host="0.0.0.0", port=args.port, debug=True)
\ No newline at end of file
+    # status(), not snapshot: reading the snapshot here would start a poller in the gunicorn master
+    logger.info(f"Loaded {corpus.status()['entries']} sentences")
+    serve(app, args.port, "verb_game", debug=os.getenv("FLASK_DEBUG", "1") == "1")
\ No newline at end of file
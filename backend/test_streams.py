@@ -0,0 +1,32 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from backend.helpers.streams import Stream, permute
+
+def test_permute_is_a_permutation():
+    for size in (1, 2, 7, 64, 1000):
+        assert sorted(permute(i, size, 12345) for i in range(size)) == list(range(size))
+
+def test_batches_stay_distinct_across_a_reshuffle():
+    # 10 is not a multiple of 3, so every few batches straddle the end of a pass
+    size, k = 10, 3
+    stream = Stream("test", seed=1)
+    for _ in range(200):
+        positions = stream.take(size, k)
+        assert len(positions) == k
+        assert len(set(positions)) == k
+        assert all(0 <= position < size for position in positions)
+
+def test_no_repeats_within_a_pass():
+    size = 10
+    stream = Stream("test", seed=2)
+    assert sorted(stream.take(size, 4) + stream.take(size, 4) + stream.take(size, 2)) == list(range(size))
+
+def test_token_round_trip_and_pool_change():
+    stream = Stream("test")
+    stream.take(10, 3, b"poolpool")
+    restored = Stream.from_token("test", stream.token())
+    assert (restored.seed, restored.cursor, restored.size, restored.pool) == (stream.seed, 3, 10, b"poolpool")
+    restored.take(10, 3, b"otherpoo")
+    assert restored.cursor == 3 and restored.seed != stream.seed